@@ -12,6 +12,9 @@ import time
 import threading
 from fastapi.responses import Response
 
+# Relatório de inicialização: tempo gasto em cada etapa até a aplicação estar pronta
+_startup_t0 = time.perf_counter()
+
 # Configuração dos caminhos para importação correta independente de onde o script é executado
 current_file = pathlib.Path(__file__).absolute()
 current_dir = current_file.parent
@@ -25,23 +28,29 @@ if str(current_dir) not in sys.path:
 
 # Tenta importar os módulos usando diferentes estratégias
 # Esta abordagem funcionará tanto executando de backend/ quanto do diretório raiz
+_import_t0 = time.perf_counter()
 try:
     # Tenta importação absoluta (quando executado como módulo)
-    from backend.routers import transformer_routes, data_routes
+    from backend.routers import transformer_routes, data_routes, project_context, session_routes
     from backend.mcp.data_manager import MCPDataManager
+    from backend.mcp.projects import ProjectRegistry
     from backend.mcp.session_manager import MCPSessionManager
+    from backend.mcp.storage import create_storage_backend
 except ImportError:
     try:
         # Tenta importação relativa (quando executado diretamente de backend/)
-        from routers import transformer_routes, data_routes
+        from routers import transformer_routes, data_routes, project_context, session_routes
         from mcp.data_manager import MCPDataManager
+        from mcp.projects import ProjectRegistry
         from mcp.session_manager import MCPSessionManager
+        from mcp.storage import create_storage_backend
     except ImportError:
         print("ERRO: Não foi possível importar os módulos necessários.")
         print("Certifique-se de que está executando o script do diretório correto:")
         print("1. Do diretório raiz: python -m backend.main")
         print("2. Do diretório backend: python main.py")
         sys.exit(1)
+router_import_ms = (time.perf_counter() - _import_t0) * 1000
 
 # Criar a instância da aplicação FastAPI
 app = FastAPI(
@@ -57,25 +66,62 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # Permite ao frontend ler a versão do store para If-None-Match/If-Match
 )
 
 # Inicializar o sistema de dados
-mcp_data_manager = MCPDataManager()
+# TTS_WRITE_BEHIND=1 ativa a persistência write-behind (stores gravados em lote por uma thread de fundo)
+# TTS_SPECULATIVE=1 ativa o pré-cálculo dos módulos quando as entradas ficam ociosas (TTS_SPECULATIVE_IDLE, em s)
+# TTS_STORAGE_BACKEND escolhe a persistência: sqlite (padrão), memory ou file (TTS_STORAGE_PATH = arquivo/diretório)
+# Cada projeto (X-Project-Id / ?project=) tem o seu data manager; sem projeto, vale o padrão
+_dm_t0 = time.perf_counter()
+project_registry = ProjectRegistry(
+    storage=create_storage_backend(os.environ.get("TTS_STORAGE_BACKEND", "sqlite"),
+                                   os.environ.get("TTS_STORAGE_PATH") or None),
+    write_behind=os.environ.get("TTS_WRITE_BEHIND") == "1",
+    flush_interval=float(os.environ.get("TTS_FLUSH_INTERVAL", "1.0")),
+    speculative=os.environ.get("TTS_SPECULATIVE") == "1",
+    idle_seconds=float(os.environ.get("TTS_SPECULATIVE_IDLE", "0.75")),
+)
+mcp_data_manager = project_registry.default
+data_manager_init_ms = (time.perf_counter() - _dm_t0) * 1000
 session_manager = MCPSessionManager(mcp_data_manager)
 
 # Configurar os data managers nos routers
 transformer_routes.mcp_data_manager = mcp_data_manager
 data_routes.set_data_manager(mcp_data_manager)
+session_routes.set_data_manager(mcp_data_manager)
+project_context.set_project_registry(project_registry)
+
+@app.on_event("shutdown")
+def shutdown_data_manager():
+    # Grava stores pendentes de todos os projetos e fecha as conexões persistentes do SQLite
+    project_registry.close()
 
 # Incluir routers na aplicação
 app.include_router(transformer_routes.router)
 app.include_router(data_routes.router)
+app.include_router(session_routes.router)
 
 # Rota de teste para verificar se a API está funcionando
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "message": "API está funcionando"}
 
+def build_startup_report():
+    """Tempos de inicialização: import dos routers, init do MCP (schema + índice) e decodificação dos stores."""
+    return {
+        "router_import_ms": round(router_import_ms, 2),
+        "data_manager_init_ms": round(data_manager_init_ms, 2),
+        "total_ms": round(startup_total_ms, 2),
+        "mcp": mcp_data_manager.startup_report(),
+    }
+
+@app.get("/api/health/startup")
+def startup_report():
+    """Relatório de inicialização (store_decode_ms cresce conforme os stores são acessados)."""
+    return build_startup_report()
+
 # Rota para servir favicon.ico para evitar 404
 @app.get("/favicon.ico")
 async def favicon():
@@ -90,6 +136,13 @@ if os.path.exists(frontend_dir):
 else:
     print(f"Aviso: Diretório frontend não encontrado em {frontend_dir}")
 
+startup_total_ms = (time.perf_counter() - _startup_t0) * 1000
+_report = build_startup_report()
+print(f"[Startup] routers: {_report['router_import_ms']:.1f} ms | "
+      f"MCP init: {_report['data_manager_init_ms']:.1f} ms "
+      f"(schema {_report['mcp']['db_init_ms']:.1f} ms, índice de stores {_report['mcp']['store_index_ms']:.1f} ms, "
+      f"{_report['mcp']['stores_indexed']} stores, decodificação preguiçosa) | total: {_report['total_ms']:.1f} ms")
+
 def check_port_in_use(port):
     """Verifica se uma porta está em uso"""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
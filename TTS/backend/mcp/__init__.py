@@ -4,6 +4,9 @@ Memory Cache Proxy (MCP) - Sistema central de gerenciamento de dados da aplicaç
 """
 
 from .data_manager import MCPDataManager
+from .projects import ProjectRegistry
 from .session_manager import MCPSessionManager
+from .storage import MemoryStorage, StorageBackend, create_storage_backend
 
-__all__ = ['MCPDataManager', 'MCPSessionManager']
+__all__ = ['MCPDataManager', 'MCPSessionManager', 'ProjectRegistry',
+           'StorageBackend', 'MemoryStorage', 'create_storage_backend']
@@ -0,0 +1,176 @@
+# backend/mcp/backup.py
+"""
+Backup e restauração dos stores do MCP em NDJSON (um JSON por linha).
+
+Formato:
+    {"type": "backup", "format": "ndjson-v2", "backup_timestamp": "..."}
+    {"type": "store", "store_id": "transformerInputs", "version": 12, "data": {...}}
+    {"type": "store", "store_id": "losses", "version": 7, "data": {...}}
+    {"type": "end", "stores": 2}
+
+O registro final "end" marca o backup completo: como a resposta é enviada em
+streaming, uma falha no meio da geração não muda mais o status HTTP, então o
+gerador termina com {"type": "error", ...} e a restauração recusa qualquer
+backup ndjson-v2 sem o "end" (ou com contagem divergente). Backups ndjson-v1,
+anteriores ao registro final, continuam aceitos sem ele.
+
+O backup é gerado store a store a partir de uma visão consistente (os
+snapshots imutáveis de get_all_stores, sem cópias), opcionalmente em gzip
+incremental. A restauração lê o upload em blocos, descomprime se necessário e
+decodifica uma linha por vez, então o texto completo do backup nunca fica em
+memória.
+"""
+
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+BACKUP_FORMAT = 'ndjson-v2'
+
+# Formatos anteriores ao registro final "end" (o JSON antigo e o ndjson-v1), restaurados sem exigi-lo
+FORMATS_WITHOUT_END = ('json', 'ndjson-v1')
+
+# Assinatura gzip (os dois primeiros bytes de qualquer arquivo .gz)
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Tamanho máximo de uma linha não terminada no buffer da restauração (proteção contra uploads inválidos)
+MAX_LINE_BYTES = 256 * 1024 * 1024
+
+
+def iter_backup_lines(data_manager, compress: bool = False) -> Iterator[bytes]:
+    """
+    Prepara o backup e devolve o gerador das linhas (em gzip se `compress`).
+    O recálculo dos módulos sujos e a visão dos stores acontecem aqui, antes da
+    resposta: um erro nessa fase ainda vira um status HTTP de erro. Memória
+    proporcional a um store.
+    """
+    data_manager.refresh_dirty()  # Módulos sujos entram no backup já recalculados
+    revisions, stores = data_manager._all_snapshots()
+    return _generate_lines(revisions, stores, compress)
+
+
+def _generate_lines(revisions: Dict[str, int], stores: Dict[str, Any], compress: bool) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: formato gzip
+
+    def emit(record: Dict[str, Any]) -> bytes:
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        return compressor.compress(line) if compressor else line
+
+    yield emit({'type': 'backup', 'format': BACKUP_FORMAT, 'backup_timestamp': datetime.now().isoformat()})
+    count = 0
+    try:
+        for store_id, data in stores.items():
+            chunk = emit({'type': 'store', 'store_id': store_id, 'version': revisions.get(store_id, 0), 'data': data})
+            count += 1
+            if chunk:
+                yield chunk
+        trailer = {'type': 'end', 'stores': count}
+    except Exception as e:
+        # O status 200 já foi enviado: o registro de erro (no lugar do "end") invalida o arquivo
+        print(f"[MCP] Erro ao gerar o backup após {count} stores: {e}")
+        trailer = {'type': 'error', 'error': str(e), 'stores': count}
+    chunk = emit(trailer)
+    if chunk:
+        yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+class BackupReader:
+    """
+    Decodificador incremental de um backup NDJSON (gzip detectado pela assinatura).
+    Uso: para cada bloco recebido, `for record in reader.feed(chunk)`; no fim, `reader.close()`.
+    Também aceita o backup antigo em JSON único ({"stores": {...}}), que precisa
+    ser lido por inteiro. O close() recusa um backup ndjson-v2 sem o registro final.
+    """
+
+    def __init__(self):
+        self._decompressor: Optional[Any] = None
+        self._started = False
+        self._parts: List[bytes] = []  # Pedaços da linha ainda não terminada
+        self._pending_bytes = 0
+        self._legacy = False
+        self.line_number = 0
+        self.format: Optional[str] = None
+        self.store_count = 0
+        self.complete = False  # Registro "end" lido e conferido
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        if not chunk:
+            return []
+        if not self._started:
+            self._started = True
+            if chunk[:2] == GZIP_MAGIC:
+                self._decompressor = zlib.decompressobj(47)  # wbits=47: gzip ou zlib, detectado automaticamente
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        return self._consume(chunk)
+
+    def close(self) -> List[Dict[str, Any]]:
+        tail = self._decompressor.flush() if self._decompressor is not None else b''
+        records = self._consume(tail)
+        rest = b''.join(self._parts)
+        self._parts, self._pending_bytes = [], 0
+        if rest.strip():
+            records.extend(self._parse(rest, final=True))
+        if not self.complete and self.format not in FORMATS_WITHOUT_END:
+            raise ValueError("Backup incompleto: falta o registro final")
+        return records
+
+    def _consume(self, data: bytes) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        start = 0
+        while not self._legacy:
+            end = data.find(b'\n', start)
+            if end < 0:
+                break
+            self._parts.append(data[start:end])
+            line = b''.join(self._parts)
+            self._parts, self._pending_bytes = [], 0
+            start = end + 1
+            records.extend(self._parse(line))
+        if start < len(data):
+            self._parts.append(data[start:])
+            self._pending_bytes += len(data) - start
+            if self._pending_bytes > MAX_LINE_BYTES:
+                raise ValueError(f"Linha {self.line_number + 1} do backup excede {MAX_LINE_BYTES} bytes")
+        return records
+
+    def _parse(self, line: bytes, final: bool = False) -> List[Dict[str, Any]]:
+        self.line_number += 1
+        if not line.strip():
+            return []
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if self.line_number == 1 and not final:
+                # Backup antigo: um único documento JSON com quebras de linha; lido por inteiro no close()
+                self._legacy = True
+                self._parts = [line, b'\n']
+                self._pending_bytes = len(line) + 1
+                self.line_number = 0
+                return []
+            raise ValueError(f"Linha {self.line_number} do backup não é JSON válido")
+        if isinstance(record, dict) and record.get('type') is None and isinstance(record.get('stores'), dict):
+            # Backup antigo em JSON único (numa só linha ou lido no close())
+            self.format = 'json'
+            return [{'type': 'store', 'store_id': store_id, 'data': data}
+                    for store_id, data in record['stores'].items()]
+        if not isinstance(record, dict) or record.get('type') not in ('backup', 'store', 'end', 'error'):
+            raise ValueError(f"Linha {self.line_number} do backup tem formato desconhecido")
+        if self.complete:
+            raise ValueError(f"Linha {self.line_number} do backup vem depois do registro final")
+        kind = record['type']
+        if kind == 'backup':
+            self.format = record.get('format')
+        elif kind == 'store':
+            self.store_count += 1
+        elif kind == 'error':
+            raise ValueError(f"O backup foi interrompido durante a geração: {record.get('error')}")
+        elif record.get('stores') != self.store_count:
+            raise ValueError(f"Backup incompleto: o registro final indica {record.get('stores')} stores, "
+                             f"mas o arquivo tem {self.store_count}")
+        else:
+            self.complete = True
+        return [record]
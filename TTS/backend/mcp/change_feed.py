@@ -0,0 +1,141 @@
+# backend/mcp/change_feed.py
+"""
+Feed de alterações dos stores do MCP.
+
+Cada troca de snapshot no MCPDataManager (set_data, patch_data, clear_store,
+load_session e os patches gravados pela propagação) publica um evento
+    {"seq": 42, "store_id": "losses", "version": 7, "changed_keys": ["results"]}
+para os assinantes. A rota /api/data/changes repassa os eventos como
+Server-Sent Events, e o frontend só busca de novo os stores que mudaram.
+
+publish() é chamado pelas threads do threadpool/propagação; os assinantes
+são filas asyncio, alimentadas com loop.call_soon_threadsafe.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# Eventos recentes mantidos para clientes que reconectam com Last-Event-ID
+HISTORY_SIZE = 512
+
+# Eventos pendentes por assinante; acima disso o cliente recebe um evento 'resync'
+SUBSCRIBER_QUEUE_SIZE = 1024
+
+_MISSING = object()
+
+
+def changed_top_level_keys(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """
+    Chaves de primeiro nível que mudaram entre dois snapshots. Graças ao
+    compartilhamento estrutural, chaves não tocadas são o mesmo objeto e a
+    comparação profunda só acontece nas que foram substituídas.
+    """
+    changed = []
+    for key, value in new.items():
+        old_value = old.get(key, _MISSING)
+        if old_value is not value and old_value != value:
+            changed.append(key)
+    changed.extend(key for key in old if key not in new)
+    return changed
+
+
+class Subscription:
+    """Fila de eventos de um cliente conectado ao feed."""
+
+    def __init__(self, feed: 'ChangeFeed', loop: asyncio.AbstractEventLoop,
+                 store_ids: Optional[Iterable[str]] = None):
+        self._feed = feed
+        self._loop = loop
+        self.store_ids = set(store_ids) if store_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return self.store_ids is None or event['store_id'] in self.store_ids
+
+    def _deliver(self, event: Dict[str, Any]):
+        # Executado no event loop do assinante
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: descarta a fila e pede para ele recarregar tudo
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'seq': event['seq'], 'type': 'resync'})
+
+    def push(self, event: Dict[str, Any]):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Event loop já encerrado: o cliente se foi
+            self.close()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Próximo evento, ou None se `timeout` expirar."""
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event.get('type') == 'resync':
+            self.overflowed = False
+        return event
+
+    def close(self):
+        self._feed.unsubscribe(self)
+
+
+class ChangeFeed:
+    """Publica eventos de alteração dos stores para os assinantes conectados."""
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._subscribers: List[Subscription] = []
+
+    def publish(self, store_id: str, version: int, changed_keys: List[str]) -> Dict[str, Any]:
+        with self._lock:
+            self._seq += 1
+            event = {'seq': self._seq, 'store_id': store_id, 'version': version, 'changed_keys': changed_keys}
+            self._history.append(event)
+            subscribers = [sub for sub in self._subscribers if sub.wants(event)]
+        for subscription in subscribers:
+            subscription.push(event)
+        return event
+
+    def subscribe(self, store_ids: Optional[Iterable[str]] = None,
+                  last_seq: Optional[int] = None) -> Subscription:
+        """
+        Registra um assinante no event loop atual. Com `last_seq`, reenvia os eventos
+        posteriores que ainda estão no histórico (ou um 'resync' se já saíram dele).
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), store_ids)
+        with self._lock:
+            if last_seq is not None and last_seq < self._seq:
+                missed = [event for event in self._history if event['seq'] > last_seq]
+                if not missed or missed[0]['seq'] != last_seq + 1:
+                    subscription.queue.put_nowait({'seq': self._seq, 'type': 'resync'})
+                else:
+                    for event in missed[-SUBSCRIBER_QUEUE_SIZE:]:
+                        if subscription.wants(event):
+                            subscription.queue.put_nowait(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
@@ -0,0 +1,146 @@
+# backend/mcp/connection.py
+"""
+Gerenciador de conexões SQLite do MCP.
+
+Mantém um pool limitado de conexões persistentes para o tts_data.db em vez de
+abrir uma conexão nova a cada operação. Cada operação pega uma conexão do
+pool e a devolve ao terminar, de modo que o número de conexões abertas fica
+limitado a `pool_size`, por mais threads (de curta duração ou não) que usem o
+banco. Dentro de uma mesma thread, chamadas aninhadas reaproveitam a conexão
+já retirada. As conexões usam WAL com synchronous=NORMAL (um fsync por
+checkpoint, não por commit) e reaproveitam os prepared statements através do
+cache de statements do sqlite3, desde que o texto SQL seja sempre o mesmo
+(por isso as consultas frequentes ficam em constantes de módulo).
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+# Upsert do store: um único statement (sem subconsulta) para que o cache de statements seja reaproveitado.
+# Parâmetros: (store_id, data, version)
+UPSERT_STORE_SQL = '''
+    INSERT INTO data_stores (store_id, data, last_updated, version)
+    VALUES (?, ?, CURRENT_TIMESTAMP, ?)
+    ON CONFLICT(store_id) DO UPDATE SET
+        data = excluded.data,
+        last_updated = CURRENT_TIMESTAMP,
+        version = excluded.version
+'''
+
+# Tamanho do cache de prepared statements por conexão
+STATEMENT_CACHE_SIZE = 256
+# Máximo de conexões abertas por banco (as operações seguram a conexão só durante a consulta)
+DEFAULT_POOL_SIZE = 8
+
+
+class SQLiteConnectionManager:
+    """
+    Pool limitado de conexões SQLite com WAL e synchronous=NORMAL.
+
+    Uso:
+        with manager.transaction() as conn:
+            conn.execute(UPSERT_STORE_SQL, (...))
+
+        with manager.connection() as conn:
+            rows = conn.execute(...).fetchall()
+
+    Sem conexão livre e com o pool cheio, a operação espera até `timeout` segundos.
+    """
+
+    def __init__(self, db_path: str, wal: bool = True, synchronous: str = 'NORMAL', timeout: float = 30.0,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.wal = wal
+        self.synchronous = synchronous
+        self.timeout = timeout
+        # Cada conexão a ':memory:' é um banco diferente: uma só conexão compartilhada
+        self.pool_size = 1 if db_path == ':memory:' else max(1, pool_size)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._local = threading.local()  # Conexão retirada pela thread atual (chamadas aninhadas)
+        self._connections: List[sqlite3.Connection] = []
+        self._registry_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        if self.wal and self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._registry_lock:
+            can_open = len(self._connections) < self.pool_size
+            if can_open:
+                conn = self._open()
+                self._connections.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Nenhuma conexão livre no pool após {self.timeout}s ({self.pool_size} conexões em uso)")
+
+    def _checkin(self, conn: sqlite3.Connection):
+        with self._registry_lock:
+            registered = any(conn is c for c in self._connections)
+        if registered:
+            self._idle.put(conn)
+        else:  # Pool fechado (close_all) enquanto a conexão estava em uso
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Retira uma conexão do pool pelo tempo do bloco (a mesma, se a thread já tiver uma)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:  # Bloco de leitura que deixou uma transação aberta
+                conn.rollback()
+            self._checkin(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Executa o bloco numa transação: commit no sucesso, rollback em caso de erro."""
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def open_connections(self) -> int:
+        """Número de conexões abertas (no máximo `pool_size`)."""
+        with self._registry_lock:
+            return len(self._connections)
+
+    def close_all(self):
+        """Fecha todas as conexões abertas (usado no shutdown da aplicação)."""
+        with self._registry_lock:
+            connections, self._connections = self._connections, []
+            self._idle = queue.LifoQueue()
+        # Uma conexão em uso é fechada aqui mesmo e, ao ser devolvida, não volta ao pool (_checkin)
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
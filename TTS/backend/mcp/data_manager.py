@@ -1,28 +1,80 @@
 # backend/mcp/data_manager.py
-import json
-import os
-import sqlite3
-from typing import Dict, Any, Optional
-from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import threading
-import requests # Importação crucial
+import time
+
+from .change_feed import ChangeFeed, changed_top_level_keys
+from .locks import StoreLockTable
+from .propagation import PropagationEngine
+from .snapshot import EMPTY, freeze
+from .sqlite_storage import SQLiteStorage
+from .storage import NAMESPACE_SEPARATOR, StorageBackend
+from .speculative import DEFAULT_IDLE_SECONDS, SpeculativePrecompute
+from .write_behind import WriteBehindPersister
+
+class VersionConflictError(Exception):
+    """A versão esperada pelo cliente (If-Match) não é mais a versão atual do store."""
+
+    def __init__(self, store_id: str, expected_version: int, current_version: int):
+        super().__init__(f"Store '{store_id}' está na versão {current_version}, esperada {expected_version}")
+        self.store_id = store_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+# Tentativas de recálculo de um módulo quando as entradas mudam durante um cálculo que falhou
+REFRESH_ATTEMPTS = 2
+
+# Separador entre o projeto e o store_id nas chaves do banco ("trafo-42::losses").
+# O projeto padrão usa o store_id puro, compatível com bancos anteriores aos projetos.
+PROJECT_KEY_SEPARATOR = NAMESPACE_SEPARATOR
+
 
 class MCPDataManager:
-    def __init__(self, db_path: Optional[str] = None):
-        # Se não especificado, usa path absoluto baseado no diretório do projeto
-        if db_path is None:
-            # Encontra o diretório raiz do projeto (onde deveria estar o tts_data.db)
-            current_file = os.path.abspath(__file__)
-            backend_dir = os.path.dirname(os.path.dirname(current_file))  # Sobe 2 níveis: mcp -> backend
-            tts_dir = os.path.dirname(backend_dir)  # Sobe mais 1: backend -> TTS
-            project_root = os.path.dirname(tts_dir)  # Sobe mais 1: TTS -> raiz (Downloads/TTS)
-            db_path = os.path.join(project_root, "tts_data.db")
-
-        self.db_path = db_path
-        print(f"[MCPDataManager] Database path: {self.db_path}")
+    def __init__(self, db_path: Optional[str] = None, write_behind: bool = False,
+                 flush_interval: float = 1.0, flush_max_dirty: int = 8,
+                 project_id: Optional[str] = None, storage: Optional[StorageBackend] = None,
+                 speculative: bool = False, idle_seconds: float = DEFAULT_IDLE_SECONDS):
+        # Backend de persistência (storage.py); sem backend, SQLite no tts_data.db
+        # (se db_path não for especificado, usa path absoluto baseado no diretório do projeto)
+        self._owns_storage = storage is None
+        self._storage: StorageBackend = storage if storage is not None else SQLiteStorage(db_path)
+        self.db_path = getattr(self._storage, 'db_path', None) or getattr(self._storage, 'directory', None)
+        # Projeto (transformador) deste manager; None = projeto padrão
+        self.project_id = project_id
+        self._key_prefix = f"{project_id}{PROJECT_KEY_SEPARATOR}" if project_id else ''
+        print(f"[MCPDataManager] Storage: {self._storage.name} ({self.db_path or 'memória'})"
+              + (f" (projeto '{project_id}')" if project_id else ""))
+        # Snapshots imutáveis (FrozenDict): leituras devolvem a referência sem copiar
         self._memory_store: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.Lock()
+        # Revisão em memória de cada store (incrementada a cada troca de snapshot)
+        self._revisions: Dict[str, int] = {}
+        # Stores presentes no banco e ainda não decodificados: store_id -> versão do checkpoint
+        self._pending_hydration: Dict[str, int] = {}
+        # Eventos {store_id, version, changed_keys} publicados a cada troca de snapshot (/api/data/changes)
+        self.change_feed = ChangeFeed()
+        # Tempos de inicialização (ms) e da decodificação preguiçosa dos stores
+        self._startup_timings: Dict[str, float] = {'db_init_ms': 0.0, 'store_index_ms': 0.0,
+                                                   'store_decode_ms': 0.0}
+        self._stores_decoded = 0
+        # Um lock de leitura/escrita por store; I/O e propagação ficam fora da região travada
+        self._locks = StoreLockTable()
+        # Serializa as gravações de um mesmo store (sempre grava o snapshot mais recente)
+        self._persist_locks: Dict[str, threading.Lock] = {}
+        self._persist_locks_guard = threading.Lock()
         self._auto_propagation_enabled = False  # Desabilitada por padrão para evitar problemas durante digitação
+        # Recálculo preguiçoso: uma escrita marca os dependentes transitivos como sujos
+        # ({store sujo: {store de origem: revisão que o invalidou}}) e o módulo só é
+        # recalculado quando for lido (get_data/get_snapshot)
+        self._lazy_recompute_enabled = True
+        self._dirty: Dict[str, Dict[str, int]] = {}
+        self._dirty_lock = threading.Lock()
+        # Módulos cujo recálculo falhou: {store_id: {'error': mensagem, 'sources': fontes sujas da tentativa}}
+        self._recompute_errors: Dict[str, Dict[str, Any]] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+        self._affected_cache: Dict[str, List[str]] = {}
+        # Pré-cálculo especulativo dos módulos sujos quando transformerInputs para de mudar
+        self._speculative: Optional[SpeculativePrecompute] = None
         
         # Definições dos stores, incluindo dependências e endpoints de atualização
         self.store_definitions = {
@@ -88,279 +140,589 @@ class MCPDataManager:
             }
         }
         
+        start = time.perf_counter()
         self._init_database()
+        self._startup_timings['db_init_ms'] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
         self._load_all_stores()
+        self._startup_timings['store_index_ms'] = (time.perf_counter() - start) * 1000
+        # Write-behind opcional: a memória é a fonte da verdade e os stores sujos são gravados em lote
+        self._write_behind: Optional[WriteBehindPersister] = None
+        if write_behind:
+            self._write_behind = WriteBehindPersister(self._flush_stores, interval=flush_interval,
+                                                      max_dirty=flush_max_dirty)
+            print(f"[MCPDataManager] Write-behind HABILITADO (intervalo {flush_interval}s, limite {flush_max_dirty} stores)")
+        # Propagação em processo: chama os services diretamente (sem HTTP de loopback)
+        self.propagation_engine = PropagationEngine(self)
+        self._speculative_idle_seconds = idle_seconds
+        if speculative:
+            self.enable_speculative()
 
     def enable_auto_propagation(self):
         """Habilita propagação automática"""
         self._auto_propagation_enabled = True
         print("[MCPDataManager] Propagação automática HABILITADA")
 
+    def enable_lazy_recompute(self):
+        """Módulos sujos são recalculados ao serem lidos (padrão)."""
+        self._lazy_recompute_enabled = True
+
+    def disable_lazy_recompute(self):
+        """Leituras devolvem o último resultado gravado, mesmo que esteja sujo."""
+        self._lazy_recompute_enabled = False
+
+    def enable_speculative(self, idle_seconds: Optional[float] = None):
+        """Pré-calcula os módulos sujos em segundo plano quando transformerInputs fica ocioso."""
+        if self._speculative is not None:
+            return
+        idle_seconds = self._speculative_idle_seconds if idle_seconds is None else idle_seconds
+        self._speculative = SpeculativePrecompute(self, idle_seconds=idle_seconds)
+        print(f"[MCPDataManager] Pré-cálculo especulativo HABILITADO (ociosidade {idle_seconds}s)")
+
+    def disable_speculative(self):
+        speculative, self._speculative = self._speculative, None
+        if speculative is not None:
+            speculative.stop()
+
+    def speculative_status(self) -> Optional[Dict[str, Any]]:
+        speculative = self._speculative
+        return speculative.status() if speculative is not None else None
+
+    def dirty_stores(self) -> Dict[str, Dict[str, int]]:
+        """{store sujo: {store de origem: revisão que o invalidou}}."""
+        with self._dirty_lock:
+            return {store_id: dict(sources) for store_id, sources in self._dirty.items()}
+
+    def recompute_error(self, store_id: str) -> Optional[str]:
+        """
+        Erro do último recálculo do módulo, se ele falhou com as entradas atuais (o snapshot
+        do store está desatualizado); None se o store está em dia ou se as entradas mudaram.
+        """
+        with self._dirty_lock:
+            failed = self._recompute_errors.get(store_id)
+            if failed is None or self._dirty.get(store_id) != failed['sources']:
+                return None
+            return failed['error']
+
     def disable_auto_propagation(self):
         """Desabilita propagação automática"""
         self._auto_propagation_enabled = False
         print("[MCPDataManager] Propagação automática DESABILITADA")
     
+    def flush(self):
+        """Grava imediatamente os stores pendentes do write-behind (no-op no modo síncrono)."""
+        if self._write_behind is not None:
+            self._write_behind.flush()
+
+    def close(self):
+        """Grava o que estiver pendente e fecha as conexões com o banco (chamado no shutdown da aplicação)."""
+        self.disable_speculative()
+        self.propagation_engine.shutdown()
+        if self._write_behind is not None:
+            self._write_behind.stop()
+        if self._owns_storage:
+            self._storage.close()
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self._storage
+
+    def _db_key(self, store_id: str) -> str:
+        """Chave do store (ou da sessão) no backend (com o prefixo do projeto)."""
+        return self._key_prefix + store_id
+
     def _init_database(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS data_stores (
-                    store_id TEXT PRIMARY KEY,
-                    data TEXT NOT NULL,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    version INTEGER DEFAULT 1
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    session_id TEXT PRIMARY KEY,
-                    session_data TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    description TEXT
-                )
-            ''')
-            conn.commit()
-    
+        """Schema/migrações do backend (idempotente; projetos compartilham o mesmo backend)."""
+        self._storage.init()
+
     def _load_all_stores(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT store_id, data FROM data_stores')
-            for store_id, data_json in cursor.fetchall():
-                try:
-                    self._memory_store[store_id] = json.loads(data_json)
-                except json.JSONDecodeError:
-                    print(f"Erro ao carregar dados do store '{store_id}'. Inicializando vazio.")
-                    self._memory_store[store_id] = {}
-            for store_id_def in self.store_definitions:
-                if store_id_def not in self._memory_store:
-                    self._memory_store[store_id_def] = {} # Inicializa stores vazios
-    
-    def get_data(self, store_id: str) -> Dict[str, Any]:
-        with self._lock:
-            if store_id not in self.store_definitions:
-                # Se não está definido, não deve existir. Mas para flexibilidade, podemos retornar vazio
-                # raise ValueError(f"Store '{store_id}' não existe.")
-                print(f"Aviso: Tentativa de obter store não definido '{store_id}'. Retornando vazio.")
-                return {}
-            return self._memory_store.get(store_id, {}).copy()
+        """
+        Indexa os stores do backend sem decodificá-los: só as chaves e versões são
+        lidas, então o tempo de inicialização não cresce com o tamanho dos stores.
+        Os dados são decodificados no primeiro acesso a cada store (_ensure_loaded).
+        """
+        for db_key, version in self._storage.list_stores(self._key_prefix).items():
+            store_id = db_key[len(self._key_prefix):]
+            self._pending_hydration[store_id] = version
+            self._revisions[store_id] = version
+        for store_id_def in self.store_definitions:
+            if store_id_def not in self._pending_hydration:
+                self._memory_store[store_id_def] = EMPTY # Inicializa stores vazios
+
+    def _ensure_loaded(self, store_id: str):
+        """Decodifica o store do backend no primeiro acesso (no-op se já estiver em memória)."""
+        if store_id not in self._pending_hydration:
+            return
+        with self._locks.write(store_id):
+            if store_id not in self._pending_hydration:
+                return  # Outra thread decodificou enquanto esperávamos o lock
+            start = time.perf_counter()
+            loaded = self._storage.get(self._db_key(store_id))
+            if loaded is None:
+                print(f"Erro ao carregar dados do store '{store_id}'. Inicializando vazio.")
+                self._memory_store[store_id] = EMPTY
+            else:
+                revision, snapshot = loaded
+                self._memory_store[store_id] = snapshot
+                self._revisions[store_id] = revision
+            del self._pending_hydration[store_id]
+            self._startup_timings['store_decode_ms'] += (time.perf_counter() - start) * 1000
+            self._stores_decoded += 1
+
+    def _store_ids(self) -> list:
+        """Todos os stores conhecidos, decodificados ou não."""
+        return list(dict.fromkeys([*self._memory_store, *self._pending_hydration]))
+
+    def startup_report(self) -> Dict[str, Any]:
+        """Tempos de inicialização do MCP: criação do schema, indexação e decodificação (preguiçosa) dos stores."""
+        return {
+            **{key: round(value, 2) for key, value in self._startup_timings.items()},
+            'stores_indexed': len(self._store_ids()),
+            'stores_decoded': self._stores_decoded,
+            'stores_pending': len(self._pending_hydration),
+            'storage': self._storage.name,
+        }
+
+
+    def get_data(self, store_id: str, refresh: bool = True) -> Dict[str, Any]:
+        """
+        Snapshot imutável do store (O(1), sem cópia). Para editar, use
+        `dict(snapshot)`/`snapshot.copy()` ou `thaw(snapshot)` (de backend.mcp.snapshot) e grave com set_data/patch_data.
+        Se o store for um módulo sujo, é recalculado antes (a menos que `refresh=False`).
+        """
+        if store_id not in self.store_definitions:
+            # Se não está definido, não deve existir. Mas para flexibilidade, podemos retornar vazio
+            # raise ValueError(f"Store '{store_id}' não existe.")
+            print(f"Aviso: Tentativa de obter store não definido '{store_id}'. Retornando vazio.")
+            return {}
+        if refresh:
+            self._refresh_if_dirty(store_id)
+        self._ensure_loaded(store_id)
+        with self._locks.read(store_id):
+            return self._memory_store.get(store_id, EMPTY)
+
+    def get_snapshot(self, store_id: str, refresh: bool = True) -> Tuple[int, Dict[str, Any]]:
+        """Par (revisão, snapshot) lido atomicamente; a revisão muda a cada escrita no store."""
+        if refresh:
+            self._refresh_if_dirty(store_id)
+        self._ensure_loaded(store_id)
+        with self._locks.read(store_id):
+            return self._revisions.get(store_id, 0), self._memory_store.get(store_id, EMPTY)
+
+    def _mark_dependents_dirty(self, store_id: str, revision: int):
+        """Marca os dependentes transitivos de `store_id` como sujos (chamado a cada troca de snapshot)."""
+        affected = self._affected_cache.get(store_id)
+        if affected is None:
+            affected = sorted(self.propagation_engine.affected_stores(store_id))
+            self._affected_cache[store_id] = affected
+        if not affected:
+            return
+        with self._dirty_lock:
+            for dependent in affected:
+                self._dirty.setdefault(dependent, {})[store_id] = revision
+
+    def _refresh_lock(self, store_id: str) -> threading.Lock:
+        lock = self._refresh_locks.get(store_id)
+        if lock is None:
+            with self._dirty_lock:
+                lock = self._refresh_locks.setdefault(store_id, threading.Lock())
+        return lock
+
+    def _refresh_if_dirty(self, store_id: str, is_current=None) -> Optional[Dict[str, Any]]:
+        """
+        Recalcula o módulo se ele estiver sujo. As dependências sujas são
+        recalculadas antes, ao montar o payload (get_data de cada dependência).
+        Se uma nova escrita invalidar o módulo durante o cálculo, ele continua sujo.
+        Se o recálculo falhar, o módulo também continua sujo, com o erro guardado para as
+        mesmas entradas (recompute_error): as leituras seguintes devolvem o erro sem recalcular
+        até que uma entrada mude.
+        `is_current` (pré-cálculo especulativo) descarta o resultado se devolver False.
+        Devolve a entrada do relatório do módulo, ou None se não havia o que recalcular.
+        """
+        if not self._lazy_recompute_enabled or store_id not in self._dirty:
+            return None
+        with self._refresh_lock(store_id):
+            with self._dirty_lock:
+                sources = self._dirty.get(store_id)
+                if sources is None:
+                    return None  # Outro leitor acabou de recalcular
+                sources = dict(sources)
+                failed = self._recompute_errors.get(store_id)
+                if failed is not None and failed['sources'] == sources:
+                    # Recalcular de novo com as mesmas entradas daria o mesmo erro
+                    return {'status': 'error', 'elapsed_ms': 0.0, 'error': failed['error']}
+            for _ in range(REFRESH_ATTEMPTS):
+                entry = self.propagation_engine.refresh(store_id, is_current=is_current)
+                with self._dirty_lock:
+                    current = self._dirty.get(store_id)
+                    if entry['status'] == 'error':
+                        if current != sources and current is not None:
+                            # As entradas mudaram durante o cálculo (ex.: uma dependência suja foi
+                            # recalculada ao montar o payload): o erro pode não valer mais
+                            sources = dict(current)
+                            continue
+                        self._recompute_errors[store_id] = {'error': entry.get('error'), 'sources': sources}
+                    elif entry['status'] != 'superseded' and current == sources:
+                        del self._dirty[store_id]
+                        self._recompute_errors.pop(store_id, None)
+                break
+            return entry
+
+    def refresh_dirty(self):
+        """Recalcula todos os módulos sujos (antes de salvar sessões e backups)."""
+        for level in self.propagation_engine.topological_order(set(self.dirty_stores())):
+            for store_id in level:
+                self._refresh_if_dirty(store_id)
+
+    def _swap(self, store_id: str, snapshot: Dict[str, Any]) -> bool:
+        """
+        Publica um novo snapshot do store e notifica o feed de alterações.
+        Deve ser chamado com o lock de escrita do store (garante a ordem dos eventos
+        por store). Se nada mudou, mantém a revisão e não gera evento.
+        """
+        previous = self._memory_store.get(store_id, EMPTY)
+        changed_keys = changed_top_level_keys(previous, snapshot)
+        if not changed_keys:
+            return False
+        self._memory_store[store_id] = snapshot
+        revision = self._revisions.get(store_id, 0) + 1
+        self._revisions[store_id] = revision
+        self.change_feed.publish(store_id, revision, changed_keys)
+        self._mark_dependents_dirty(store_id, revision)
+        speculative = self._speculative
+        if speculative is not None and store_id == 'transformerInputs':
+            speculative.notify(revision)
+        return True
+
+    def _check_version(self, store_id: str, expected_version: Optional[int]):
+        """Concorrência otimista: deve ser chamado com o lock de escrita do store."""
+        if expected_version is None:
+            return
+        current_version = self._revisions.get(store_id, 0)
+        if current_version != expected_version:
+            raise VersionConflictError(store_id, expected_version, current_version)
     
-    def set_data(self, store_id: str, data: Dict[str, Any]) -> bool:
-        with self._lock:
-            if store_id not in self.store_definitions:
-                # Poderia adicionar dinamicamente, mas por ora vamos manter os stores definidos
-                print(f"Aviso: Tentativa de definir store não definido '{store_id}'. Ignorando.")
-                return False # Ou raise ValueError
-            
-            self._memory_store[store_id] = data.copy() # Substitui completamente
-            self._persist_store(store_id)
+    def set_data(self, store_id: str, data: Dict[str, Any], propagate: bool = True,
+                 expected_version: Optional[int] = None) -> bool:
+        """
+        Substitui o store. Com `expected_version`, só grava se o store ainda estiver
+        nessa versão (senão levanta VersionConflictError).
+        """
+        if store_id not in self.store_definitions:
+            # Poderia adicionar dinamicamente, mas por ora vamos manter os stores definidos
+            print(f"Aviso: Tentativa de definir store não definido '{store_id}'. Ignorando.")
+            return False # Ou raise ValueError
+
+        snapshot = freeze(data)  # Congela fora do lock; sub-estruturas já congeladas são reaproveitadas
+        self._ensure_loaded(store_id)  # O backend precisa da versão anterior para gravar só o delta
+        with self._locks.write(store_id):
+            self._check_version(store_id, expected_version)
+            self._swap(store_id, snapshot) # Substitui completamente
+        # Persistência e propagação fora do lock: os handlers leem e gravam no MCP novamente
+        self._persist_store(store_id)
+        if propagate:
             print(f"[MCPDataManager - set_data] Store '{store_id}' definido. Disparando propagação.")
-            self._propagate_changes(store_id) 
-            return True
+            self._propagate_changes(store_id)
+        return True
     
-    def patch_data(self, store_id: str, partial_data: Dict[str, Any]) -> bool:
-        with self._lock:
-            if store_id not in self.store_definitions:
-                print(f"Aviso: Tentativa de aplicar patch em store não definido '{store_id}'. Ignorando.")
-                return False # Ou raise ValueError
-
-            current_store_data = self._memory_store.get(store_id, {})
-            
-            # Lógica de merge inteligente para 'formData'
-            if 'formData' in partial_data and isinstance(partial_data['formData'], dict):
-                if 'formData' not in current_store_data or not isinstance(current_store_data.get('formData'), dict):
-                    current_store_data['formData'] = {} 
-                
-                current_store_data['formData'].update(partial_data['formData'])
-                
-                # Remove 'formData' de partial_data para o update geral abaixo, se houver outras chaves
-                # Isso evita que current_store_data['formData'] seja sobrescrito se partial_data = {'formData': ..., 'outraChave': ...}
-                # No entanto, se partial_data é APENAS {'formData': ...}, o update abaixo não fará nada.
-                # É mais seguro fazer uma cópia e remover.
-                other_partial_updates = {k: v for k, v in partial_data.items() if k != 'formData'}
-                current_store_data.update(other_partial_updates)
-            else:
-                current_store_data.update(partial_data) # Merge simples se não houver 'formData' em partial_data
-            
-            self._memory_store[store_id] = current_store_data
-            self._persist_store(store_id)
+    def patch_data(self, store_id: str, partial_data: Dict[str, Any], propagate: bool = True,
+                   expected_version: Optional[int] = None) -> bool:
+        """
+        Aplica um patch (com merge de 'formData'). Com `expected_version`, só grava se
+        o store ainda estiver nessa versão (senão levanta VersionConflictError).
+        """
+        if store_id not in self.store_definitions:
+            print(f"Aviso: Tentativa de aplicar patch em store não definido '{store_id}'. Ignorando.")
+            return False # Ou raise ValueError
+
+        self._ensure_loaded(store_id)
+        with self._locks.write(store_id):
+            self._check_version(store_id, expected_version)
+            self._swap(store_id, self._merge_patch(self._memory_store.get(store_id, EMPTY), partial_data))
+        self._persist_store(store_id)
+        if propagate:
             print(f"[MCPDataManager - patch_data] Store '{store_id}' atualizado. Disparando propagação.")
             self._propagate_changes(store_id)
-            return True
+        return True
+
+    @staticmethod
+    def _merge_patch(current: Dict[str, Any], partial_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Novo snapshot com `partial_data` aplicado sobre `current`.
+        Copy-on-write: monta um novo snapshot em vez de alterar o atual, que pode
+        estar sendo lido ou persistido por outra thread; as chaves não tocadas
+        pelo patch são compartilhadas com o snapshot anterior.
+        """
+        new_store_data = dict(current)
+
+        # Lógica de merge inteligente para 'formData'
+        if 'formData' in partial_data and isinstance(partial_data['formData'], dict):
+            current_form_data = new_store_data.get('formData')
+            if not isinstance(current_form_data, dict):
+                current_form_data = {}
+            new_store_data['formData'] = {**current_form_data, **partial_data['formData']}
+
+            # As demais chaves do patch (além de 'formData') são aplicadas com merge simples
+            new_store_data.update({k: v for k, v in partial_data.items() if k != 'formData'})
+        else:
+            new_store_data.update(partial_data) # Merge simples se não houver 'formData' em partial_data
+
+        return freeze(new_store_data)
+
+    def apply_batch(self, operations: List[Dict[str, Any]], propagate: bool = True) -> Dict[str, Any]:
+        """
+        Aplica várias escritas de uma vez: [{'op': 'put'|'patch'|'clear', 'store_id', 'data',
+        'expected_version'}]. Tudo ou nada: os stores são travados juntos, as versões
+        esperadas são conferidas antes de qualquer alteração (VersionConflictError),
+        a gravação usa uma única transação e a propagação roda no máximo uma vez por
+        raiz de dependência. Devolve {'versions': {store_id: versão}, 'propagation': {raiz: relatório}}.
+        """
+        for operation in operations:
+            if operation.get('op') not in ('put', 'patch', 'clear'):
+                raise ValueError(f"Operação de escrita inválida: {operation.get('op')!r}")
+            if operation.get('store_id') not in self.store_definitions:
+                raise ValueError(f"Store '{operation.get('store_id')}' não existe.")
+        store_ids = sorted({operation['store_id'] for operation in operations})
+        for store_id in store_ids:
+            self._ensure_loaded(store_id)
+
+        changed = []
+        with self._locks.write_many(store_ids):
+            for operation in operations:
+                self._check_version(operation['store_id'], operation.get('expected_version'))
+            # Várias operações no mesmo store são aplicadas em sequência e publicadas como uma revisão
+            working = {store_id: self._memory_store.get(store_id, EMPTY) for store_id in store_ids}
+            for operation in operations:
+                store_id = operation['store_id']
+                if operation['op'] == 'put':
+                    working[store_id] = freeze(operation.get('data') or {})
+                elif operation['op'] == 'patch':
+                    working[store_id] = self._merge_patch(working[store_id], operation.get('data') or {})
+                else:
+                    working[store_id] = EMPTY
+            for store_id in store_ids:
+                if self._swap(store_id, working[store_id]):
+                    changed.append(store_id)
+            versions = {store_id: self._revisions.get(store_id, 0) for store_id in store_ids}
+
+        if changed:
+            self._persist_stores(changed)
+        propagation = {}
+        if propagate:
+            for root in self.propagation_engine.propagation_roots(changed):
+                print(f"[MCPDataManager - apply_batch] Disparando propagação para '{root}'.")
+                propagation[root] = self._propagate_changes(root)
+        return {'versions': versions, 'changed': changed, 'propagation': propagation}
+
+    def restore_stores(self, store_ids: List[str], load: Callable[[str], Dict[str, Any]],
+                       propagate: bool = True) -> Dict[str, Any]:
+        """
+        Substitui vários stores de uma vez (restauração de backup), tudo ou nada: os dados vão
+        para o storage numa única transação e só depois do commit são publicados na memória.
+        `load(store_id)` devolve os dados de um store e é chamado duas vezes por store (gravação
+        e publicação), então só um store decodificado fica em memória por vez; um erro em
+        `load` desfaz a transação sem alterar nenhum store.
+        Devolve {'changed': [store_id], 'propagation': {raiz: relatório}}.
+        """
+        for store_id in store_ids:
+            if store_id not in self.store_definitions:
+                raise ValueError(f"Store '{store_id}' não existe.")
+        store_ids = sorted(set(store_ids))
+        for store_id in store_ids:
+            self._ensure_loaded(store_id)
+
+        # Locks de persistência antes dos de escrita (mesma ordem de _persist_stores e get_snapshot)
+        persist_locks = [self._persist_lock(store_id) for store_id in store_ids]
+        for lock in persist_locks:
+            lock.acquire()
+        try:
+            with self._locks.write_many(store_ids):
+                changed = []
+
+                def items():
+                    for store_id in store_ids:
+                        snapshot = freeze(load(store_id))
+                        if not changed_top_level_keys(self._memory_store.get(store_id, EMPTY), snapshot):
+                            continue
+                        changed.append(store_id)
+                        yield self._db_key(store_id), snapshot, self._revisions.get(store_id, 0) + 1
+
+                self._storage.put_many(items())
+                # Gravado: publica na memória com as mesmas revisões
+                for store_id in changed:
+                    self._swap(store_id, freeze(load(store_id)))
+        finally:
+            for lock in reversed(persist_locks):
+                lock.release()
+
+        propagation = {}
+        if propagate:
+            for root in self.propagation_engine.propagation_roots(changed):
+                print(f"[MCPDataManager - restore_stores] Disparando propagação para '{root}'.")
+                propagation[root] = self._propagate_changes(root)
+        return {'changed': changed, 'propagation': propagation}
+
+    def _persist_lock(self, store_id: str) -> threading.Lock:
+        lock = self._persist_locks.get(store_id)
+        if lock is None:
+            with self._persist_locks_guard:
+                lock = self._persist_locks.setdefault(store_id, threading.Lock())
+        return lock
     
     def _persist_store(self, store_id: str):
-        data_json = json.dumps(self._memory_store.get(store_id, {}))
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO data_stores (store_id, data, last_updated, version)
-                VALUES (?, ?, CURRENT_TIMESTAMP, 
-                    COALESCE((SELECT version + 1 FROM data_stores WHERE store_id = ?), 1))
-            ''', (store_id, data_json, store_id))
-            conn.commit()
-
-    def _propagate_changes(self, updated_store_id: str):
-        # Verifica se a propagação automática está habilitada
-        if not self._auto_propagation_enabled:
-            print(f"[MCPDataManager] Propagação automática desabilitada para '{updated_store_id}' - pulando")
+        if self._write_behind is not None:
+            # Coalescido: vários patches no mesmo store viram uma única escrita no próximo flush
+            self._write_behind.mark_dirty(store_id)
             return
+        # O snapshot é lido dentro do lock de persistência, então escritas concorrentes
+        # nunca deixam uma versão antiga por último no banco.
+        with self._persist_lock(store_id):
+            revision, snapshot = self.get_snapshot(store_id, refresh=False)
+            self._storage.put(self._db_key(store_id), snapshot, revision)
 
-        print(f"[MCPDataManager] Iniciando propagação a partir de '{updated_store_id}'")
+    def _persist_stores(self, store_ids):
+        """
+        Persiste o estado atual de vários stores de uma vez (numa única transação no SQLite).
+        Os locks de persistência são tomados antes da transação e em ordem fixa.
+        """
+        store_ids = sorted(set(store_ids))
+        persist_locks = [self._persist_lock(store_id) for store_id in store_ids]
+        for lock in persist_locks:
+            lock.acquire()
+        try:
+            items = []
+            for store_id in store_ids:
+                revision, snapshot = self.get_snapshot(store_id, refresh=False)
+                items.append((self._db_key(store_id), snapshot, revision))
+            self._storage.put_many(items)
+        finally:
+            for lock in reversed(persist_locks):
+                lock.release()
 
-        # Para transformerInputs, só propaga se os dados estão completos o suficiente
-        if updated_store_id == 'transformerInputs':
-            transformer_data = self._memory_store.get('transformerInputs', {})
-            form_data = transformer_data.get('formData', {})
-
-            # Verifica se temos dados mínimos necessários para propagação
-            required_fields = ['potencia_mva', 'tensao_at', 'tensao_bt']
-            missing_fields = [field for field in required_fields if not form_data.get(field)]
-
-            if missing_fields:
-                print(f"[MCPDataManager] Propagação cancelada para '{updated_store_id}' - campos obrigatórios ausentes: {missing_fields}")
-                return
-
-        # Encontra todos os stores que dependem DIRETAMENTE do store atualizado
-        # e que têm um endpoint de atualização.
-        dependent_calls_info = []
-        for store_key, store_def in self.store_definitions.items():
-            if updated_store_id in store_def.get('dependencies', []) and store_def.get('update_logic_endpoint'):
-                dependent_calls_info.append({
-                    "dependent_store_id": store_key,
-                    "endpoint": store_def['update_logic_endpoint'],
-                    "all_dependencies_ids": store_def.get('dependencies', []) # Todas as dependências do store alvo
-                })
-
-        if not dependent_calls_info:
-            print(f"[MCPDataManager] '{updated_store_id}' não tem dependentes diretos com endpoints para propagar.")
-            return
+    def _flush_stores(self, store_ids):
+        """Persiste o estado atual dos stores informados numa única transação (usado pelo write-behind)."""
+        self._persist_stores(store_ids)
 
-        base_url = "http://localhost:8000" # Assume que o servidor FastAPI está rodando aqui
-
-        for call_info in dependent_calls_info:
-            dependent_store_id = call_info["dependent_store_id"]
-            update_endpoint_path = call_info["endpoint"]
-            all_deps_ids_for_target = call_info["all_dependencies_ids"]
-            
-            print(f"[MCPDataManager] Store '{dependent_store_id}' (dependente de '{updated_store_id}') precisa ser recalculado. Endpoint: {update_endpoint_path}")
-            
-            payload_for_dependent_module = {}
-            # 1. Adicionar os 'inputs' do próprio módulo dependente ao payload
-            dependent_module_current_data = self.get_data(dependent_store_id) # Dados atuais do store dependente
-            payload_for_dependent_module['moduleData'] = dependent_module_current_data.get('inputs', {})
-
-            # 2. Adicionar dados de TODAS as suas dependências
-            for dep_id in all_deps_ids_for_target:
-                dependency_data_content = self.get_data(dep_id) # Pega do cache em memória
-                if dep_id == 'transformerInputs':
-                    payload_for_dependent_module['basicData'] = dependency_data_content.get('formData', {})
-                elif dep_id == 'losses': # Específico para temperatureRise
-                    # O service de temperatureRise precisa dos 'results' de 'losses'
-                    payload_for_dependent_module['lossesData'] = dependency_data_content.get('results', {})
-                else:
-                    # Para outras dependências, pode ser necessário enviar 'results' ou o dado completo
-                    # Esta parte pode precisar de ajuste fino dependendo do que cada service espera
-                    payload_for_dependent_module[dep_id] = dependency_data_content.get('results', dependency_data_content)
-            
-            full_url = f"{base_url}/{update_endpoint_path.lstrip('/')}"
-            print(f"[MCPDataManager] Chamando: POST {full_url}")
-            # print(f"[MCPDataManager] Payload para {dependent_store_id}: {json.dumps(payload_for_dependent_module, indent=2)}") # Cuidado com payloads grandes
-
-            try:
-                response = requests.post(full_url, json=payload_for_dependent_module, timeout=10)
-
-                if response.status_code == 200:
-                    print(f"[MCPDataManager] ✅ Sucesso ao chamar {full_url} para '{dependent_store_id}'")
-                else:
-                    print(f"[MCPDataManager] ⚠️ Resposta não-OK de {full_url} para '{dependent_store_id}': {response.status_code}")
-                    try:
-                        error_detail = response.json()
-                        print(f"[MCPDataManager] Detalhes do erro: {error_detail}")
-                    except:
-                        print(f"[MCPDataManager] Resposta não-JSON: {response.text[:200]}")
-
-            except requests.exceptions.Timeout:
-                print(f"[MCPDataManager] ⏱️ Timeout ao chamar {full_url} para '{dependent_store_id}' (>10s)")
-            except requests.exceptions.ConnectionError:
-                print(f"[MCPDataManager] 🔌 Erro de conexão ao chamar {full_url} para '{dependent_store_id}'")
-            except requests.exceptions.RequestException as e:
-                print(f"[MCPDataManager] 🌐 Erro HTTP ao chamar {full_url} para '{dependent_store_id}': {e}")
-            except Exception as e:
-                print(f"[MCPDataManager] ❌ Erro inesperado ao processar propagação para '{dependent_store_id}' via {full_url}: {e}")
-        
-        print(f"[MCPDataManager] Fim da propagação de mudanças para '{updated_store_id}'")
+    def get_version(self, store_id: str) -> int:
+        """Revisão atual do store em memória (igual à versão persistida fora do modo write-behind)."""
+        with self._locks.read(store_id):
+            return self._revisions.get(store_id, 0)
+
+    def list_store_versions(self, store_id: str) -> list:
+        """Histórico de versões do store (deltas e checkpoints)."""
+        return self._storage.list_versions(self._db_key(store_id))
+
+    def get_data_at_version(self, store_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Reconstrói o store numa versão passada (None se a versão não existir)."""
+        if store_id not in self.store_definitions:
+            return None
+        return self._storage.get_at_version(self._db_key(store_id), version)
+
+    def _propagate_changes(self, updated_store_id, force: bool = False, only_stale: bool = False) -> Dict[str, Any]:
+        """
+        Recalcula os stores dependentes de `updated_store_id` (ou de uma lista de
+        stores) via PropagationEngine. Com `only_stale`, pula os módulos já
+        atualizados. Retorna o relatório da propagação com o tempo gasto por módulo.
+        """
+        # Verifica se a propagação automática está habilitada
+        if not self._auto_propagation_enabled and not force:
+            print(f"[MCPDataManager] Propagação automática desabilitada para '{updated_store_id}' - pulando")
+            return {'source': updated_store_id, 'status': 'disabled', 'modules': {}}
+
+        print(f"[MCPDataManager] Iniciando propagação a partir de '{updated_store_id}'")
+        report = self.propagation_engine.propagate(updated_store_id, only_stale=only_stale)
+        if report['status'] == 'cancelled':
+            print(f"[MCPDataManager] Propagação cancelada para '{updated_store_id}' - {report.get('reason')}")
+        else:
+            print(f"[MCPDataManager] Fim da propagação de mudanças para '{updated_store_id}' ({report['total_ms']:.1f} ms)")
+        return report
 
     def get_all_stores(self) -> Dict[str, Dict[str, Any]]:
-        with self._lock:
-            return {store_id: data.copy() for store_id, data in self._memory_store.items()}
+        """
+        Snapshot consistente de todos os stores: os locks de leitura de todos são
+        tomados juntos, então nenhuma escrita fica pela metade no resultado
+        (isolamento de snapshot para backups, sessões e relatórios). Sem cópias.
+        """
+        self.refresh_dirty()
+        return self._all_snapshots()[1]
 
-    def clear_store(self, store_id: str) -> bool:
-        with self._lock:
-            if store_id not in self.store_definitions:
-                return False
-            self._memory_store[store_id] = {}
-            self._persist_store(store_id)
-            # Propagar a limpeza? Geralmente não, a menos que seja um reset.
-            # self._propagate_changes(store_id) # Descomentar se necessário
-            return True
+    def _all_snapshots(self) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]]]:
+        """(revisões, snapshots) de todos os stores, lidos sob os locks de leitura de todos."""
+        store_ids = self._store_ids()
+        for store_id in store_ids:
+            self._ensure_loaded(store_id)
+        with self._locks.read_many(store_ids):
+            revisions = {store_id: self._revisions.get(store_id, 0) for store_id in store_ids}
+            return revisions, {store_id: self._memory_store[store_id] for store_id in store_ids}
+
+    def clear_store(self, store_id: str, expected_version: Optional[int] = None) -> bool:
+        if store_id not in self.store_definitions:
+            return False
+        self._ensure_loaded(store_id)
+        with self._locks.write(store_id):
+            self._check_version(store_id, expected_version)
+            self._swap(store_id, EMPTY)
+        self._persist_store(store_id)
+        # Propagar a limpeza? Geralmente não, a menos que seja um reset.
+        # self._propagate_changes(store_id) # Descomentar se necessário
+        return True
 
     def clear_all_stores(self) -> bool:
-        with self._lock:
-            all_cleared = True
-            for store_id in self.store_definitions:
-                if not self.clear_store(store_id): # clear_store já persiste e pode propagar
-                    all_cleared = False
-            return all_cleared
-
-    # Métodos de sessão (save_session, load_session, list_sessions) permanecem iguais
+        all_cleared = True
+        for store_id in self.store_definitions:
+            if not self.clear_store(store_id): # clear_store já persiste
+                all_cleared = False
+        return all_cleared
+
+    # Sessões: snapshot de todos os stores do projeto, gravado pelo backend
     def save_session(self, session_id: str, description: str = "") -> bool:
-        session_data = {
-            'stores': self.get_all_stores(),
-            'timestamp': datetime.now().isoformat()
-        }
-        session_json = json.dumps(session_data)
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO sessions (session_id, session_data, created_at, description)
-                VALUES (?, ?, CURRENT_TIMESTAMP, ?)
-            ''', (session_id, session_json, description))
-            conn.commit()
+        self.refresh_dirty()
+        revisions, stores = self._all_snapshots()
+        self._storage.save_session(self._db_key(session_id), stores, description, revisions)
         return True
 
     def load_session(self, session_id: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT session_data FROM sessions WHERE session_id = ?', (session_id,))
-            result = cursor.fetchone()
-            if not result: return False
-            try:
-                session_data = json.loads(result[0])
-                stores_to_load = session_data.get('stores', {})
-                with self._lock: # Garantir que o carregamento seja atômico em relação a outras operações
-                    self._memory_store.clear() # Limpa o estado atual da memória
-                    self._memory_store.update(stores_to_load) # Carrega todos os stores da sessão
-                    # Persiste cada store individualmente e dispara propagações
-                    for store_id_loaded, data_loaded in stores_to_load.items():
-                        if store_id_loaded in self.store_definitions: # Apenas se o store ainda é definido
-                            self._persist_store(store_id_loaded) # Persiste
-                            # Dispara propagação para cada store principal carregado
-                            # TransformerInputs é o mais importante para disparar primeiro
-                    if 'transformerInputs' in stores_to_load:
-                        print(f"[MCPDataManager - load_session] Disparando propagação para 'transformerInputs' após carregar sessão.")
-                        self._propagate_changes('transformerInputs')
-                    else: # Se não houver transformerInputs, propaga para outros que possam ter sido carregados
-                        for store_id_loaded in stores_to_load:
-                             if store_id_loaded in self.store_definitions:
-                                print(f"[MCPDataManager - load_session] Disparando propagação para '{store_id_loaded}' após carregar sessão.")
-                                self._propagate_changes(store_id_loaded)
-
-                return True
-            except json.JSONDecodeError:
-                return False
-    
+        """
+        Substitui todos os stores pelos da sessão de uma vez: os snapshots são
+        trocados com os locks de escrita de todos os stores, só os que mudaram são
+        persistidos (numa única transação) e a propagação roda no máximo uma vez,
+        recalculando apenas os módulos cujos resultados não correspondem às entradas.
+        """
+        stores_to_load = self._storage.load_session(self._db_key(session_id))
+        if stores_to_load is None:
+            return False
+        snapshots = {store_id: freeze(stores_to_load.get(store_id, {})) for store_id in self.store_definitions}
+        for store_id in snapshots:
+            self._ensure_loaded(store_id)
+        changed = []
+        with self._locks.write_many(list(snapshots)):
+            for store_id, snapshot in snapshots.items():
+                if self._swap(store_id, snapshot):
+                    changed.append(store_id)
+        # Persiste fora dos locks de leitura/escrita, numa única transação
+        if changed:
+            self._persist_stores(changed)
+        roots = self.propagation_engine.propagation_roots(changed)
+        if roots:
+            print(f"[MCPDataManager - load_session] Sessão '{session_id}' carregada. Recalculando módulos desatualizados a partir de {roots}.")
+            self._propagate_changes(roots, only_stale=True)
+        return True
+
     def list_sessions(self) -> list:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT session_id, created_at, description FROM sessions ORDER BY created_at DESC')
-            return [{'session_id': row[0], 'created_at': row[1], 'description': row[2]} for row in cursor.fetchall()]
\ No newline at end of file
+        return self._storage.list_sessions(self._key_prefix)
+
+    def session_manifest(self, session_id: str) -> Optional[Dict[str, str]]:
+        """{store_id: hash do conteúdo} da sessão salva (None se não existir); não toca nos stores em memória."""
+        return self._storage.session_manifest(self._db_key(session_id))
+
+    def load_session_store(self, session_id: str, store_id: str) -> Optional[Dict[str, Any]]:
+        """Um store da sessão salva, lido direto do armazenamento (sem carregar a sessão)."""
+        return self._storage.load_session_store(self._db_key(session_id), store_id)
+
+    def search_sessions(self, query: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Página do catálogo de sessões do projeto ({'sessions', 'next_cursor'}); ValueError se o cursor for inválido."""
+        return self._storage.search_sessions(self._key_prefix, query, limit, cursor)
+
+    def delete_session(self, session_id: str) -> bool:
+        return self._storage.delete_session(self._db_key(session_id))
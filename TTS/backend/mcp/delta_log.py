@@ -0,0 +1,242 @@
+# backend/mcp/delta_log.py
+"""
+Log de deltas por versão dos stores do MCP.
+
+Em vez de regravar o JSON completo a cada alteração, cada nova versão de um
+store grava apenas as chaves alteradas em `data_store_deltas`. A cada
+CHECKPOINT_INTERVAL versões (ou quando os deltas acumulados passam do tamanho
+do último checkpoint) o store completo é gravado em `data_stores` e em
+`data_store_checkpoints`.
+
+O estado atual de um store é o último checkpoint mais os deltas posteriores;
+qualquer versão antiga é reconstruída a partir do checkpoint mais próximo,
+aplicando no máximo CHECKPOINT_INTERVAL deltas. Os números de versão seguem a
+revisão em memória do MCPDataManager; no modo write-behind revisões
+intermediárias coalescidas não chegam ao banco.
+
+Formato do delta: lista de operações
+    ["set", ["formData", "potencia_mva"], 300.0]
+    ["del", ["results", "obsoleto"]]
+Listas são tratadas como valores atômicos (substituídas por inteiro).
+"""
+
+import copy
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection import UPSERT_STORE_SQL
+from .snapshot import freeze
+
+# Número máximo de deltas entre dois checkpoints
+CHECKPOINT_INTERVAL = 32
+
+# Marcador de "chave inexistente" usado no diff
+_MISSING = object()
+
+
+def compute_delta(old: Any, new: Any, path: Optional[List[str]] = None) -> List[list]:
+    """Diferença estrutural entre dois valores JSON (dicts são comparados chave a chave)."""
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[list] = []
+        for key, value in new.items():
+            old_value = old.get(key, _MISSING)
+            if old_value is _MISSING:
+                ops.append(['set', path + [key], value])
+            elif old_value != value:
+                ops.extend(compute_delta(old_value, value, path + [key]))
+        for key in old:
+            if key not in new:
+                ops.append(['del', path + [key]])
+        return ops
+    if old == new:
+        return []
+    return [['set', path, new]]
+
+
+def apply_delta(base: Dict[str, Any], delta: List[list]) -> Dict[str, Any]:
+    """Aplica um delta sobre `base` (modifica e devolve o próprio dict)."""
+    for op in delta:
+        kind, path = op[0], op[1]
+        if not path:
+            # Substituição do store inteiro
+            base = copy.deepcopy(op[2]) if kind == 'set' else {}
+            continue
+        target = base
+        for key in path[:-1]:
+            child = target.get(key)
+            if not isinstance(child, dict):
+                child = {}
+                target[key] = child
+            target = child
+        if kind == 'set':
+            target[path[-1]] = copy.deepcopy(op[2])
+        else:
+            target.pop(path[-1], None)
+    return base
+
+
+class DeltaLog:
+    """
+    Mantém o último estado persistido de cada store e grava as novas versões
+    como deltas ou checkpoints. Todas as operações recebem a conexão da
+    transação corrente do MCPDataManager.
+    """
+
+    def __init__(self, checkpoint_interval: int = CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self._lock = threading.Lock()
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._version: Dict[str, int] = {}
+        self._checkpoint_version: Dict[str, int] = {}
+        self._deltas_since_checkpoint: Dict[str, int] = {}
+        self._checkpoint_size: Dict[str, int] = {}
+        self._delta_bytes: Dict[str, int] = {}
+
+    @staticmethod
+    def init_schema(conn: sqlite3.Connection):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS data_store_deltas (
+                store_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                delta TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (store_id, version)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS data_store_checkpoints (
+                store_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (store_id, version)
+            )
+        ''')
+
+    def version(self, store_id: str) -> int:
+        """Versão atual persistida do store (0 se nunca foi gravado)."""
+        return self._version.get(store_id, 0)
+
+    def hydrate(self, conn: sqlite3.Connection, store_id: str, checkpoint: Dict[str, Any],
+                checkpoint_version: int, checkpoint_size: int) -> Tuple[int, Dict[str, Any]]:
+        """
+        Reconstrói o estado atual a partir do checkpoint de data_stores e dos deltas
+        posteriores. Devolve (versão, snapshot imutável).
+        """
+        data = checkpoint
+        version = checkpoint_version
+        delta_bytes = 0
+        rows = conn.execute(
+            'SELECT version, delta FROM data_store_deltas WHERE store_id = ? AND version > ? ORDER BY version',
+            (store_id, checkpoint_version)
+        ).fetchall()
+        for row_version, delta_json in rows:
+            data = apply_delta(data, json.loads(delta_json))
+            version = row_version
+            delta_bytes += len(delta_json)
+        data = freeze(data)
+        with self._lock:
+            self._last[store_id] = data
+            self._version[store_id] = version
+            self._checkpoint_version[store_id] = checkpoint_version
+            self._deltas_since_checkpoint[store_id] = len(rows)
+            self._checkpoint_size[store_id] = checkpoint_size
+            self._delta_bytes[store_id] = delta_bytes
+        return version, data
+
+    def record(self, conn: sqlite3.Connection, store_id: str, data: Dict[str, Any],
+               version: Optional[int] = None) -> int:
+        """
+        Grava a nova versão de `data` (delta ou checkpoint) e devolve o número da versão.
+        `version` é a revisão em memória do snapshot; se omitida, usa a próxima sequencial.
+        Se nada mudou em relação à última versão persistida, não grava nada.
+        """
+        data = freeze(data)
+        with self._lock:
+            last = self._last.get(store_id)
+            current_version = self._version.get(store_id, 0)
+            if last is data:
+                return current_version  # Mesmo snapshot já persistido
+            delta = compute_delta(last, data) if last is not None else None
+            if delta == []:
+                self._last[store_id] = data
+                return current_version
+
+            new_version = version if version is not None and version > current_version else current_version + 1
+            delta_json = json.dumps(delta) if delta is not None else None
+            since_checkpoint = self._deltas_since_checkpoint.get(store_id, 0) + 1
+            accumulated = self._delta_bytes.get(store_id, 0) + len(delta_json or '')
+            needs_checkpoint = (
+                delta is None
+                or since_checkpoint >= self.checkpoint_interval
+                or accumulated > self._checkpoint_size.get(store_id, 0)
+            )
+
+            if delta_json is not None:
+                conn.execute('INSERT OR REPLACE INTO data_store_deltas (store_id, version, delta) VALUES (?, ?, ?)',
+                             (store_id, new_version, delta_json))
+            if needs_checkpoint:
+                data_json = json.dumps(data)
+                conn.execute(UPSERT_STORE_SQL, (store_id, data_json, new_version))
+                conn.execute('INSERT OR REPLACE INTO data_store_checkpoints (store_id, version, data) VALUES (?, ?, ?)',
+                             (store_id, new_version, data_json))
+                self._checkpoint_version[store_id] = new_version
+                self._deltas_since_checkpoint[store_id] = 0
+                self._checkpoint_size[store_id] = len(data_json)
+                self._delta_bytes[store_id] = 0
+            else:
+                self._deltas_since_checkpoint[store_id] = since_checkpoint
+                self._delta_bytes[store_id] = accumulated
+
+            # Snapshots são imutáveis: basta guardar a referência
+            self._last[store_id] = data
+            self._version[store_id] = new_version
+            return new_version
+
+    def forget(self, store_id: str):
+        """Descarta o estado em cache (a próxima gravação será um checkpoint)."""
+        with self._lock:
+            self._last.pop(store_id, None)
+
+    @staticmethod
+    def list_versions(conn: sqlite3.Connection, store_id: str) -> List[Dict[str, Any]]:
+        """Versões conhecidas do store, marcando quais são checkpoints."""
+        checkpoints = {v for (v,) in conn.execute(
+            'SELECT version FROM data_store_checkpoints WHERE store_id = ?', (store_id,))}
+        rows = conn.execute('''
+            SELECT version, created_at, length(delta) FROM data_store_deltas WHERE store_id = ?
+            UNION
+            SELECT version, created_at, 0 FROM data_store_checkpoints WHERE store_id = ?
+            ORDER BY version
+        ''', (store_id, store_id)).fetchall()
+        versions: Dict[int, Dict[str, Any]] = {}
+        for version, created_at, delta_size in rows:
+            entry = versions.setdefault(version, {'version': version, 'created_at': created_at,
+                                                  'checkpoint': version in checkpoints, 'delta_bytes': 0})
+            entry['delta_bytes'] = max(entry['delta_bytes'], delta_size or 0)
+        return list(versions.values())
+
+    @staticmethod
+    def reconstruct(conn: sqlite3.Connection, store_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """
+        Reconstrói o store na versão pedida (None se não houver checkpoint até ela).
+        Uma versão não gravada (coalescida pelo write-behind) resolve para a última gravada antes dela.
+        """
+        row: Optional[Tuple[int, str]] = conn.execute('''
+            SELECT version, data FROM data_store_checkpoints
+            WHERE store_id = ? AND version <= ? ORDER BY version DESC LIMIT 1
+        ''', (store_id, version)).fetchone()
+        if row is None:
+            return None
+        checkpoint_version, data_json = row
+        data = json.loads(data_json)
+        rows = conn.execute('''
+            SELECT version, delta FROM data_store_deltas
+            WHERE store_id = ? AND version > ? AND version <= ? ORDER BY version
+        ''', (store_id, checkpoint_version, version)).fetchall()
+        for _, delta_json in rows:
+            data = apply_delta(data, json.loads(delta_json))
+        return data
@@ -0,0 +1,356 @@
+# backend/mcp/file_storage.py
+"""
+Backend de arquivos só com appends: um arquivo NDJSON por store.
+
+    <diretório>/stores/<chave>.ndjson
+        {"version": 1, "at": "...", "full": {...}}              checkpoint
+        {"version": 2, "at": "...", "delta": [["set", [...], 3]]} delta
+    <diretório>/sessions/<chave>.ndjson
+        {"session_id": "...", "created_at": "...", "description": "...", "catalog": {...}, "hashes": {...}}
+        {"stores": {...}}
+
+Cada gravação acrescenta uma linha ao arquivo do store (delta em relação à
+versão anterior, ou checkpoint completo a cada CHECKPOINT_INTERVAL versões)
+e nunca reescreve dados já gravados; uma linha incompleta no fim do arquivo
+(queda no meio da escrita) é ignorada na leitura e cortada do arquivo antes
+do próximo append, para que a linha nova não seja colada nela. Quando o arquivo passa de
+COMPACT_RECORDS linhas, ele é reescrito a partir do último checkpoint
+(arquivo temporário + os.replace, atômico).
+
+Não depende de SQLite: útil em sistemas de arquivos de rede e para inspecionar
+ou versionar os stores com ferramentas de texto.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .delta_log import CHECKPOINT_INTERVAL, apply_delta, compute_delta
+from .session_blobs import store_hash
+from .session_catalog import catalog_fields, matches, paginate, query_tokens, search_text
+from .snapshot import freeze
+from .storage import NAMESPACE_SEPARATOR, in_namespace, namespace_of
+
+# Linhas por arquivo de store antes da compactação
+COMPACT_RECORDS = 256
+
+# Extensão dos arquivos de stores e sessões
+FILE_SUFFIX = '.ndjson'
+
+
+def _file_name(key: str) -> str:
+    # Chaves de projeto têm ':' (inválido no Windows): o nome do arquivo é a chave codificada
+    return quote(key, safe='') + FILE_SUFFIX
+
+
+def _key_from_file(file_name: str) -> str:
+    return unquote(file_name[:-len(FILE_SUFFIX)])
+
+
+def _read_valid(path: str) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Linhas válidas do arquivo, o byte em que elas terminam e o tamanho do arquivo."""
+    records = []
+    end = size = 0
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                size += len(line)
+                if end < size - len(line):
+                    continue  # Depois de uma linha inválida: só conta o tamanho
+                if not line.endswith(b'\n'):
+                    continue  # Escrita interrompida: o registro não chegou inteiro
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[AppendOnlyFileStorage] Linha inválida em '{path}'. Ignorando o restante do arquivo.")
+                    continue
+                end = size
+    except FileNotFoundError:
+        pass
+    return records, end, size
+
+
+def _read_records(path: str) -> List[Dict[str, Any]]:
+    """Linhas válidas do arquivo (uma linha final incompleta é descartada)."""
+    return _read_valid(path)[0]
+
+
+def _last_record(path: str, block_size: int = 4096) -> Optional[Dict[str, Any]]:
+    """Último registro completo do arquivo, lido de trás para frente (sem ler o arquivo inteiro)."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            buffer = b''
+            position = end
+            while position > 0:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                buffer = f.read(step) + buffer
+                lines = buffer.split(b'\n')
+                # lines[-1] é o que vem depois do último '\n' (vazio ou linha incompleta)
+                complete = lines[1:-1] if position > 0 else lines[:-1]
+                for line in reversed(complete):
+                    if line.strip():
+                        try:
+                            return json.loads(line)
+                        except json.JSONDecodeError:
+                            return None
+            return None
+    except FileNotFoundError:
+        return None
+
+
+def _rebuild(records: List[Dict[str, Any]], up_to: Optional[int] = None) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """Estado a partir do último checkpoint (até a versão `up_to`) e dos deltas seguintes."""
+    if up_to is not None:
+        records = [record for record in records if record.get('version', 0) <= up_to]
+    start = None
+    for index in range(len(records) - 1, -1, -1):
+        if 'full' in records[index]:
+            start = index
+            break
+    if start is None:
+        return None
+    data = records[start]['full']
+    version = records[start]['version']
+    for record in records[start + 1:]:
+        data = apply_delta(data, record.get('delta') or [])
+        version = record['version']
+    return version, data
+
+
+class AppendOnlyFileStorage:
+    """StorageBackend com um arquivo NDJSON só de appends por store."""
+
+    name = 'file'
+
+    def __init__(self, directory: Optional[str] = None, fsync: bool = False,
+                 checkpoint_interval: int = CHECKPOINT_INTERVAL, compact_records: int = COMPACT_RECORDS):
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                     'tts_data_files')
+        self.directory = directory
+        self.fsync = fsync  # True: os.fsync a cada gravação (mais lento, resiste a queda de energia)
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self.compact_records = max(self.checkpoint_interval, compact_records)
+        self._stores_dir = os.path.join(directory, 'stores')
+        self._sessions_dir = os.path.join(directory, 'sessions')
+        self._lock = threading.Lock()
+        # Estado do último registro de cada store: (versão, snapshot, deltas desde o checkpoint, linhas no arquivo)
+        self._state: Dict[str, Tuple[int, Dict[str, Any], int, int]] = {}
+
+    def init(self) -> None:
+        os.makedirs(self._stores_dir, exist_ok=True)
+        os.makedirs(self._sessions_dir, exist_ok=True)
+
+    def _store_path(self, key: str) -> str:
+        return os.path.join(self._stores_dir, _file_name(key))
+
+    def _session_path(self, key: str) -> str:
+        return os.path.join(self._sessions_dir, _file_name(key))
+
+    def _keys(self, directory: str) -> List[str]:
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return [_key_from_file(name) for name in names if name.endswith(FILE_SUFFIX)]
+
+    def list_stores(self, prefix: str = '') -> Dict[str, int]:
+        stores = {}
+        for key in self._keys(self._stores_dir):
+            if not in_namespace(key, prefix):
+                continue
+            last = _last_record(self._store_path(key))
+            if last is not None:
+                stores[key] = last.get('version', 0)
+        return stores
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            return self._load(key)
+
+    def _load(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Lê o arquivo do store e guarda o estado da última versão (chamado com self._lock)."""
+        path = self._store_path(key)
+        records, end, size = _read_valid(path)
+        if end < size:
+            # Cauda rasgada (queda no meio de um append): corta o arquivo no último registro completo,
+            # senão o próximo append seria colado nela e tudo dali em diante ficaria ilegível
+            print(f"[AppendOnlyFileStorage] Descartando {size - end} bytes incompletos no fim de '{path}'.")
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+        rebuilt = _rebuild(records)
+        if rebuilt is None:
+            return None
+        version, data = rebuilt
+        data = freeze(data)
+        since_checkpoint = len(records) - 1 - max(i for i, record in enumerate(records) if 'full' in record)
+        self._state[key] = (version, data, since_checkpoint, len(records))
+        return version, data
+
+    def _append(self, key: str, data: Dict[str, Any], version: int):
+        """Acrescenta a versão ao arquivo do store (chamado com self._lock)."""
+        data = freeze(data)
+        state = self._state.get(key)
+        if state is None and os.path.exists(self._store_path(key)):
+            # Store gravado numa execução anterior e ainda não lido: parte do estado do arquivo
+            self._load(key)
+            state = self._state.get(key)
+        if state is not None:
+            last_version, last_data, since_checkpoint, lines = state
+            if last_data is data:
+                return
+            delta = compute_delta(last_data, data)
+            if delta == []:
+                self._state[key] = (last_version, data, since_checkpoint, lines)
+                return
+            version = version if version > last_version else last_version + 1
+        else:
+            delta, since_checkpoint, lines = None, 0, 0
+
+        path = self._store_path(key)
+        if lines + 1 > self.compact_records:
+            # Compactação: o arquivo recomeça com um checkpoint da versão nova
+            self._write_atomic(path, [{'version': version, 'at': datetime.now().isoformat(), 'full': data}])
+            self._state[key] = (version, data, 0, 1)
+            return
+        if delta is None or since_checkpoint + 1 >= self.checkpoint_interval:
+            record = {'version': version, 'at': datetime.now().isoformat(), 'full': data}
+            since_checkpoint = 0
+        else:
+            record = {'version': version, 'at': datetime.now().isoformat(), 'delta': delta}
+            since_checkpoint += 1
+        with open(path, 'ab') as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except BaseException:
+                # Falha no meio da escrita (ex.: disco cheio): não deixa uma linha parcial no arquivo
+                f.truncate(start)
+                raise
+        self._state[key] = (version, data, since_checkpoint, lines + 1)
+
+    def _write_atomic(self, path: str, records: List[Dict[str, Any]]):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for record in records:
+                f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def put(self, key: str, data: Dict[str, Any], version: int) -> None:
+        with self._lock:
+            self._append(key, data, version)
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any], int]]) -> None:
+        # Sem transação entre arquivos: cada store é gravado (e sobrevive a quedas) independentemente
+        with self._lock:
+            for key, data, version in items:
+                self._append(key, data, version)
+
+    def list_versions(self, key: str) -> List[Dict[str, Any]]:
+        return [{'version': record['version'], 'created_at': record.get('at'), 'checkpoint': 'full' in record,
+                 'delta_bytes': len(json.dumps(record['delta'])) if 'delta' in record else 0}
+                for record in _read_records(self._store_path(key))]
+
+    def get_at_version(self, key: str, version: int) -> Optional[Dict[str, Any]]:
+        rebuilt = _rebuild(_read_records(self._store_path(key)), up_to=version)
+        return rebuilt[1] if rebuilt is not None else None
+
+    def save_session(self, key: str, stores: Dict[str, Dict[str, Any]], description: str = '',
+                     revisions: Optional[Dict[str, int]] = None) -> None:
+        session_id = key[len(namespace_of(key)):]
+        header = {'session_id': session_id, 'created_at': datetime.now().isoformat(), 'description': description,
+                  'catalog': catalog_fields(stores),
+                  'hashes': {store_id: store_hash(data) for store_id, data in stores.items()}}
+        self._write_atomic(self._session_path(key),
+                           [header, {'stores': dict(stores)}])
+
+    def load_session(self, key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        records = _read_records(self._session_path(key))
+        if len(records) < 2:
+            return None
+        return {store_id: freeze(data) for store_id, data in (records[1].get('stores') or {}).items()}
+
+    def session_manifest(self, key: str) -> Optional[Dict[str, str]]:
+        try:
+            with open(self._session_path(key), 'rb') as f:
+                header = json.loads(f.readline())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if 'hashes' in header:
+            return dict(header['hashes'])
+        # Sessão gravada antes dos hashes no cabeçalho: calcula a partir dos stores
+        records = _read_records(self._session_path(key))
+        if len(records) < 2:
+            return None
+        return {store_id: store_hash(data) for store_id, data in (records[1].get('stores') or {}).items()}
+
+    def load_session_store(self, key: str, store_id: str) -> Optional[Dict[str, Any]]:
+        records = _read_records(self._session_path(key))
+        if len(records) < 2:
+            return None
+        data = (records[1].get('stores') or {}).get(store_id)
+        return freeze(data) if data is not None else None
+
+    def _session_headers(self, prefix: str) -> List[Tuple[str, Dict[str, Any]]]:
+        headers = []
+        for key in self._keys(self._sessions_dir):
+            if not in_namespace(key, prefix):
+                continue
+            # Só a primeira linha (cabeçalho) é lida
+            try:
+                with open(self._session_path(key), 'rb') as f:
+                    header = json.loads(f.readline())
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            headers.append((key[len(prefix):], header))
+        return headers
+
+    def list_sessions(self, prefix: str = '') -> List[Dict[str, Any]]:
+        sessions = [{'session_id': session_id, 'created_at': header.get('created_at'),
+                     'description': header.get('description')}
+                    for session_id, header in self._session_headers(prefix)]
+        return sorted(sessions, key=lambda session: session['created_at'] or '', reverse=True)
+
+    def search_sessions(self, prefix: str = '', query: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        tokens = query_tokens(query)
+        sessions = [{'session_id': session_id, 'created_at': header.get('created_at'),
+                     'description': header.get('description')}
+                    for session_id, header in self._session_headers(prefix)
+                    if matches(search_text(session_id, header.get('description'), header.get('catalog') or {},
+                                           header.get('created_at')), tokens)]
+        return paginate(sessions, limit, cursor)
+
+    def delete_session(self, key: str) -> bool:
+        try:
+            os.remove(self._session_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list_namespaces(self) -> List[str]:
+        prefixes = {namespace_of(key) for key in self._keys(self._stores_dir)}
+        return sorted(prefix[:-len(NAMESPACE_SEPARATOR)] for prefix in prefixes if prefix)
+
+    def size_bytes(self) -> int:
+        total = 0
+        for directory in (self._stores_dir, self._sessions_dir):
+            for key in self._keys(directory):
+                total += os.path.getsize(os.path.join(directory, _file_name(key)))
+        return total
+
+    def close(self) -> None:
+        pass
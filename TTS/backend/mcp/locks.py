@@ -0,0 +1,115 @@
+# backend/mcp/locks.py
+"""
+Locks de leitura/escrita por store do MCP.
+
+Leituras do mesmo store rodam em paralelo; uma escrita espera as leituras em
+andamento e bloqueia novas leituras enquanto aguarda (preferência para
+escritores, para que uma sequência contínua de GETs não impeça um PATCH).
+Stores diferentes têm locks independentes.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator
+
+
+class ReadWriteLock:
+    """Lock de leitura/escrita não reentrante com preferência para escritores."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class StoreLockTable:
+    """Um ReadWriteLock por store_id, criado sob demanda."""
+
+    def __init__(self):
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, store_id: str) -> ReadWriteLock:
+        lock = self._locks.get(store_id)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(store_id, ReadWriteLock())
+        return lock
+
+    def read(self, store_id: str):
+        return self.get(store_id).read()
+
+    def write(self, store_id: str):
+        return self.get(store_id).write()
+
+    @contextmanager
+    def read_many(self, store_ids: Iterable[str]) -> Iterator[None]:
+        """Trava vários stores para leitura ao mesmo tempo (visão consistente entre stores)."""
+        locks = [self.get(store_id) for store_id in sorted(set(store_ids))]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire_read()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release_read()
+
+    @contextmanager
+    def write_many(self, store_ids: Iterable[str]) -> Iterator[None]:
+        """Trava vários stores para escrita, sempre na mesma ordem (evita deadlock)."""
+        locks = [self.get(store_id) for store_id in sorted(set(store_ids))]
+        acquired = []
+        try:
+            for lock in locks:
+                lock.acquire_write()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release_write()
@@ -0,0 +1,93 @@
+# backend/mcp/projects.py
+"""
+Registro de projetos (transformadores) ativos no MCP.
+
+Cada projeto tem o seu próprio MCPDataManager: stores em memória, locks por
+store, revisões, feed de alterações e motor de propagação independentes.
+Todos compartilham o mesmo backend de armazenamento (o tts_data.db e o seu
+pool de conexões, por padrão); no backend as chaves dos stores e das sessões
+de um projeto levam o prefixo "<projeto>::", e o projeto padrão usa as chaves
+antigas, sem prefixo.
+
+Trocar de projeto é só escolher outro manager: nada é recarregado nem
+regravado.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from .data_manager import MCPDataManager
+from .storage import StorageBackend
+
+# Identificadores aceitos para projetos (usados como prefixo de chave no banco)
+PROJECT_ID_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+# Nome do projeto padrão (stores sem prefixo no banco)
+DEFAULT_PROJECT = 'default'
+
+
+def normalize_project_id(project_id: Optional[str]) -> Optional[str]:
+    """None para o projeto padrão; levanta ValueError se o identificador for inválido."""
+    if project_id is None:
+        return None
+    project_id = project_id.strip()
+    if not project_id or project_id == DEFAULT_PROJECT:
+        return None
+    if not PROJECT_ID_PATTERN.match(project_id):
+        raise ValueError(f"Identificador de projeto inválido: '{project_id}' "
+                         "(use letras, números, '.', '_' ou '-', até 64 caracteres)")
+    return project_id
+
+
+class ProjectRegistry:
+    """Cria sob demanda e mantém um MCPDataManager por projeto."""
+
+    def __init__(self, db_path: Optional[str] = None, storage: Optional[StorageBackend] = None,
+                 **manager_kwargs: Any):
+        self._manager_kwargs = manager_kwargs
+        self._guard = threading.Lock()
+        self.default = MCPDataManager(db_path, storage=storage, **manager_kwargs)
+        self._storage: StorageBackend = self.default.storage
+        self._managers: Dict[str, MCPDataManager] = {}
+
+    @property
+    def db_path(self) -> str:
+        return self.default.db_path
+
+    def get(self, project_id: Optional[str] = None) -> MCPDataManager:
+        """Manager do projeto (criado no primeiro acesso). None ou 'default' = projeto padrão."""
+        project_id = normalize_project_id(project_id)
+        if project_id is None:
+            return self.default
+        manager = self._managers.get(project_id)
+        if manager is None:
+            with self._guard:
+                manager = self._managers.get(project_id)
+                if manager is None:
+                    manager = MCPDataManager(project_id=project_id, storage=self._storage,
+                                             **self._manager_kwargs)
+                    if self.default._auto_propagation_enabled:
+                        manager.enable_auto_propagation()
+                    self._managers[project_id] = manager
+        return manager
+
+    def list_projects(self) -> List[Dict[str, Any]]:
+        """Projetos com dados no backend ou ativos em memória."""
+        stored = set(self._storage.list_namespaces())
+        active = set(self._managers)
+        projects = [{'project_id': DEFAULT_PROJECT, 'active': True, 'persisted': True}]
+        for project_id in sorted(stored | active):
+            projects.append({'project_id': project_id, 'active': project_id in active,
+                             'persisted': project_id in stored})
+        return projects
+
+    def managers(self) -> List[MCPDataManager]:
+        return [self.default, *self._managers.values()]
+
+    def close(self):
+        """Grava o que estiver pendente em todos os projetos e fecha o backend."""
+        for manager in list(self._managers.values()):
+            manager.close()
+        self.default.close()
+        self._storage.close()  # O backend é compartilhado: fecha por último
@@ -0,0 +1,394 @@
+# backend/mcp/propagation.py
+"""
+Motor de propagação em processo do MCP.
+
+Substitui as chamadas HTTP de loopback (requests.post para
+http://localhost:8000/...) por chamadas diretas aos services. Cada
+`update_logic_endpoint` de `store_definitions` é a chave de um handler no
+registro; o handler recebe o payload montado pelo MCPDataManager e devolve o
+patch a ser aplicado no store dependente.
+
+Cada resultado gravado leva a impressão digital (hash) das entradas usadas no
+cálculo (`inputsFingerprint`). Com `only_stale=True` (usado ao carregar
+sessões), um módulo cujas entradas atuais têm a mesma impressão digital já
+está atualizado e não é recalculado.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from .session_blobs import store_hash
+
+ModuleHandler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# Campos mínimos de transformerInputs para que a propagação faça sentido
+REQUIRED_TRANSFORMER_FIELDS = ['potencia_mva', 'tensao_at', 'tensao_bt']
+
+# Chave do store do módulo com o hash das entradas do último cálculo
+INPUTS_FINGERPRINT_KEY = 'inputsFingerprint'
+
+# Número padrão de workers do pool de recálculo
+DEFAULT_MAX_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+
+def _import_services():
+    """Importa os services sob demanda (evita import circular e custo no startup)."""
+    try:
+        from ..services import (losses_service, impulse_service, applied_voltage_service,
+                                induced_voltage_service, short_circuit_service,
+                                temperature_service, dielectric_service)
+    except ImportError:
+        from services import (losses_service, impulse_service, applied_voltage_service,
+                              induced_voltage_service, short_circuit_service,
+                              temperature_service, dielectric_service)
+    return {
+        'losses': losses_service,
+        'impulse': impulse_service,
+        'appliedVoltage': applied_voltage_service,
+        'inducedVoltage': induced_voltage_service,
+        'shortCircuit': short_circuit_service,
+        'temperatureRise': temperature_service,
+        'dielectricAnalysis': dielectric_service,
+    }
+
+
+def _module_patch(payload: Dict[str, Any], results: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """Monta o patch no mesmo formato gravado por /modules/{module_id}/process."""
+    patch = {
+        'inputs': payload.get('moduleData', {}),
+        'basicData': payload.get('basicData', {}),
+        'results': results,
+        'lastUpdated': datetime.now().isoformat(),
+    }
+    patch.update(extra)
+    return patch
+
+
+def _combined(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {**payload.get('basicData', {}), **payload.get('moduleData', {})}
+
+
+def _to_float(value: Any, default: Optional[float] = None) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def build_default_registry() -> Dict[str, ModuleHandler]:
+    """
+    Cria o registro endpoint -> handler para os módulos padrão do TTS.
+
+    As chaves são exatamente os valores de `update_logic_endpoint` usados em
+    MCPDataManager.store_definitions.
+    """
+    services = _import_services()
+
+    def run_losses(payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Reconstrói os inputs de perdas a partir do formData salvo pelo frontend (losses.js)
+        basic = payload.get('basicData', {})
+        form = payload.get('storeData', {}).get('formData', {}) or {}
+        service = services['losses']
+        extra: Dict[str, Any] = {}
+
+        perdas_vazio = _to_float(form.get('perdas-vazio-kw'))
+        no_load_inputs = {
+            'perdas_vazio_ui': perdas_vazio,
+            'peso_nucleo_ui': _to_float(form.get('peso-projeto-Ton')),
+            'corrente_excitacao_ui': _to_float(form.get('corrente-excitacao')),
+            'inducao_ui': _to_float(form.get('inducao-nucleo')),
+            'corrente_exc_1_1_ui': _to_float(form.get('corrente-excitacao-1-1')) or None,
+            'corrente_exc_1_2_ui': _to_float(form.get('corrente-excitacao-1-2')) or None,
+            'steel_type': form.get('tipo-aco') or 'M4',
+            'frequencia': basic.get('frequencia'),
+            'tensao_bt_kv': (_to_float(basic.get('tensao_bt'), 0) or 0) / 1000,
+            'corrente_nominal_bt': basic.get('corrente_nominal_bt'),
+            'tipo_transformador': basic.get('tipo_transformador') or 'Trifásico',
+            'potencia_mva': basic.get('potencia_mva'),
+        }
+        if all(no_load_inputs[k] for k in ('perdas_vazio_ui', 'peso_nucleo_ui',
+                                            'corrente_excitacao_ui', 'inducao_ui')):
+            extra['resultsNoLoad'] = service.calculate_no_load_losses(no_load_inputs)
+
+        load_inputs = {
+            'temperatura_referencia': int(_to_float(form.get('temperatura-referencia'), 75) or 75),
+            'perdas_carga_kw_u_min': _to_float(form.get('perdas-carga-kw_U_min')),
+            'perdas_carga_kw_u_nom': _to_float(form.get('perdas-carga-kw_U_nom')),
+            'perdas_carga_kw_u_max': _to_float(form.get('perdas-carga-kw_U_max')),
+            'potencia_mva': basic.get('potencia_mva'),
+            'impedancia': basic.get('impedancia'),
+            'tensao_at_kv': (_to_float(basic.get('tensao_at'), 0) or 0) / 1000,
+            'tensao_at_tap_maior_kv': (_to_float(basic.get('tensao_at_tap_maior'), 0) or 0) / 1000,
+            'tensao_at_tap_menor_kv': (_to_float(basic.get('tensao_at_tap_menor'), 0) or 0) / 1000,
+            'impedancia_tap_maior': basic.get('impedancia_tap_maior'),
+            'impedancia_tap_menor': basic.get('impedancia_tap_menor'),
+            'corrente_nominal_at_a': basic.get('corrente_nominal_at'),
+            'corrente_nominal_at_tap_maior_a': basic.get('corrente_nominal_at_tap_maior'),
+            'corrente_nominal_at_tap_menor_a': basic.get('corrente_nominal_at_tap_menor'),
+            'tipo_transformador': basic.get('tipo_transformador') or 'Trifásico',
+            'perdas_vazio_kw_calculada': perdas_vazio,
+        }
+        if perdas_vazio and all(load_inputs[k] for k in ('perdas_carga_kw_u_min', 'perdas_carga_kw_u_nom',
+                                                         'perdas_carga_kw_u_max')):
+            extra['resultsLoad'] = service.calculate_load_losses(load_inputs)
+
+        results = extra.get('resultsLoad') or extra.get('resultsNoLoad') or payload.get('storeData', {}).get('results', {})
+        return _module_patch(payload, results, **extra)
+
+    def run_impulse(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _module_patch(payload, services['impulse'].calculate_impulse_test(_combined(payload)))
+
+    def run_applied_voltage(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _module_patch(payload, services['appliedVoltage'].calculate_applied_voltage_test(_combined(payload)))
+
+    def run_induced_voltage(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _module_patch(payload, services['inducedVoltage'].calculate_induced_voltage_test(_combined(payload)))
+
+    def run_short_circuit(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _module_patch(payload, services['shortCircuit'].calculate_short_circuit_analysis(_combined(payload)))
+
+    def run_temperature_rise(payload: Dict[str, Any]) -> Dict[str, Any]:
+        combined = _combined(payload)
+        # O service de temperatura usa as perdas nominais; vêm do store de perdas se não informadas
+        condicoes_nominais = payload.get('lossesData', {}).get('condicoes_nominais', {}) or {}
+        if combined.get('perdas_carga_kw_u_nom') is None and condicoes_nominais.get('perdas_tap_nominal') is not None:
+            combined['perdas_carga_kw_u_nom'] = condicoes_nominais['perdas_tap_nominal']
+        return _module_patch(payload, services['temperatureRise'].calculate_temperature_analysis(combined))
+
+    def run_dielectric_analysis(payload: Dict[str, Any]) -> Dict[str, Any]:
+        results = services['dielectricAnalysis'].analyze_dielectric(payload.get('basicData', {}),
+                                                                    payload.get('moduleData', {}))
+        return _module_patch(payload, results)
+
+    def run_global_update(payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Os módulos já recebem basicData no próprio patch; aqui só registramos o snapshot global
+        return {
+            'basicData': payload.get('basicData', {}),
+            'lastGlobalUpdate': datetime.now().isoformat(),
+        }
+
+    return {
+        'api/transformer/modules/losses/process': run_losses,
+        'api/transformer/modules/impulse/process': run_impulse,
+        'api/transformer/modules/appliedVoltage/process': run_applied_voltage,
+        'api/transformer/modules/inducedVoltage/process': run_induced_voltage,
+        'api/transformer/modules/shortCircuit/process': run_short_circuit,
+        'api/transformer/modules/temperatureRise/process': run_temperature_rise,
+        'api/transformer/modules/dielectricAnalysis/process': run_dielectric_analysis,
+        'api/transformer/global-update': run_global_update,
+    }
+
+
+class PropagationEngine:
+    """
+    Recalcula os stores dependentes chamando os services diretamente.
+
+    As dependências de `store_definitions` formam um DAG: todos os stores
+    alcançáveis a partir do store alterado são recalculados em ordem
+    topológica, e módulos independentes rodam em paralelo num pool de
+    threads (ex.: temperatureRise só começa quando losses termina).
+
+    O registro é criado sob demanda na primeira propagação. O pool é criado
+    uma vez por engine e reaproveitado por todas as propagações (suas threads
+    e as conexões SQLite delas não são recriadas a cada execução); shutdown()
+    o encerra. Cada execução devolve um relatório com o tempo gasto em cada módulo.
+    """
+
+    def __init__(self, data_manager, registry: Optional[Dict[str, ModuleHandler]] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        self.data_manager = data_manager
+        self._registry = registry
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mcp-propagation')
+
+    @property
+    def registry(self) -> Dict[str, ModuleHandler]:
+        if self._registry is None:
+            self._registry = build_default_registry()
+        return self._registry
+
+    def register(self, endpoint: str, handler: ModuleHandler):
+        """Registra (ou substitui) o handler de um update_logic_endpoint."""
+        self.registry[endpoint.lstrip('/')] = handler
+
+    def dependents_of(self, store_id: str) -> List[str]:
+        """Stores que dependem diretamente de `store_id` e possuem endpoint de atualização."""
+        return [
+            key for key, store_def in self.data_manager.store_definitions.items()
+            if store_id in store_def.get('dependencies', []) and store_def.get('update_logic_endpoint')
+        ]
+
+    def affected_stores(self, store_id: str) -> Set[str]:
+        """Fecho transitivo dos dependentes de `store_id` (sem incluir o próprio store)."""
+        affected: Set[str] = set()
+        pending = [store_id]
+        while pending:
+            for dependent in self.dependents_of(pending.pop()):
+                if dependent not in affected and dependent != store_id:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return affected
+
+    def propagation_roots(self, store_ids: Iterable[str]) -> List[str]:
+        """
+        Dos stores alterados juntos, os que precisam disparar propagação: descarta os
+        que não têm dependentes e os que já serão recalculados a partir de outro
+        store do conjunto (ex.: transformerInputs + losses -> só transformerInputs).
+        """
+        changed = set(store_ids)
+        closures = {store_id: self.affected_stores(store_id) for store_id in changed}
+        covered: Set[str] = set().union(*closures.values()) if closures else set()
+        return sorted(s for s in changed if closures[s] and s not in covered)
+
+    def topological_order(self, stores: Set[str]) -> List[List[str]]:
+        """
+        Agrupa `stores` em níveis: cada nível só depende de níveis anteriores.
+        Levanta ValueError se as dependências tiverem ciclo.
+        """
+        definitions = self.data_manager.store_definitions
+        remaining = {s: {d for d in definitions[s].get('dependencies', []) if d in stores} for s in stores}
+        levels: List[List[str]] = []
+        while remaining:
+            ready = sorted(s for s, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Ciclo de dependências entre os stores: {sorted(remaining)}")
+            levels.append(ready)
+            for s in ready:
+                del remaining[s]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return levels
+
+    def missing_required_fields(self) -> List[str]:
+        form_data = self.data_manager.get_data('transformerInputs').get('formData', {}) or {}
+        return [field for field in REQUIRED_TRANSFORMER_FIELDS if not form_data.get(field)]
+
+    def build_payload(self, store_id: str) -> Dict[str, Any]:
+        """Monta o payload de um módulo a partir do estado atual do MCP."""
+        store_def = self.data_manager.store_definitions[store_id]
+        current = self.data_manager.get_data(store_id, refresh=False)
+        payload: Dict[str, Any] = {
+            'moduleData': current.get('inputs', {}),
+            'storeData': current,
+        }
+        for dep_id in store_def.get('dependencies', []):
+            dep_data = self.data_manager.get_data(dep_id)
+            if dep_id == 'transformerInputs':
+                payload['basicData'] = dep_data.get('formData', {})
+            elif dep_id == 'losses':
+                # O service de temperatureRise precisa dos 'results' de 'losses'
+                payload['lossesData'] = dep_data.get('results', {})
+            else:
+                payload[dep_id] = dep_data.get('results', dep_data)
+        return payload
+
+    @staticmethod
+    def input_fingerprint(payload: Dict[str, Any]) -> str:
+        """Hash das entradas do módulo (o próprio store, com os resultados anteriores, fica de fora)."""
+        return store_hash({key: value for key, value in payload.items() if key != 'storeData'})
+
+    def run_module(self, store_id: str, only_stale: bool = False,
+                   is_current: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Executa o handler de um store e grava o resultado. Retorna a entrada do relatório.
+        Com `only_stale`, não recalcula se os resultados gravados vieram das mesmas entradas.
+        Se `is_current()` devolver False ao fim do cálculo, o resultado é descartado ('superseded').
+        """
+        endpoint = (self.data_manager.store_definitions[store_id].get('update_logic_endpoint') or '').lstrip('/')
+        handler = self.registry.get(endpoint)
+        if handler is None:
+            return {'status': 'skipped', 'elapsed_ms': 0.0, 'error': f"Nenhum handler para '{endpoint}'"}
+
+        start = time.perf_counter()
+        try:
+            payload = self.build_payload(store_id)
+            fingerprint = self.input_fingerprint(payload)
+            if only_stale and payload['storeData'].get(INPUTS_FINGERPRINT_KEY) == fingerprint:
+                status = 'fresh'
+            else:
+                patch = handler(payload)
+                if is_current is not None and not is_current():
+                    status = 'superseded'  # Entradas mudaram durante o cálculo: resultado obsoleto
+                else:
+                    patch[INPUTS_FINGERPRINT_KEY] = fingerprint
+                    self.data_manager.patch_data(store_id, patch, propagate=False)
+                    status = 'ok'
+            error = None
+        except Exception as e:
+            status, error = 'error', str(e)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        entry: Dict[str, Any] = {'status': status, 'elapsed_ms': round(elapsed_ms, 3)}
+        if error:
+            entry['error'] = error
+        return entry
+
+    def refresh(self, store_id: str, is_current: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Recalcula um único módulo sob demanda (recálculo preguiçoso, ao ser lido,
+        ou pré-cálculo especulativo). Não calcula sem os campos obrigatórios;
+        resultados já correspondentes às entradas atuais são mantidos.
+        """
+        missing = self.missing_required_fields()
+        if missing:
+            return {'status': 'cancelled', 'elapsed_ms': 0.0, 'error': f"Campos obrigatórios ausentes: {missing}"}
+        entry = self.run_module(store_id, only_stale=True, is_current=is_current)
+        print(f"[PropagationEngine] {store_id} (sob demanda): {entry['status']} em {entry['elapsed_ms']:.1f} ms"
+              + (f" ({entry['error']})" if entry.get('error') else ""))
+        return entry
+
+    def propagate(self, updated_store_id: Union[str, List[str]], only_stale: bool = False) -> Dict[str, Any]:
+        """
+        Recalcula todos os stores afetados por `updated_store_id` (um store ou uma
+        lista deles, numa única passada: cada módulo roda no máximo uma vez).
+
+        Cada módulo é submetido ao pool assim que todas as suas dependências
+        dentro do conjunto afetado terminaram, de modo que o tempo total fica
+        próximo do caminho mais lento do DAG, e não da soma dos módulos.
+        Com `only_stale`, módulos com resultados já correspondentes às entradas são pulados.
+        """
+        start = time.perf_counter()
+        report: Dict[str, Any] = {'source': updated_store_id, 'status': 'completed', 'modules': {}}
+        sources = [updated_store_id] if isinstance(updated_store_id, str) else list(updated_store_id)
+
+        if 'transformerInputs' in sources:
+            missing = self.missing_required_fields()
+            if missing:
+                report.update(status='cancelled', reason=f"Campos obrigatórios ausentes: {missing}")
+                report['total_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                return report
+
+        affected: Set[str] = set().union(*(self.affected_stores(source) for source in sources))
+        report['levels'] = self.topological_order(affected)
+        definitions = self.data_manager.store_definitions
+        waiting_on = {s: {d for d in definitions[s].get('dependencies', []) if d in affected} for s in affected}
+
+        running = {}
+
+        def submit_ready():
+            for store_id in sorted(s for s, deps in waiting_on.items() if not deps):
+                del waiting_on[store_id]
+                running[self._pool.submit(self.run_module, store_id, only_stale)] = store_id
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                store_id = running.pop(future)
+                entry = future.result()
+                report['modules'][store_id] = entry
+                print(f"[PropagationEngine] {store_id}: {entry['status']} em {entry['elapsed_ms']:.1f} ms"
+                      + (f" ({entry['error']})" if entry.get('error') else ""))
+                for deps in waiting_on.values():
+                    deps.discard(store_id)
+            submit_ready()
+
+        report['total_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        report['sum_module_ms'] = round(sum(e['elapsed_ms'] for e in report['modules'].values()), 3)
+        return report
+
+    def shutdown(self, wait: bool = True):
+        """Encerra o pool de recálculo (chamado pelo MCPDataManager.close)."""
+        self._pool.shutdown(wait=wait)
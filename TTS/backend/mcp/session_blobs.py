@@ -0,0 +1,169 @@
+# backend/mcp/session_blobs.py
+"""
+Armazenamento endereçado por conteúdo dos stores salvos em sessões.
+
+Cada store salvo numa sessão vira um blob comprimido (zlib) na tabela
+`session_blobs`, identificado pelo SHA-256 do seu JSON canônico. A linha da
+sessão guarda apenas um manifesto com o hash de cada store:
+
+    {"format": "blobs-v1", "timestamp": "...", "stores": {"losses": "<sha256>", ...}}
+
+Assim, cinquenta sessões do mesmo transformador compartilham os mesmos blobs
+e salvar uma sessão que difere em um campo grava apenas o blob do store
+alterado.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+# Identificador do formato do manifesto gravado em sessions.session_data
+MANIFEST_FORMAT = 'blobs-v1'
+MANIFEST_PREFIX = json.dumps({'format': MANIFEST_FORMAT})[:-1]
+
+# Nível de compressão zlib (6 = padrão, bom equilíbrio entre tempo e tamanho)
+COMPRESSION_LEVEL = 6
+
+
+def canonical_json(data: Any) -> str:
+    """JSON determinístico (chaves ordenadas, sem espaços): mesmo conteúdo, mesmo hash."""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def content_hash(payload: str) -> str:
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def store_hash(data: Any) -> str:
+    """Hash do conteúdo de um store (o mesmo usado como chave do blob)."""
+    return content_hash(canonical_json(data))
+
+
+def is_manifest(session_data: Dict[str, Any]) -> bool:
+    return session_data.get('format') == MANIFEST_FORMAT
+
+
+class SessionBlobStore:
+    """
+    Grava e lê os blobs das sessões. Mantém em memória o hash da última revisão
+    de cada store já gravada, para não serializar de novo um store que não
+    mudou entre dois save_session.
+    """
+
+    def __init__(self, level: int = COMPRESSION_LEVEL):
+        self.level = level
+        self._lock = threading.Lock()
+        self._hash_by_revision: Dict[str, Tuple[int, str]] = {}
+
+    @staticmethod
+    def init_schema(conn: sqlite3.Connection):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS session_blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                raw_size INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def put(self, conn: sqlite3.Connection, data: Any) -> str:
+        """Grava o blob (se ainda não existir) e devolve o hash do conteúdo."""
+        payload = canonical_json(data)
+        blob_hash = content_hash(payload)
+        exists = conn.execute('SELECT 1 FROM session_blobs WHERE hash = ?', (blob_hash,)).fetchone()
+        if exists is None:
+            raw = payload.encode('utf-8')
+            conn.execute('INSERT OR IGNORE INTO session_blobs (hash, data, raw_size) VALUES (?, ?, ?)',
+                         (blob_hash, zlib.compress(raw, self.level), len(raw)))
+        return blob_hash
+
+    def put_store(self, conn: sqlite3.Connection, store_id: str, revision: int, data: Any) -> str:
+        """Como put(), mas reaproveita o hash se a mesma revisão do store já foi gravada."""
+        with self._lock:
+            cached = self._hash_by_revision.get(store_id)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        blob_hash = self.put(conn, data)
+        with self._lock:
+            self._hash_by_revision[store_id] = (revision, blob_hash)
+        return blob_hash
+
+    def forget(self):
+        """Descarta os hashes em cache (ex.: as revisões recomeçaram)."""
+        with self._lock:
+            self._hash_by_revision.clear()
+
+    @staticmethod
+    def get(conn: sqlite3.Connection, blob_hash: str) -> Optional[Any]:
+        """Conteúdo do blob (None se o hash não existir)."""
+        row = conn.execute('SELECT data FROM session_blobs WHERE hash = ?', (blob_hash,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def build_manifest(self, conn: sqlite3.Connection, stores: Dict[str, Any], timestamp: str,
+                       revisions: Optional[Dict[str, int]] = None, cache_prefix: str = '') -> Dict[str, Any]:
+        """
+        Grava os blobs de todos os stores e devolve o manifesto da sessão.
+        `cache_prefix` separa o cache de hashes por projeto (revisões são por projeto).
+        """
+        hashes = {}
+        for store_id, data in stores.items():
+            if revisions is not None and store_id in revisions:
+                hashes[store_id] = self.put_store(conn, cache_prefix + store_id, revisions[store_id], data)
+            else:
+                hashes[store_id] = self.put(conn, data)
+        return {'format': MANIFEST_FORMAT, 'timestamp': timestamp, 'stores': hashes}
+
+    def resolve(self, conn: sqlite3.Connection, session_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Converte o conteúdo de sessions.session_data em {'stores': {...}, 'timestamp': ...}.
+        Aceita tanto o manifesto quanto o formato antigo (JSON completo).
+        """
+        if not is_manifest(session_data):
+            return session_data
+        stores = {}
+        for store_id, blob_hash in session_data.get('stores', {}).items():
+            data = self.get(conn, blob_hash)
+            if data is None:
+                print(f"[SessionBlobStore] Blob '{blob_hash[:12]}' do store '{store_id}' não encontrado. Ignorando.")
+                continue
+            stores[store_id] = data
+        return {'stores': stores, 'timestamp': session_data.get('timestamp')}
+
+    def migrate_legacy_sessions(self, conn: sqlite3.Connection) -> int:
+        """
+        Converte as sessões gravadas no formato antigo (JSON completo de todos os
+        stores) em manifestos + blobs. Devolve o número de sessões convertidas.
+        """
+        migrated = 0
+        # Manifestos começam sempre com o marcador de formato; só as linhas antigas são lidas
+        rows = conn.execute('SELECT session_id, session_data FROM sessions WHERE session_data NOT LIKE ?',
+                            (MANIFEST_PREFIX + '%',)).fetchall()
+        if not rows:
+            return 0
+        before = conn.execute('SELECT COALESCE(SUM(length(session_data)), 0) FROM sessions').fetchone()[0]
+        for session_id, session_json in rows:
+            try:
+                session_data = json.loads(session_json)
+            except json.JSONDecodeError:
+                print(f"[SessionBlobStore] Sessão '{session_id}' com JSON inválido. Mantida sem migrar.")
+                continue
+            if not isinstance(session_data, dict) or is_manifest(session_data):
+                continue
+            manifest = self.build_manifest(conn, session_data.get('stores', {}) or {},
+                                           session_data.get('timestamp'))
+            conn.execute('UPDATE sessions SET session_data = ? WHERE session_id = ?',
+                         (json.dumps(manifest), session_id))
+            migrated += 1
+        if migrated:
+            after = conn.execute('''
+                SELECT (SELECT COALESCE(SUM(length(session_data)), 0) FROM sessions)
+                     + (SELECT COALESCE(SUM(length(data)), 0) FROM session_blobs)
+            ''').fetchone()[0]
+            print(f"[SessionBlobStore] {migrated} sessão(ões) migrada(s) para blobs: "
+                  f"{before / 1024:.1f} KB -> {after / 1024:.1f} KB")
+        return migrated
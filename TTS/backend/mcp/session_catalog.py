@@ -0,0 +1,211 @@
+# backend/mcp/session_catalog.py
+"""
+Catálogo das sessões salvas: paginação por cursor e busca textual.
+
+Cada sessão é indexada pelo nome, pela descrição, pela data e pelos
+parâmetros principais do transformador (lidos de transformerInputs.formData),
+gravados com a unidade para que a busca use a mesma linguagem do usuário:
+
+    "300 MVA 500 kV 2025"  ->  potencia_mva "300 MVA", tensao_at "500 kV", created "2025-03-14"
+
+No SQLite a busca usa uma tabela FTS5 (`sessions_fts`, com o mesmo rowid da
+linha em `sessions`) e a listagem usa o índice (created_at, session_id), com
+paginação por chave: o cursor é a posição (created_at, session_id) do último
+item da página, então cada página custa o mesmo independentemente de quantas
+sessões existam. Os backends sem SQLite usam as mesmas regras em Python
+(`matches` e `paginate`).
+"""
+
+import base64
+import json
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+# Parâmetros do transformador indexados na busca e a unidade gravada com cada um
+CATALOG_FIELDS = {'potencia_mva': 'MVA', 'tensao_at': 'kV', 'tensao_bt': 'kV'}
+
+# Tamanho padrão e máximo de uma página da listagem
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _format_number(value: Any) -> Optional[str]:
+    if value is None or value == '':
+        return None
+    try:
+        number = float(str(value).replace(',', '.'))
+    except ValueError:
+        return str(value)
+    return f'{number:g}'
+
+
+def catalog_fields(stores: Dict[str, Any]) -> Dict[str, str]:
+    """Parâmetros do transformador da sessão, com unidade ({'potencia_mva': '300 MVA', ...})."""
+    form_data = ((stores or {}).get('transformerInputs') or {}).get('formData') or {}
+    fields = {}
+    for field, unit in CATALOG_FIELDS.items():
+        value = _format_number(form_data.get(field))
+        fields[field] = f'{value} {unit}' if value is not None else ''
+    return fields
+
+
+def query_tokens(query: Optional[str]) -> List[str]:
+    """Palavras da busca, em minúsculas (pontuação é ignorada: '13.8' vira '13' e '8')."""
+    return [token.lower() for token in _TOKEN_RE.findall(query or '')]
+
+
+def fts_query(tokens: List[str]) -> str:
+    """Expressão MATCH do FTS5: todos os termos, cada um como prefixo ("300"* AND "mva"*)."""
+    return ' AND '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def matches(text: str, tokens: List[str]) -> bool:
+    """Equivalente em Python da busca FTS5: cada termo é prefixo de alguma palavra do texto."""
+    words = query_tokens(text)
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+def search_text(session_id: str, description: Optional[str], fields: Dict[str, str],
+                created_at: Optional[str]) -> str:
+    return ' '.join([session_id, description or '', *fields.values(), created_at or ''])
+
+
+def encode_cursor(created_at: str, session_id: str) -> str:
+    raw = json.dumps([created_at, session_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(created_at, session_id) do cursor; levanta ValueError se ele for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, session_id = json.loads(raw)
+        return str(created_at), str(session_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor de paginação inválido: {cursor!r}") from e
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    return max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def paginate(sessions: List[Dict[str, Any]], limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Página de uma lista de sessões ({'session_id', 'created_at', ...}) em ordem
+    decrescente de (created_at, session_id), a partir do cursor.
+    """
+    limit = clamp_limit(limit)
+    ordered = sorted(sessions, key=lambda s: (s.get('created_at') or '', s['session_id']), reverse=True)
+    if cursor:
+        position = decode_cursor(cursor)
+        ordered = [s for s in ordered if (s.get('created_at') or '', s['session_id']) < position]
+    page = ordered[:limit]
+    next_cursor = None
+    if len(ordered) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.get('created_at') or '', last['session_id'])
+    return {'sessions': page, 'next_cursor': next_cursor}
+
+
+class SessionCatalog:
+    """Índices de catálogo das sessões no SQLite (B-tree por data + FTS5)."""
+
+    def __init__(self, namespace_separator: str):
+        self.namespace_separator = namespace_separator  # Separa o projeto do nome nas chaves das sessões
+        self.fts_enabled = False
+
+    def init_schema(self, conn: sqlite3.Connection, resolve_stores=None):
+        """
+        Cria o índice por data e a tabela FTS5 (se o SQLite tiver FTS5) e indexa as
+        sessões ainda fora do catálogo. `resolve_stores(session_json)` devolve os
+        stores da sessão (usado só para ler transformerInputs).
+        """
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions (created_at, session_id)')
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                    session_id, description, potencia_mva, tensao_at, tensao_bt, created,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"[SessionCatalog] FTS5 indisponível ({e}). Busca de sessões por LIKE.")
+            self.fts_enabled = False
+            return
+        rows = conn.execute('''
+            SELECT rowid, session_id, description, created_at, session_data FROM sessions
+            WHERE rowid NOT IN (SELECT rowid FROM sessions_fts)
+        ''').fetchall()
+        for rowid, session_key, description, created_at, session_json in rows:
+            stores = resolve_stores(session_json) if resolve_stores else {}
+            self._insert(conn, rowid, session_key, description, created_at, stores)
+        if rows:
+            print(f"[SessionCatalog] {len(rows)} sessão(ões) adicionada(s) ao índice de busca")
+
+    def _insert(self, conn: sqlite3.Connection, rowid: int, session_key: str, description: Optional[str],
+                created_at: Optional[str], stores: Dict[str, Any]):
+        fields = catalog_fields(stores)
+        session_id = session_key.rpartition(self.namespace_separator)[2]
+        conn.execute('''
+            INSERT INTO sessions_fts (rowid, session_id, description, potencia_mva, tensao_at, tensao_bt, created)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (rowid, session_id, description or '', fields['potencia_mva'], fields['tensao_at'],
+              fields['tensao_bt'], created_at or ''))
+
+    def before_write(self, conn: sqlite3.Connection, session_key: str):
+        """Remove a entrada antiga da sessão (INSERT OR REPLACE/DELETE trocam o rowid)."""
+        if not self.fts_enabled:
+            return
+        row = conn.execute('SELECT rowid FROM sessions WHERE session_id = ?', (session_key,)).fetchone()
+        if row is not None:
+            conn.execute('DELETE FROM sessions_fts WHERE rowid = ?', (row[0],))
+
+    def after_write(self, conn: sqlite3.Connection, session_key: str, stores: Dict[str, Any]):
+        """Indexa a sessão recém-gravada."""
+        if not self.fts_enabled:
+            return
+        rowid, description, created_at = conn.execute(
+            'SELECT rowid, description, created_at FROM sessions WHERE session_id = ?', (session_key,)).fetchone()
+        self._insert(conn, rowid, session_key, description, created_at, stores)
+
+    def search(self, conn: sqlite3.Connection, key_filter: str, key_params: tuple, prefix: str,
+               query: Optional[str] = None, limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Página de sessões do namespace (`key_filter` sobre s.session_id), mais
+        recentes primeiro, opcionalmente filtradas pela busca.
+        """
+        limit = clamp_limit(limit)
+        conditions, params = [key_filter], list(key_params)
+        if cursor:
+            conditions.append('(s.created_at, s.session_id) < (?, ?)')
+            created_at, session_id = decode_cursor(cursor)
+            params.extend([created_at, prefix + session_id])
+        tokens = query_tokens(query)
+        source = 'sessions s INDEXED BY idx_sessions_created'
+        if tokens and self.fts_enabled:
+            source = 'sessions_fts f JOIN sessions s ON s.rowid = f.rowid'
+            conditions.append('sessions_fts MATCH ?')
+            params.append(fts_query(tokens))
+        elif tokens:
+            for token in tokens:
+                conditions.append("(lower(s.session_id) LIKE ? OR lower(COALESCE(s.description, '')) LIKE ?)")
+                params.extend([f'%{token}%', f'%{token}%'])
+        rows = conn.execute(f'''
+            SELECT s.session_id, s.created_at, s.description FROM {source}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY s.created_at DESC, s.session_id DESC
+            LIMIT ?
+        ''', (*params, limit + 1)).fetchall()
+        sessions = [{'session_id': key[len(prefix):], 'created_at': created_at, 'description': description}
+                    for key, created_at, description in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = sessions[-1]
+            next_cursor = encode_cursor(last['created_at'] or '', last['session_id'])
+        return {'sessions': sessions, 'next_cursor': next_cursor}
@@ -0,0 +1,97 @@
+# backend/mcp/session_diff.py
+"""
+Diferença estrutural entre duas sessões salvas, lida direto do armazenamento.
+
+Nada passa pelos stores em memória: o manifesto de cada sessão traz o hash do
+conteúdo de cada store (o mesmo SHA-256 dos blobs em session_blobs), então
+stores idênticos nas duas sessões são descartados sem ler nem decodificar os
+blobs. Só os stores com hashes diferentes são carregados, um de cada vez, e
+comparados recursivamente.
+
+O resultado é gerado em NDJSON, linha a linha:
+    {"type": "diff", "format": "session-diff-v1", "a": "...", "b": "..."}
+    {"type": "change", "store_id": "losses", "op": "change", "path": ["results", "pcc"], "old": 1.2, "new": 1.3}
+    {"type": "change", "store_id": "impulse", "op": "add", "path": [], "new": {...}}
+    {"type": "summary", "identical": [...], "changed": {"losses": 1, ...}, "changes": 2}
+
+`op` é "add" (só em b), "remove" (só em a) ou "change". Dicts são comparados
+chave a chave e listas posição a posição; `path` mistura chaves e índices.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+DIFF_FORMAT = 'session-diff-v1'
+
+
+def diff_values(old: Any, new: Any, path: Optional[List[Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Operações que transformam `old` em `new` (gerador: nada é acumulado)."""
+    path = path or []
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            if key not in new:
+                yield {'op': 'remove', 'path': path + [key], 'old': value}
+            elif new[key] is not value and new[key] != value:
+                yield from diff_values(value, new[key], path + [key])
+        for key, value in new.items():
+            if key not in old:
+                yield {'op': 'add', 'path': path + [key], 'new': value}
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for index in range(common):
+            if old[index] != new[index]:
+                yield from diff_values(old[index], new[index], path + [index])
+        for index in range(common, len(old)):
+            yield {'op': 'remove', 'path': path + [index], 'old': old[index]}
+        for index in range(common, len(new)):
+            yield {'op': 'add', 'path': path + [index], 'new': new[index]}
+        return
+    if old != new:
+        yield {'op': 'change', 'path': path, 'old': old, 'new': new}
+
+
+def iter_session_diff_lines(data_manager, session_a: str, session_b: str, manifest_a: Dict[str, str],
+                            manifest_b: Dict[str, str], stores: Optional[Iterable[str]] = None) -> Iterator[bytes]:
+    """
+    Gera a diferença entre as sessões em NDJSON. `manifest_*` são os hashes por
+    store (MCPDataManager.session_manifest); `stores` restringe a comparação.
+    Memória proporcional aos dois maiores stores diferentes, não às sessões.
+    """
+    def emit(record: Dict[str, Any]) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+    store_ids = sorted(set(manifest_a) | set(manifest_b))
+    if stores is not None:
+        wanted = set(stores)
+        store_ids = [store_id for store_id in store_ids if store_id in wanted]
+
+    yield emit({'type': 'diff', 'format': DIFF_FORMAT, 'a': session_a, 'b': session_b})
+    identical, changed, total = [], {}, 0
+    for store_id in store_ids:
+        hash_a, hash_b = manifest_a.get(store_id), manifest_b.get(store_id)
+        if hash_a == hash_b:
+            identical.append(store_id)  # Mesmo conteúdo: nem lê os blobs
+            continue
+        old = data_manager.load_session_store(session_a, store_id) if hash_a is not None else None
+        new = data_manager.load_session_store(session_b, store_id) if hash_b is not None else None
+        if old is None and new is None:
+            continue
+        if old is None:
+            operations = iter([{'op': 'add', 'path': [], 'new': new}])
+        elif new is None:
+            operations = iter([{'op': 'remove', 'path': [], 'old': old}])
+        else:
+            operations = diff_values(old, new)
+        count = 0
+        for operation in operations:
+            count += 1
+            yield emit({'type': 'change', 'store_id': store_id, **operation})
+        if count:
+            changed[store_id] = count
+            total += count
+        else:
+            identical.append(store_id)  # Hashes diferentes, conteúdo equivalente (ex.: 1 vs 1.0)
+    yield emit({'type': 'summary', 'identical': identical, 'changed': changed, 'changes': total})
@@ -0,0 +1,108 @@
+# backend/mcp/snapshot.py
+"""
+Snapshots imutáveis dos stores do MCP.
+
+Os stores em memória são mantidos como FrozenDict/FrozenList: subclasses de
+dict/list (continuam serializáveis por json e pelo FastAPI) que recusam
+qualquer alteração. Como nada pode ser alterado no lugar, get_data devolve o
+snapshot sem copiar, e cada escrita monta um novo snapshot reaproveitando as
+sub-estruturas que não mudaram (compartilhamento estrutural).
+"""
+
+from typing import Any
+
+
+def _readonly(*args, **kwargs):
+    raise TypeError("Snapshot do MCP é imutável; use set_data/patch_data para alterar o store")
+
+
+class FrozenDict(dict):
+    """dict imutável. `dict(snapshot)` ou `snapshot.copy()` devolvem um dict comum (raso) editável."""
+
+    __slots__ = ()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+
+class FrozenList(list):
+    """list imutável. `list(snapshot)` devolve uma lista comum (rasa) editável."""
+
+    __slots__ = ()
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    clear = _readonly
+    sort = _readonly
+    reverse = _readonly
+
+    def copy(self) -> list:
+        return list(self)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """
+    Converte recursivamente dicts/listas em FrozenDict/FrozenList.
+    Valores que já são snapshots são reaproveitados sem percorrer.
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        frozen = FrozenDict()
+        for key, item in value.items():
+            dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, (list, tuple)):
+        frozen_list = FrozenList()
+        list.extend(frozen_list, (freeze(item) for item in value))
+        return frozen_list
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Cópia profunda editável (dicts/listas comuns) de um snapshot."""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+EMPTY = FrozenDict()
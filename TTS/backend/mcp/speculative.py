@@ -0,0 +1,124 @@
+# backend/mcp/speculative.py
+"""
+Pré-cálculo especulativo dos módulos do MCP.
+
+Com o recálculo preguiçoso os módulos sujos só rodam quando alguém os lê. No
+modo especulativo uma thread de fundo adianta esse trabalho: a cada nova
+versão de transformerInputs o relógio de ociosidade recomeça e, quando as
+edições param por `idle_seconds` (e os campos obrigatórios potencia_mva,
+tensao_at e tensao_bt estão preenchidos), os módulos sujos são recalculados
+em ordem topológica. Ao abrir a página de perdas ou de impulso, o resultado
+já está pronto.
+
+Uma execução vale só para a versão de transformerInputs em que começou: se
+chegar uma versão mais nova, os módulos que ainda não rodaram são cancelados
+e o resultado de um módulo que terminar depois disso é descartado (não é
+gravado). Os módulos continuam sujos e entram na próxima execução.
+"""
+
+import atexit
+import threading
+import time
+from typing import Any, Dict
+
+# Tempo sem novas versões de transformerInputs antes de começar a pré-calcular (s)
+DEFAULT_IDLE_SECONDS = 0.75
+
+
+class SpeculativePrecompute:
+    """
+    Thread de fundo que recalcula os módulos sujos quando as entradas param de mudar.
+
+    Args:
+        data_manager: MCPDataManager cujos módulos sujos serão recalculados
+        idle_seconds: tempo sem novas versões de transformerInputs antes de começar
+    """
+
+    def __init__(self, data_manager, idle_seconds: float = DEFAULT_IDLE_SECONDS):
+        self.data_manager = data_manager
+        self.idle_seconds = max(0.0, idle_seconds)
+        self._cond = threading.Condition()
+        self._version = 0  # Última versão de transformerInputs notificada
+        self._scheduled = 0  # Versão que aguarda (ou está em) pré-cálculo; 0 = nada pendente
+        self._last_change = 0.0
+        self._stopped = False
+        self.stats: Dict[str, int] = {'runs': 0, 'modules': 0, 'cancelled': 0, 'discarded': 0}
+        self._thread = threading.Thread(target=self._run, name='mcp-speculative', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def notify(self, version: int):
+        """Nova versão de transformerInputs: reinicia a espera e torna obsoleta a execução em andamento."""
+        with self._cond:
+            self._version = self._scheduled = version
+            self._last_change = time.monotonic()
+            self._cond.notify()
+
+    def is_current(self, version: int) -> bool:
+        """A execução iniciada na versão `version` ainda vale (nenhuma versão mais nova chegou)."""
+        return self._version == version and not self._stopped
+
+    def _wait_idle(self) -> int:
+        """Bloqueia até haver uma versão pendente e `idle_seconds` sem mudanças. 0 = parar."""
+        with self._cond:
+            while not self._stopped:
+                if not self._scheduled:
+                    self._cond.wait()
+                    continue
+                remaining = self._last_change + self.idle_seconds - time.monotonic()
+                if remaining <= 0:
+                    version, self._scheduled = self._scheduled, 0
+                    return version
+                self._cond.wait(remaining)
+            return 0
+
+    def _run(self):
+        while True:
+            version = self._wait_idle()
+            if not version:
+                return
+            try:
+                self._precompute(version)
+            except Exception as e:
+                print(f"[SpeculativePrecompute] Erro no pré-cálculo (versão {version}): {e}")
+
+    def _precompute(self, version: int):
+        dm = self.data_manager
+        if dm.propagation_engine.missing_required_fields():
+            return
+        dirty = set(dm.dirty_stores())
+        if not dirty:
+            return
+        self.stats['runs'] += 1
+        start = time.perf_counter()
+        done = 0
+        for level in dm.propagation_engine.topological_order(dirty):
+            for store_id in level:
+                if not self.is_current(version):
+                    self.stats['cancelled'] += 1
+                    print(f"[SpeculativePrecompute] Versão {version} de transformerInputs superada; "
+                          f"pré-cálculo cancelado após {done} módulo(s)")
+                    return
+                entry = dm._refresh_if_dirty(store_id, is_current=lambda: self.is_current(version))
+                if entry and entry.get('status') == 'superseded':
+                    self.stats['discarded'] += 1
+                elif entry:
+                    done += 1
+        self.stats['modules'] += done
+        print(f"[SpeculativePrecompute] {done} módulo(s) pré-calculado(s) para a versão {version} "
+              f"de transformerInputs em {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = bool(self._scheduled)
+        return {'idle_seconds': self.idle_seconds, 'pending': pending, **self.stats}
+
+    def stop(self):
+        """Encerra a thread de fundo (uma execução em andamento para no próximo módulo)."""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        atexit.unregister(self.stop)
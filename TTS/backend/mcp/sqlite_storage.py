@@ -0,0 +1,245 @@
+# backend/mcp/sqlite_storage.py
+"""
+Backend SQLite do MCP (o padrão).
+
+Reúne o que antes ficava dentro do MCPDataManager: um pool limitado de
+conexões persistentes (WAL + synchronous=NORMAL), versões gravadas como deltas com
+checkpoints (DeltaLog) e sessões como manifestos de blobs comprimidos
+(SessionBlobStore). O schema é o mesmo de sempre, então bancos existentes
+abrem sem migração.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .connection import SQLiteConnectionManager
+from .delta_log import DeltaLog
+from .session_blobs import SessionBlobStore, is_manifest, store_hash
+from .session_catalog import SessionCatalog
+from .snapshot import freeze
+from .storage import NAMESPACE_SEPARATOR, namespace_of
+
+
+def default_db_path() -> str:
+    """tts_data.db na raiz do repositório (um nível acima do diretório TTS)."""
+    current_file = os.path.abspath(__file__)
+    backend_dir = os.path.dirname(os.path.dirname(current_file))  # Sobe 2 níveis: mcp -> backend
+    tts_dir = os.path.dirname(backend_dir)  # Sobe mais 1: backend -> TTS
+    project_root = os.path.dirname(tts_dir)  # Sobe mais 1: TTS -> raiz (Downloads/TTS)
+    return os.path.join(project_root, "tts_data.db")
+
+
+def _key_range(prefix: str, column: str) -> Tuple[str, tuple]:
+    """Filtro SQL das chaves de um namespace ('' = chaves sem separador)."""
+    if prefix:
+        # Faixa de chaves do namespace: 'proj::' <= chave < 'proj:;' (usa o índice)
+        upper = prefix[:-1] + chr(ord(NAMESPACE_SEPARATOR[-1]) + 1)
+        return f'{column} >= ? AND {column} < ? AND instr(substr({column}, ?), ?) = 0', \
+            (prefix, upper, len(prefix) + 1, NAMESPACE_SEPARATOR)
+    return f'instr({column}, ?) = 0', (NAMESPACE_SEPARATOR,)
+
+
+class SQLiteStorage:
+    """StorageBackend sobre o tts_data.db."""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: Optional[str] = None, wal: bool = True, synchronous: str = 'NORMAL'):
+        self.db_path = db_path or default_db_path()
+        self._db = SQLiteConnectionManager(self.db_path, wal=wal, synchronous=synchronous)
+        # Versões dos stores gravadas como deltas com checkpoints periódicos
+        self._delta_log = DeltaLog()
+        # Sessões gravadas como manifestos de blobs comprimidos endereçados por hash
+        self._session_blobs = SessionBlobStore()
+        # Índice por data e busca FTS5 sobre as sessões
+        self._catalog = SessionCatalog(NAMESPACE_SEPARATOR)
+
+    def init(self) -> None:
+        with self._db.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_stores (
+                    store_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    version INTEGER DEFAULT 1
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    session_data TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    description TEXT
+                )
+            ''')
+            # Índice de cobertura: a inicialização lê store_id/version sem tocar no JSON dos stores
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_stores_version ON data_stores (store_id, version)')
+            DeltaLog.init_schema(conn)
+            SessionBlobStore.init_schema(conn)
+            # Sessões antigas (JSON completo por linha) viram manifestos + blobs compartilhados
+            self._session_blobs.migrate_legacy_sessions(conn)
+            self._catalog.init_schema(conn, lambda session_json: self._catalog_stores(conn, session_json))
+
+    def _catalog_stores(self, conn, session_json: str) -> Dict[str, Any]:
+        """Só o transformerInputs da sessão (o que o catálogo indexa), sem ler os demais blobs."""
+        try:
+            session_data = json.loads(session_json)
+        except json.JSONDecodeError:
+            return {}
+        if not is_manifest(session_data):
+            return session_data.get('stores') or {}
+        blob_hash = (session_data.get('stores') or {}).get('transformerInputs')
+        data = self._session_blobs.get(conn, blob_hash) if blob_hash else None
+        return {'transformerInputs': data} if data is not None else {}
+
+    def list_stores(self, prefix: str = '') -> Dict[str, int]:
+        """
+        Só store_id e versões são lidos (pelo índice de cobertura e pela chave
+        primária dos deltas), então o custo não cresce com o tamanho dos stores.
+        """
+        key_filter, params = _key_range(prefix, 's.store_id')
+        with self._db.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT s.store_id, COALESCE(s.version, 1),
+                       (SELECT MAX(d.version) FROM data_store_deltas d WHERE d.store_id = s.store_id)
+                FROM data_stores s INDEXED BY idx_data_stores_version
+                WHERE {key_filter}
+            ''', params).fetchall()
+        return {key: max(checkpoint_version, last_delta_version or 0)
+                for key, checkpoint_version, last_delta_version in rows}
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._db.transaction() as conn:
+            row = conn.execute('SELECT data, COALESCE(version, 1) FROM data_stores WHERE store_id = ?',
+                               (key,)).fetchone()
+            if row is None:
+                return None
+            data_json, checkpoint_version = row
+            try:
+                checkpoint = json.loads(data_json)
+            except json.JSONDecodeError:
+                print(f"[SQLiteStorage] Erro ao decodificar o store '{key}'. Ignorando.")
+                return None
+            if checkpoint is None:
+                return None
+            # Bancos anteriores ao log de deltas: o conteúdo atual vira o checkpoint da versão corrente
+            conn.execute('INSERT OR IGNORE INTO data_store_checkpoints (store_id, version, data) VALUES (?, ?, ?)',
+                         (key, checkpoint_version, data_json))
+            return self._delta_log.hydrate(conn, key, checkpoint, checkpoint_version, len(data_json))
+
+    def put(self, key: str, data: Dict[str, Any], version: int) -> None:
+        # Grava só as chaves alteradas (delta) ou um checkpoint completo, conforme o DeltaLog
+        with self._db.transaction() as conn:
+            self._delta_log.record(conn, key, data, version)
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any], int]]) -> None:
+        with self._db.transaction() as conn:
+            for key, data, version in items:
+                self._delta_log.record(conn, key, data, version)
+
+    def list_versions(self, key: str) -> List[Dict[str, Any]]:
+        with self._db.connection() as conn:
+            return DeltaLog.list_versions(conn, key)
+
+    def get_at_version(self, key: str, version: int) -> Optional[Dict[str, Any]]:
+        with self._db.connection() as conn:
+            return DeltaLog.reconstruct(conn, key, version)
+
+    # Sessões: a linha guarda só o manifesto (hash de cada store); o conteúdo fica em session_blobs
+    def save_session(self, key: str, stores: Dict[str, Dict[str, Any]], description: str = '',
+                     revisions: Optional[Dict[str, int]] = None) -> None:
+        with self._db.transaction() as conn:
+            manifest = self._session_blobs.build_manifest(conn, stores, datetime.now().isoformat(), revisions,
+                                                          cache_prefix=namespace_of(key))
+            self._catalog.before_write(conn, key)
+            conn.execute('''
+                INSERT OR REPLACE INTO sessions (session_id, session_data, created_at, description)
+                VALUES (?, ?, CURRENT_TIMESTAMP, ?)
+            ''', (key, json.dumps(manifest), description))
+            self._catalog.after_write(conn, key, stores)
+
+    def delete_session(self, key: str) -> bool:
+        """Remove a sessão (os blobs ficam: podem ser compartilhados com outras sessões)."""
+        with self._db.transaction() as conn:
+            self._catalog.before_write(conn, key)
+            return conn.execute('DELETE FROM sessions WHERE session_id = ?', (key,)).rowcount > 0
+
+    def _session_data(self, conn, key: str) -> Optional[Dict[str, Any]]:
+        """Conteúdo de sessions.session_data (manifesto ou formato antigo), sem resolver os blobs."""
+        row = conn.execute('SELECT session_data FROM sessions WHERE session_id = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            print(f"[SQLiteStorage] Sessão '{key}' com JSON inválido.")
+            return None
+
+    def load_session(self, key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        with self._db.connection() as conn:
+            session_data = self._session_data(conn, key)
+            if session_data is None:
+                return None
+            session_data = self._session_blobs.resolve(conn, session_data)
+        return {store_id: freeze(data) for store_id, data in (session_data.get('stores') or {}).items()}
+
+    def session_manifest(self, key: str) -> Optional[Dict[str, str]]:
+        with self._db.connection() as conn:
+            session_data = self._session_data(conn, key)
+        if session_data is None:
+            return None
+        if is_manifest(session_data):
+            return dict(session_data.get('stores') or {})
+        # Formato antigo (não migrado): hashes calculados a partir do JSON completo
+        return {store_id: store_hash(data) for store_id, data in (session_data.get('stores') or {}).items()}
+
+    def load_session_store(self, key: str, store_id: str) -> Optional[Dict[str, Any]]:
+        with self._db.connection() as conn:
+            session_data = self._session_data(conn, key)
+            if session_data is None:
+                return None
+            if not is_manifest(session_data):
+                data = (session_data.get('stores') or {}).get(store_id)
+            else:
+                blob_hash = (session_data.get('stores') or {}).get(store_id)
+                data = self._session_blobs.get(conn, blob_hash) if blob_hash else None
+        return freeze(data) if data is not None else None
+
+    def list_sessions(self, prefix: str = '') -> List[Dict[str, Any]]:
+        key_filter, params = _key_range(prefix, 'session_id')
+        with self._db.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT session_id, created_at, description FROM sessions
+                WHERE {key_filter} ORDER BY created_at DESC
+            ''', params).fetchall()
+        return [{'session_id': row[0][len(prefix):], 'created_at': row[1], 'description': row[2]}
+                for row in rows]
+
+    def search_sessions(self, prefix: str = '', query: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        key_filter, params = _key_range(prefix, 's.session_id')
+        with self._db.connection() as conn:
+            return self._catalog.search(conn, key_filter, params, prefix, query, limit, cursor)
+
+    def list_namespaces(self) -> List[str]:
+        with self._db.connection() as conn:
+            rows = conn.execute('''
+                SELECT DISTINCT substr(store_id, 1, instr(store_id, ?) - 1)
+                FROM data_stores INDEXED BY idx_data_stores_version
+                WHERE instr(store_id, ?) > 0
+            ''', (NAMESPACE_SEPARATOR, NAMESPACE_SEPARATOR)).fetchall()
+        return sorted(namespace for (namespace,) in rows)
+
+    def size_bytes(self) -> int:
+        """Banco + WAL (o WAL só é incorporado ao banco no checkpoint do SQLite)."""
+        return sum(os.path.getsize(path) for path in (self.db_path, self.db_path + '-wal')
+                   if os.path.exists(path))
+
+    def open_connections(self) -> int:
+        return self._db.open_connections()
+
+    def close(self) -> None:
+        self._db.close_all()
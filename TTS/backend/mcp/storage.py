@@ -0,0 +1,254 @@
+# backend/mcp/storage.py
+"""
+Interface dos backends de armazenamento do MCP.
+
+O MCPDataManager mantém os stores em memória (snapshots imutáveis) e delega a
+persistência a um StorageBackend. Há três implementações:
+
+    sqlite  SQLiteStorage (sqlite_storage.py): WAL + synchronous=NORMAL, deltas
+            com checkpoints e sessões em blobs endereçados por conteúdo. Padrão.
+    memory  MemoryStorage (este módulo): nada vai para o disco; para testes e
+            execuções descartáveis.
+    file    AppendOnlyFileStorage (file_storage.py): um arquivo NDJSON por
+            store, só com appends (deltas e checkpoints), compactado de tempos
+            em tempos.
+
+As chaves dos stores e das sessões já chegam com o prefixo do projeto
+("<projeto>::losses"); os backends só precisam saber listar as chaves de um
+prefixo (list_stores/list_sessions) e os prefixos existentes (list_namespaces).
+
+`python -m benchmarks.bench_storage` compara os backends (latência de
+gravação, tempo de restauração e tamanho em disco).
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Tuple, runtime_checkable
+
+from .session_blobs import store_hash
+from .session_catalog import catalog_fields, matches, paginate, query_tokens, search_text
+from .snapshot import freeze
+
+# Separador entre o namespace (projeto) e o nome nas chaves ("trafo-42::losses")
+NAMESPACE_SEPARATOR = '::'
+
+# Versões mantidas por store no MemoryStorage (snapshots compartilham estrutura, então são baratas)
+MEMORY_HISTORY_SIZE = 64
+
+
+def in_namespace(key: str, prefix: str) -> bool:
+    """A chave pertence diretamente ao namespace `prefix` ('' = namespace padrão, sem separador)."""
+    if not key.startswith(prefix):
+        return False
+    return NAMESPACE_SEPARATOR not in key[len(prefix):]
+
+
+def namespace_of(key: str) -> str:
+    """Prefixo do namespace da chave ('' para o namespace padrão)."""
+    head, separator, _ = key.rpartition(NAMESPACE_SEPARATOR)
+    return head + separator
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """Operações de persistência usadas pelo MCPDataManager."""
+
+    name: str
+
+    def init(self) -> None:
+        """Cria o schema/diretórios e executa migrações pendentes."""
+
+    def list_stores(self, prefix: str = '') -> Dict[str, int]:
+        """{chave: versão} dos stores gravados no namespace, sem decodificar os dados."""
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(versão, snapshot imutável) do store, ou None se nunca foi gravado."""
+
+    def put(self, key: str, data: Dict[str, Any], version: int) -> None:
+        """Grava a versão `version` do store."""
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any], int]]) -> None:
+        """Grava vários stores de uma vez (numa única transação, quando o backend suporta)."""
+
+    def list_versions(self, key: str) -> List[Dict[str, Any]]:
+        """Histórico de versões do store ({'version', 'created_at', 'checkpoint', 'delta_bytes'})."""
+
+    def get_at_version(self, key: str, version: int) -> Optional[Dict[str, Any]]:
+        """Store numa versão passada (None se não estiver disponível)."""
+
+    def save_session(self, key: str, stores: Dict[str, Dict[str, Any]], description: str = '',
+                     revisions: Optional[Dict[str, int]] = None) -> None:
+        """Grava um snapshot de todos os stores como sessão."""
+
+    def load_session(self, key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """{store_id: dados} da sessão, ou None se ela não existir."""
+
+    def session_manifest(self, key: str) -> Optional[Dict[str, str]]:
+        """{store_id: hash do conteúdo} da sessão, sem ler os stores; None se ela não existir."""
+
+    def load_session_store(self, key: str, store_id: str) -> Optional[Dict[str, Any]]:
+        """Um único store da sessão (None se a sessão ou o store não existirem)."""
+
+    def list_sessions(self, prefix: str = '') -> List[Dict[str, Any]]:
+        """Sessões do namespace ({'session_id', 'created_at', 'description'}), mais recentes primeiro."""
+
+    def search_sessions(self, prefix: str = '', query: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Página do catálogo de sessões ({'sessions', 'next_cursor'}), filtrada pela busca (session_catalog.py)."""
+
+    def delete_session(self, key: str) -> bool:
+        """Remove a sessão; False se ela não existir."""
+
+    def list_namespaces(self) -> List[str]:
+        """Namespaces (projetos) com stores gravados, sem o separador."""
+
+    def size_bytes(self) -> int:
+        """Espaço ocupado pelos dados (bytes)."""
+
+    def close(self) -> None:
+        """Fecha conexões/arquivos."""
+
+
+class MemoryStorage:
+    """
+    Backend só em memória: os snapshots imutáveis são guardados por referência,
+    então gravar é O(1) e restaurar não decodifica nada. Mantém as últimas
+    MEMORY_HISTORY_SIZE versões de cada store.
+    """
+
+    name = 'memory'
+
+    def __init__(self, history_size: int = MEMORY_HISTORY_SIZE):
+        self.history_size = max(1, history_size)
+        self._lock = threading.Lock()
+        self._stores: Dict[str, List[Tuple[int, str, Dict[str, Any]]]] = {}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def init(self) -> None:
+        pass
+
+    def list_stores(self, prefix: str = '') -> Dict[str, int]:
+        with self._lock:
+            return {key: history[-1][0] for key, history in self._stores.items() if in_namespace(key, prefix)}
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            history = self._stores.get(key)
+            if not history:
+                return None
+            version, _, data = history[-1]
+            return version, data
+
+    def put(self, key: str, data: Dict[str, Any], version: int) -> None:
+        self.put_many([(key, data, version)])
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any], int]]) -> None:
+        now = datetime.now().isoformat()
+        frozen = [(key, freeze(data), version) for key, data, version in items]
+        with self._lock:
+            for key, data, version in frozen:
+                history = self._stores.setdefault(key, [])
+                if history and history[-1][0] >= version:
+                    history[-1] = (history[-1][0], now, data)
+                else:
+                    history.append((version, now, data))
+                del history[:-self.history_size]
+
+    def list_versions(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            history = list(self._stores.get(key, []))
+        return [{'version': version, 'created_at': created_at, 'checkpoint': True, 'delta_bytes': 0}
+                for version, created_at, _ in history]
+
+    def get_at_version(self, key: str, version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            history = list(self._stores.get(key, []))
+        found = None
+        for stored_version, _, data in history:
+            if stored_version > version:
+                break
+            found = data
+        return found
+
+    def save_session(self, key: str, stores: Dict[str, Dict[str, Any]], description: str = '',
+                     revisions: Optional[Dict[str, int]] = None) -> None:
+        frozen = {store_id: freeze(data) for store_id, data in stores.items()}
+        hashes = {store_id: store_hash(data) for store_id, data in frozen.items()}
+        with self._lock:
+            self._sessions[key] = {'stores': frozen, 'hashes': hashes,
+                                   'created_at': datetime.now().isoformat(), 'description': description,
+                                   'catalog': catalog_fields(stores)}
+
+    def load_session(self, key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            session = self._sessions.get(key)
+        return dict(session['stores']) if session is not None else None
+
+    def session_manifest(self, key: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            session = self._sessions.get(key)
+        return dict(session['hashes']) if session is not None else None
+
+    def load_session_store(self, key: str, store_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(key)
+        return session['stores'].get(store_id) if session is not None else None
+
+    def list_sessions(self, prefix: str = '') -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = [{'session_id': key[len(prefix):], 'created_at': session['created_at'],
+                         'description': session['description']}
+                        for key, session in self._sessions.items() if in_namespace(key, prefix)]
+        return sorted(sessions, key=lambda session: session['created_at'], reverse=True)
+
+    def search_sessions(self, prefix: str = '', query: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+        tokens = query_tokens(query)
+        with self._lock:
+            sessions = [{'session_id': key[len(prefix):], 'created_at': session['created_at'],
+                         'description': session['description']}
+                        for key, session in self._sessions.items()
+                        if in_namespace(key, prefix) and matches(
+                            search_text(key[len(prefix):], session['description'], session['catalog'],
+                                        session['created_at']), tokens)]
+        return paginate(sessions, limit, cursor)
+
+    def delete_session(self, key: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
+
+    def list_namespaces(self) -> List[str]:
+        with self._lock:
+            prefixes = {namespace_of(key) for key in self._stores}
+        return sorted(prefix[:-len(NAMESPACE_SEPARATOR)] for prefix in prefixes if prefix)
+
+    def size_bytes(self) -> int:
+        """Tamanho do JSON das versões atuais (estimativa; nada é gravado em disco)."""
+        with self._lock:
+            current = [history[-1][2] for history in self._stores.values() if history]
+        return sum(len(json.dumps(data)) for data in current)
+
+    def close(self) -> None:
+        pass
+
+
+# Backends disponíveis (TTS_STORAGE_BACKEND)
+STORAGE_BACKENDS = ('sqlite', 'memory', 'file')
+
+
+def create_storage_backend(kind: str = 'sqlite', path: Optional[str] = None, **options: Any) -> StorageBackend:
+    """
+    Cria o backend pelo nome: 'sqlite' (path = arquivo .db), 'memory' ou
+    'file' (path = diretório). Levanta ValueError para nomes desconhecidos.
+    """
+    kind = (kind or 'sqlite').lower()
+    if kind == 'sqlite':
+        from .sqlite_storage import SQLiteStorage
+        return SQLiteStorage(path, **options)
+    if kind == 'memory':
+        return MemoryStorage(**options)
+    if kind == 'file':
+        from .file_storage import AppendOnlyFileStorage
+        return AppendOnlyFileStorage(path, **options)
+    raise ValueError(f"Backend de armazenamento desconhecido: '{kind}' (use {', '.join(STORAGE_BACKENDS)})")
@@ -0,0 +1,90 @@
+# backend/mcp/write_behind.py
+"""
+Persistência write-behind do MCP.
+
+No modo write-behind a memória continua sendo a fonte da verdade: cada
+set/patch apenas marca o store como sujo e uma thread de fundo grava os
+stores sujos em lote, a cada `interval` segundos ou assim que `max_dirty`
+stores estiverem pendentes. Vários patches no mesmo store entre dois flushes
+resultam numa única escrita.
+"""
+
+import atexit
+import threading
+from typing import Callable, Iterable, Set
+
+FlushCallback = Callable[[Iterable[str]], None]
+
+
+class WriteBehindPersister:
+    """
+    Agrupa as persistências de stores e as executa numa thread de fundo.
+
+    Args:
+        flush_callback: função que persiste os store_ids recebidos (numa única transação)
+        interval: intervalo máximo, em segundos, entre flushes
+        max_dirty: número de stores sujos que dispara um flush antecipado
+    """
+
+    def __init__(self, flush_callback: FlushCallback, interval: float = 1.0, max_dirty: int = 8):
+        self._flush_callback = flush_callback
+        self.interval = interval
+        self.max_dirty = max(1, max_dirty)
+        self._dirty: Set[str] = set()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # Serializa flushes da thread e de flush() síncrono
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='mcp-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._dirty)
+
+    def mark_dirty(self, store_id: str):
+        """Marca o store para a próxima escrita em lote."""
+        with self._cond:
+            self._dirty.add(store_id)
+            if len(self._dirty) >= self.max_dirty:
+                self._cond.notify()
+
+    def flush(self):
+        """Grava imediatamente todos os stores sujos (durabilidade síncrona)."""
+        with self._flush_lock:
+            with self._cond:
+                dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return
+            try:
+                self._flush_callback(sorted(dirty))
+            except Exception as e:
+                # Devolve os stores à fila para a próxima tentativa
+                with self._cond:
+                    self._dirty.update(dirty)
+                print(f"[WriteBehindPersister] Erro ao gravar stores {sorted(dirty)}: {e}")
+                raise
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and len(self._dirty) < self.max_dirty:
+                    self._cond.wait(self.interval)
+                if self._stopped:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                pass  # Já registrado em flush(); tenta de novo no próximo ciclo
+
+    def stop(self):
+        """Encerra a thread de fundo e grava o que estiver pendente."""
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=self.interval + 5)
+        self.flush()
+        atexit.unregister(self.stop)
@@ -4,22 +4,36 @@ Rotas da API para gerenciamento de dados dos stores.
 Implementa endpoints REST para persistência via MCPDataManager.
 """
 
-from fastapi import APIRouter, HTTPException, Body
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Body, Depends, Header, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, List, Literal, Optional
 from datetime import datetime
+from pydantic import BaseModel
+import json
+import tempfile
 
 # Importações com fallback para diferentes estruturas de projeto
 try:
-    from ..mcp.data_manager import MCPDataManager
+    from ..mcp.backup import BackupReader, iter_backup_lines
+    from ..mcp.data_manager import MCPDataManager, VersionConflictError
 except ImportError:
     try:
-        from backend.mcp.data_manager import MCPDataManager
+        from backend.mcp.backup import BackupReader, iter_backup_lines
+        from backend.mcp.data_manager import MCPDataManager, VersionConflictError
     except ImportError:
-        from mcp.data_manager import MCPDataManager
+        from mcp.backup import BackupReader, iter_backup_lines
+        from mcp.data_manager import MCPDataManager, VersionConflictError
+
+from .project_context import project_id_param, resolve_manager
+from . import project_context  # registro de projetos (definido por main.py)
 
 # Instância global do data manager (será definida por main.py)
 mcp_data_manager = None
 
+# Intervalo (s) entre comentários de keep-alive no stream de alterações
+CHANGES_KEEPALIVE_SECONDS = 15.0
+
 router = APIRouter(prefix="/api/data", tags=["data"])
 
 def set_data_manager(data_manager: MCPDataManager):
@@ -27,96 +41,279 @@ def set_data_manager(data_manager: MCPDataManager):
     global mcp_data_manager
     mcp_data_manager = data_manager
 
+def make_etag(version: int) -> str:
+    """ETag de um store: a própria revisão (muda a cada alteração do store)."""
+    return f'"{version}"'
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """Lista de ETags de um cabeçalho If-Match/If-None-Match (aceita ETags fracas e '*')."""
+    if not header:
+        return []
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+def expected_version_from(if_match: Optional[str]) -> Optional[int]:
+    """Versão exigida por If-Match (None = sem condição). Levanta HTTPException se inválido."""
+    tags = parse_etags(if_match)
+    if not tags or tags == ["*"]:
+        return None
+    if len(tags) > 1:
+        raise HTTPException(status_code=400, detail="If-Match com mais de uma ETag não é suportado")
+    try:
+        return int(tags[0].strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"ETag inválida em If-Match: {tags[0]}")
+
+def store_response(data_manager: MCPDataManager, store_id: str) -> JSONResponse:
+    """Estado atual do store com a ETag correspondente (lidos juntos, de forma atômica)."""
+    version, data = data_manager.get_snapshot(store_id)
+    return JSONResponse(content=data, headers={"ETag": make_etag(version)})
+
+class BatchOperation(BaseModel):
+    """Uma operação do lote: leitura (get) ou escrita (put/patch/clear) de um store."""
+    op: Literal["get", "put", "patch", "clear"]
+    store_id: str
+    data: Optional[Dict[str, Any]] = None
+    if_match: Optional[str] = None       # Escritas: concorrência otimista (como o cabeçalho If-Match)
+    if_none_match: Optional[str] = None  # Leituras: 304 se a versão não mudou (como If-None-Match)
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    propagate: bool = True
+
+def version_conflict(e: VersionConflictError) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail=f"{e} (recarregue o store e tente novamente)",
+        headers={"ETag": make_etag(e.current_version)},
+    )
+
+def recompute_failed(store_id: str, error: str, version: int) -> HTTPException:
+    """409: o recálculo do módulo falhou com as entradas atuais, então o store está desatualizado."""
+    return HTTPException(
+        status_code=409,
+        detail={"message": f"O recálculo de '{store_id}' falhou; os dados do store estão desatualizados",
+                "store_id": store_id, "error": error},
+        headers={"ETag": make_etag(version)},
+    )
+
 @router.get("/health")
 async def health_check():
     """Verifica se a API de dados está funcionando."""
     return {"status": "ok", "message": "API de dados funcionando"}
 
+@router.get("/projects")
+async def list_projects():
+    """Lista os projetos (transformadores): o padrão, os gravados no banco e os ativos em memória."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+
+    if project_context.project_registry is None:
+        return {"projects": [{"project_id": "default", "active": True, "persisted": True}]}
+    try:
+        return {"projects": project_context.project_registry.list_projects()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar projetos: {str(e)}")
+
 @router.get("/stores")
-async def list_stores():
+async def list_stores(project_id: Optional[str] = Depends(project_id_param)):
     """Lista todos os stores disponíveis."""
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        stores = list(mcp_data_manager.store_definitions.keys())
+        stores = list(dm.store_definitions.keys())
         return {"stores": stores}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao listar stores: {str(e)}")
 
 @router.get("/stores/{store_id}")
-async def get_store_data(store_id: str):
-    """Obtém os dados de um store específico."""
+def get_store_data(store_id: str, if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                   project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Obtém os dados de um store específico.
+    Rota síncrona: o FastAPI a executa no threadpool, então leituras concorrentes
+    usam os locks de leitura por store do MCP sem bloquear o event loop.
+    A resposta traz a ETag da versão do store; com If-None-Match igual à versão
+    atual devolve 304 sem serializar o store. Se o recálculo do módulo falhou com as
+    entradas atuais, devolve 409 com o erro em vez dos dados desatualizados.
+    """
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        data = mcp_data_manager.get_data(store_id)
-        return data
+        if store_id not in dm.store_definitions:
+            return dm.get_data(store_id)  # Store não definido: resposta vazia, sem ETag
+        version, data = dm.get_snapshot(store_id)
+        error = dm.recompute_error(store_id)
+        if error is not None:
+            raise recompute_failed(store_id, error, version)
+        etag = make_etag(version)
+        tags = parse_etags(if_none_match)
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(content=data, headers={"ETag": etag})
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter dados: {str(e)}")
 
+@router.post("/stores:batch")
+def batch_stores(batch: BatchRequest, project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Várias leituras e escritas de stores numa única requisição.
+    As escritas (put/patch/clear) são aplicadas juntas, numa única transação SQLite,
+    e a propagação roda no máximo uma vez por raiz de dependência. Se alguma
+    If-Match não conferir, nada é gravado (412). As leituras (get) refletem o
+    estado após as escritas do lote; a de um módulo cujo recálculo falhou vem com
+    status 409 e o erro, sem os dados.
+    """
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    for operation in batch.operations:
+        if operation.store_id not in dm.store_definitions:
+            raise HTTPException(status_code=404, detail=f"Store '{operation.store_id}' não existe")
+
+    try:
+        writes = [
+            {"op": operation.op, "store_id": operation.store_id, "data": operation.data,
+             "expected_version": expected_version_from(operation.if_match)}
+            for operation in batch.operations if operation.op != "get"
+        ]
+        write_result = (dm.apply_batch(writes, propagate=batch.propagate)
+                        if writes else {"versions": {}, "changed": [], "propagation": {}})
+
+        results = []
+        for operation in batch.operations:
+            version, data = dm.get_snapshot(operation.store_id)
+            etag = make_etag(version)
+            if operation.op == "get":
+                tags = parse_etags(operation.if_none_match)
+                error = dm.recompute_error(operation.store_id)
+                if error is not None:
+                    results.append({"op": "get", "store_id": operation.store_id, "status": 409,
+                                    "etag": etag, "error": error})
+                elif etag in tags or "*" in tags:
+                    results.append({"op": "get", "store_id": operation.store_id, "status": 304, "etag": etag})
+                else:
+                    results.append({"op": "get", "store_id": operation.store_id, "status": 200,
+                                    "etag": etag, "data": data})
+            else:
+                results.append({"op": operation.op, "store_id": operation.store_id, "status": 200, "etag": etag})
+        return {
+            "results": results,
+            "changed": write_result["changed"],
+            "propagation": write_result["propagation"],
+        }
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise version_conflict(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao processar lote: {str(e)}")
+
 @router.put("/stores/{store_id}")
-async def set_store_data(store_id: str, data: Dict[str, Any] = Body(...)):
-    """Define os dados completos de um store."""
+def set_store_data(store_id: str, data: Dict[str, Any] = Body(...),
+                   if_match: Optional[str] = Header(None, alias="If-Match"),
+                   project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Define os dados completos de um store.
+    Com If-Match, só grava se o store ainda estiver na versão indicada (senão 412).
+    """
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        success = mcp_data_manager.set_data(store_id, data)
+        success = dm.set_data(store_id, data, expected_version=expected_version_from(if_match))
         if success:
-            return mcp_data_manager.get_data(store_id)
+            return store_response(dm, store_id)
         else:
             raise HTTPException(status_code=500, detail="Falha ao salvar dados")
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise version_conflict(e)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao definir dados: {str(e)}")
 
 @router.patch("/stores/{store_id}")
-async def update_store_data(store_id: str, partial_data: Dict[str, Any] = Body(...)):
-    """Atualiza parcialmente os dados de um store."""
+def update_store_data(store_id: str, partial_data: Dict[str, Any] = Body(...),
+                      if_match: Optional[str] = Header(None, alias="If-Match"),
+                      project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Atualiza parcialmente os dados de um store.
+    Com If-Match, só grava se o store ainda estiver na versão indicada (senão 412).
+    """
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        success = mcp_data_manager.patch_data(store_id, partial_data)
+        success = dm.patch_data(store_id, partial_data,
+                                              expected_version=expected_version_from(if_match))
         if success:
-            return mcp_data_manager.get_data(store_id)
+            return store_response(dm, store_id)
         else:
             raise HTTPException(status_code=500, detail="Falha ao atualizar dados")
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise version_conflict(e)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao atualizar dados: {str(e)}")
 
 @router.delete("/stores/{store_id}")
-async def clear_store_data(store_id: str):
-    """Limpa os dados de um store específico."""
+def clear_store_data(store_id: str, if_match: Optional[str] = Header(None, alias="If-Match"),
+                     project_id: Optional[str] = Depends(project_id_param)):
+    """Limpa os dados de um store específico (com If-Match, só se a versão ainda for a indicada)."""
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        success = mcp_data_manager.clear_store(store_id)
+        success = dm.clear_store(store_id, expected_version=expected_version_from(if_match))
         if success:
-            return {"message": f"Store {store_id} limpo com sucesso"}
+            return JSONResponse(content={"message": f"Store {store_id} limpo com sucesso"},
+                                headers={"ETag": make_etag(dm.get_version(store_id))})
         else:
             raise HTTPException(status_code=500, detail="Falha ao limpar store")
+    except HTTPException:
+        raise
+    except VersionConflictError as e:
+        raise version_conflict(e)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao limpar store: {str(e)}")
 
 @router.delete("/stores")
-async def clear_all_stores():
+async def clear_all_stores(project_id: Optional[str] = Depends(project_id_param)):
     """Limpa todos os stores."""
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        success = mcp_data_manager.clear_all_stores()
+        success = dm.clear_all_stores()
         if success:
             return {"message": "Todos os stores foram limpos com sucesso"}
         else:
@@ -124,14 +321,93 @@ async def clear_all_stores():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao limpar stores: {str(e)}")
 
+@router.get("/changes")
+async def stream_changes(
+    request: Request,
+    stores: Optional[str] = Query(None, description="Lista de store_ids separados por vírgula (padrão: todos)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+
+    project_id: Optional[str] = Depends(project_id_param),
+):
+    """
+    Stream Server-Sent Events com as alterações dos stores.
+    Cada evento 'change' traz {store_id, version, changed_keys}; um evento 'resync'
+    indica que o cliente perdeu eventos e deve recarregar os stores em cache.
+    """
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    store_ids = [s.strip() for s in stores.split(",") if s.strip()] if stores else None
+    last_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    feed = dm.change_feed
+    subscription = feed.subscribe(store_ids, last_seq)
+
+    async def event_stream():
+        try:
+            # Evento inicial com a sequência atual: o cliente usa como referência para reconexões.
+            # Numa reconexão o id é omitido para não passar à frente dos eventos reenviados.
+            ready_id = f"id: {feed.last_seq}\n" if last_seq is None else ""
+            yield f"{ready_id}event: ready\ndata: {json.dumps({'seq': feed.last_seq})}\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=CHANGES_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_type = event.get('type', 'change')
+                yield f"id: {event['seq']}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stores/{store_id}/versions")
+async def list_store_versions(store_id: str, project_id: Optional[str] = Depends(project_id_param)):
+    """Lista o histórico de versões de um store (deltas e checkpoints)."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    if store_id not in dm.store_definitions:
+        raise HTTPException(status_code=404, detail=f"Store '{store_id}' não existe")
+    try:
+        return {
+            "store_id": store_id,
+            "current_version": dm.get_version(store_id),
+            "versions": dm.list_store_versions(store_id)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar versões: {str(e)}")
+
+@router.get("/stores/{store_id}/versions/{version}")
+async def get_store_version(store_id: str, version: int,
+                            project_id: Optional[str] = Depends(project_id_param)):
+    """Reconstrói os dados de um store numa versão passada."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    try:
+        data = dm.get_data_at_version(store_id, version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao reconstruir versão: {str(e)}")
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Versão {version} do store '{store_id}' não encontrada")
+    return {"store_id": store_id, "version": version, "data": data}
+
 @router.get("/stores/{store_id}/export")
-async def export_store_data(store_id: str):
+def export_store_data(store_id: str, project_id: Optional[str] = Depends(project_id_param)):
     """Exporta os dados de um store em formato JSON."""
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        data = mcp_data_manager.get_data(store_id)
+        data = dm.get_data(store_id)
         return {
             "store_id": store_id,
             "data": data,
@@ -143,20 +419,22 @@ async def export_store_data(store_id: str):
         raise HTTPException(status_code=500, detail=f"Erro ao exportar dados: {str(e)}")
 
 @router.post("/stores/{store_id}/import")
-async def import_store_data(store_id: str, import_data: Dict[str, Any] = Body(...)):
+def import_store_data(store_id: str, import_data: Dict[str, Any] = Body(...),
+                      project_id: Optional[str] = Depends(project_id_param)):
     """Importa dados para um store."""
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
         # Extrai apenas os dados, ignorando metadados de exportação
         data_to_import = import_data.get("data", import_data)
-        success = mcp_data_manager.set_data(store_id, data_to_import)
+        success = dm.set_data(store_id, data_to_import)
 
         if success:
             return {
                 "message": f"Dados importados com sucesso para o store {store_id}",
-                "data": mcp_data_manager.get_data(store_id)
+                "data": dm.get_data(store_id)
             }
         else:
             raise HTTPException(status_code=500, detail="Falha ao importar dados")
@@ -166,40 +444,78 @@ async def import_store_data(store_id: str, import_data: Dict[str, Any] = Body(..
         raise HTTPException(status_code=500, detail=f"Erro ao importar dados: {str(e)}")
 
 @router.get("/backup")
-async def backup_all_data():
-    """Cria um backup completo de todos os stores."""
+def backup_all_data(compress: bool = Query(False, description="Comprime o backup em gzip"),
+                    project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Backup completo de todos os stores em NDJSON: uma linha de cabeçalho, uma
+    linha por store e o registro final {"type": "end"}, gerado em streaming a partir
+    de uma visão consistente dos stores. Erros no recálculo ou na leitura dos stores
+    acontecem antes da resposta (500); uma falha já durante o streaming termina o
+    arquivo com {"type": "error"}, que a restauração recusa.
+    """
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        all_stores = mcp_data_manager.get_all_stores()
-        return {
-            "backup_timestamp": datetime.now().isoformat(),
-            "stores": all_stores
-        }
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"tts_backup_{timestamp}.ndjson" + (".gz" if compress else "")
+        return StreamingResponse(
+            iter_backup_lines(dm, compress=compress),
+            media_type="application/gzip" if compress else "application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao criar backup: {str(e)}")
 
 @router.post("/restore")
-async def restore_all_data(backup_data: Dict[str, Any] = Body(...)):
-    """Restaura dados de um backup completo."""
+async def restore_all_data(request: Request, project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Restaura um backup (NDJSON, NDJSON.gz ou o JSON antigo {"stores": {...}}).
+    Um backup ndjson-v2 sem o registro final (truncado ou interrompido) é recusado.
+    O upload é lido em blocos e decodificado linha a linha; cada store vai para um arquivo
+    temporário (em memória fica só o índice store_id → posição). Com o backup inteiro
+    validado, os stores são gravados numa única transação (MCPDataManager.restore_stores)
+    e só depois publicados e propagados: um backup inválido não altera nenhum store.
+    """
     if not mcp_data_manager:
         raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
 
     try:
-        stores_data = backup_data.get("stores", {})
-        restored_stores = []
+        reader = BackupReader()
+        offsets: Dict[str, int] = {}  # Última ocorrência de cada store no arquivo temporário
+        skipped_stores = []
+        with tempfile.TemporaryFile() as spool:
+            def collect(records):
+                for record in records:
+                    if record.get("type") != "store":
+                        continue
+                    store_id = record.get("store_id")
+                    if store_id in dm.store_definitions:
+                        offsets[store_id] = spool.tell()
+                        spool.write((json.dumps(record.get("data") or {}, ensure_ascii=False) + "\n").encode("utf-8"))
+                    else:
+                        skipped_stores.append(store_id)
+
+            async for chunk in request.stream():
+                collect(reader.feed(chunk))
+            collect(reader.close())
 
-        for store_id, data in stores_data.items():
-            if store_id in mcp_data_manager.store_definitions:
-                success = mcp_data_manager.set_data(store_id, data)
-                if success:
-                    restored_stores.append(store_id)
+            def load(store_id: str) -> Dict[str, Any]:
+                spool.seek(offsets[store_id])
+                return json.loads(spool.readline())
 
+            result = await run_in_threadpool(dm.restore_stores, list(offsets), load)
+        restored_stores = list(offsets)
         return {
             "message": f"Backup restaurado com sucesso",
             "restored_stores": restored_stores,
+            "changed_stores": result["changed"],
+            "skipped_stores": skipped_stores,
             "total_stores": len(restored_stores)
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Backup inválido: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao restaurar backup: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao restaurar backup: {str(e)}")
@@ -0,0 +1,36 @@
+# backend/routers/project_context.py
+"""
+Seleção do projeto (transformador) nas rotas.
+
+O projeto vem do cabeçalho X-Project-Id ou do parâmetro de query `project`
+(o EventSource do navegador não envia cabeçalhos). Sem projeto, as rotas usam
+o projeto padrão, como antes.
+"""
+
+from typing import Optional
+
+from fastapi import Header, HTTPException, Query
+
+# Registro de projetos (definido por main.py); sem ele só existe o projeto padrão
+project_registry = None
+
+def set_project_registry(registry):
+    """Define o ProjectRegistry usado para resolver o projeto das requisições."""
+    global project_registry
+    project_registry = registry
+
+def project_id_param(
+    project: Optional[str] = Query(None, description="Projeto/transformador (padrão: 'default')"),
+    x_project_id: Optional[str] = Header(None, alias="X-Project-Id"),
+) -> Optional[str]:
+    """Dependência FastAPI: identificador do projeto da requisição (None = padrão)."""
+    return project or x_project_id
+
+def resolve_manager(default_manager, project_id: Optional[str]):
+    """MCPDataManager do projeto; HTTP 400 se o identificador for inválido."""
+    if not project_id or project_registry is None:
+        return default_manager
+    try:
+        return project_registry.get(project_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,142 @@
+# backend/routers/session_routes.py
+"""
+Rotas da API para o catálogo de sessões salvas.
+A listagem é paginada por cursor e aceita busca textual (nome, descrição, data
+e parâmetros do transformador, ex.: "300 MVA 500 kV 2025").
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from pydantic import BaseModel
+
+# Importações com fallback para diferentes estruturas de projeto
+try:
+    from ..mcp.data_manager import MCPDataManager, PROJECT_KEY_SEPARATOR
+    from ..mcp.session_catalog import MAX_PAGE_SIZE
+    from ..mcp.session_diff import iter_session_diff_lines
+except ImportError:
+    try:
+        from backend.mcp.data_manager import MCPDataManager, PROJECT_KEY_SEPARATOR
+        from backend.mcp.session_catalog import MAX_PAGE_SIZE
+        from backend.mcp.session_diff import iter_session_diff_lines
+    except ImportError:
+        from mcp.data_manager import MCPDataManager, PROJECT_KEY_SEPARATOR
+        from mcp.session_catalog import MAX_PAGE_SIZE
+        from mcp.session_diff import iter_session_diff_lines
+
+from .project_context import project_id_param, resolve_manager
+
+# Instância global do data manager (será definida por main.py)
+mcp_data_manager = None
+
+router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+
+def set_data_manager(data_manager: MCPDataManager):
+    """Define a instância do data manager para uso nas rotas."""
+    global mcp_data_manager
+    mcp_data_manager = data_manager
+
+class SessionCreate(BaseModel):
+    """Nova sessão: snapshot de todos os stores do projeto."""
+    session_id: str
+    description: str = ""
+
+@router.get("")
+def list_sessions(q: Optional[str] = Query(None, description="Busca: termos como prefixo, todos obrigatórios"),
+                  limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                  cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+                  project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Página do catálogo de sessões, mais recentes primeiro.
+    Devolve {'sessions': [...], 'next_cursor': ...}; next_cursor é null na última página.
+    """
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    try:
+        return dm.search_sessions(q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao listar sessões: {str(e)}")
+
+@router.post("")
+def create_session(session: SessionCreate, project_id: Optional[str] = Depends(project_id_param)):
+    """Salva o estado atual dos stores como sessão (substitui uma sessão com o mesmo nome)."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    session_id = session.session_id.strip()
+    if not session_id or PROJECT_KEY_SEPARATOR in session_id:
+        raise HTTPException(status_code=400, detail=f"Nome de sessão inválido: '{session.session_id}'")
+    try:
+        dm.save_session(session_id, session.description)
+        return {"message": f"Sessão '{session_id}' salva com sucesso", "session_id": session_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao salvar sessão: {str(e)}")
+
+@router.post("/{session_id}/load")
+def load_session(session_id: str, project_id: Optional[str] = Depends(project_id_param)):
+    """Substitui os stores do projeto pelos da sessão."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    try:
+        if not dm.load_session(session_id):
+            raise HTTPException(status_code=404, detail=f"Sessão '{session_id}' não encontrada")
+        return {"message": f"Sessão '{session_id}' carregada com sucesso"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao carregar sessão: {str(e)}")
+
+@router.get("/{session_a}/diff/{session_b}")
+def diff_sessions(session_a: str, session_b: str,
+                  stores: Optional[str] = Query(None, description="Stores a comparar, separados por vírgula"),
+                  project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Diferença estrutural entre duas sessões salvas, em NDJSON (uma linha por
+    caminho alterado, e um resumo no fim). Lida direto dos blobs das sessões:
+    não carrega nenhuma delas nem altera os stores atuais. Stores com o mesmo
+    hash nas duas sessões não são lidos.
+    """
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    try:
+        manifests = {}
+        for session_id in (session_a, session_b):
+            manifests[session_id] = dm.session_manifest(session_id)
+            if manifests[session_id] is None:
+                raise HTTPException(status_code=404, detail=f"Sessão '{session_id}' não encontrada")
+        store_filter = [s.strip() for s in stores.split(",") if s.strip()] if stores else None
+        return StreamingResponse(
+            iter_session_diff_lines(dm, session_a, session_b, manifests[session_a], manifests[session_b],
+                                    store_filter),
+            media_type="application/x-ndjson",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao comparar sessões: {str(e)}")
+
+@router.delete("/{session_id}")
+def delete_session(session_id: str, project_id: Optional[str] = Depends(project_id_param)):
+    """Remove a sessão do catálogo."""
+    if not mcp_data_manager:
+        raise HTTPException(status_code=500, detail="Data manager não inicializado")
+    dm = resolve_manager(mcp_data_manager, project_id)
+
+    try:
+        if not dm.delete_session(session_id):
+            raise HTTPException(status_code=404, detail=f"Sessão '{session_id}' não encontrada")
+        return {"message": f"Sessão '{session_id}' excluída com sucesso"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao excluir sessão: {str(e)}")
@@ -2,7 +2,7 @@
 import sys
 import pathlib
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends
 from typing import Dict, Any, Optional, Union
 from pydantic import BaseModel, field_validator
 
@@ -22,11 +22,13 @@ try:
     from ..services import transformer_service
     from ..services import losses_service
     from ..services import impulse_service
+    from ..services import impulse_optimizer_service
     from ..services import applied_voltage_service
     from ..services import induced_voltage_service
     from ..services import short_circuit_service
     from ..services import temperature_service
     from ..services import dielectric_service
+    from .project_context import project_id_param, resolve_manager
 except ImportError as e:
     print(f"Erro ao importar módulos em transformer_routes: {e}")
     sys.exit(1) # Saia se as importações essenciais falharem
@@ -86,11 +88,13 @@ class TransformerInputsData(BaseModel):
     teste_tensao_aplicada_terciario: Optional[Union[float, str]] = None
 
 @router.post("/inputs")
-async def update_transformer_inputs(data: TransformerInputsData = Body(...)):
+def update_transformer_inputs(data: TransformerInputsData = Body(...),
+                              project_id: Optional[str] = Depends(project_id_param)):
     """
     Recebe os dados de entrada do formulário do transformador,
     calcula os valores derivados e os persiste no store 'transformer_inputs'.
     """
+    dm = resolve_manager(mcp_data_manager, project_id)
     try:
         # Converte o Pydantic Model para um dicionário
         input_data_dict = data.model_dump(exclude_unset=True)
@@ -106,7 +110,7 @@ async def update_transformer_inputs(data: TransformerInputsData = Body(...)):
         if mcp_data_manager is None:
             raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
 
-        success = mcp_data_manager.patch_data('transformerInputs', {"formData": final_data})
+        success = dm.patch_data('transformerInputs', {"formData": final_data})
 
         if success:
             return {
@@ -122,53 +126,90 @@ async def update_transformer_inputs(data: TransformerInputsData = Body(...)):
         raise HTTPException(status_code=500, detail=f"Erro ao processar dados do transformador: {str(e)}")
 
 @router.post("/propagate")
-async def trigger_propagation():
+def trigger_propagation(project_id: Optional[str] = Depends(project_id_param)):
     """
     Dispara propagação manual para todos os módulos dependentes
     """
+    dm = resolve_manager(mcp_data_manager, project_id)
     try:
         if mcp_data_manager is None:
             raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
 
-        # Habilita propagação temporariamente
-        mcp_data_manager.enable_auto_propagation()
+        # Dispara propagação manual para transformerInputs (em processo, sem alterar o modo automático)
+        report = dm._propagate_changes('transformerInputs', force=True)
 
-        # Dispara propagação manual para transformerInputs
-        mcp_data_manager._propagate_changes('transformerInputs')
-
-        # Desabilita novamente
-        mcp_data_manager.disable_auto_propagation()
-
-        return {"status": "success", "message": "Propagação executada com sucesso"}
+        return {"status": "success", "message": "Propagação executada com sucesso", "report": report}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao executar propagação: {str(e)}")
 
 @router.post("/propagation/enable")
-async def enable_propagation():
+async def enable_propagation(project_id: Optional[str] = Depends(project_id_param)):
     """Habilita propagação automática"""
+    dm = resolve_manager(mcp_data_manager, project_id)
     if mcp_data_manager is None:
         raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
 
-    mcp_data_manager.enable_auto_propagation()
+    dm.enable_auto_propagation()
     return {"status": "success", "message": "Propagação automática habilitada"}
 
 @router.post("/propagation/disable")
-async def disable_propagation():
+async def disable_propagation(project_id: Optional[str] = Depends(project_id_param)):
     """Desabilita propagação automática"""
+    dm = resolve_manager(mcp_data_manager, project_id)
     if mcp_data_manager is None:
         raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
 
-    mcp_data_manager.disable_auto_propagation()
+    dm.disable_auto_propagation()
     return {"status": "success", "message": "Propagação automática desabilitada"}
 
+@router.get("/propagation/status")
+async def propagation_status(project_id: Optional[str] = Depends(project_id_param)):
+    """Modos de propagação e módulos sujos (a recalcular na próxima leitura)"""
+    dm = resolve_manager(mcp_data_manager, project_id)
+    if mcp_data_manager is None:
+        raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
+
+    return {
+        "auto_propagation": dm._auto_propagation_enabled,
+        "lazy_recompute": dm._lazy_recompute_enabled,
+        "speculative": dm.speculative_status(),
+        "dirty": dm.dirty_stores(),
+    }
+
+@router.post("/impulse/optimize")
+def optimize_impulse_generator(data: Dict[str, Any] = Body(...),
+                               project_id: Optional[str] = Depends(project_id_param)):
+    """
+    Montagens do gerador de impulso (configuração, resistores, indutor) conformes para o
+    objeto de teste, ordenadas. Sem tensao_ensaio_kv, usa o NBI (ou SIL, na manobra) da AT
+    em transformerInputs.
+    """
+    dm = resolve_manager(mcp_data_manager, project_id)
+    if mcp_data_manager is None:
+        raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
+
+    try:
+        params = dict(data)
+        if not params.get("tensao_ensaio_kv"):
+            form_data = (dm.get_data('transformerInputs') or {}).get('formData') or {}
+            campo = 'sil_at' if params.get("tipo_impulso") == "Manobra" else 'nbi_at'
+            params["tensao_ensaio_kv"] = form_data.get(campo)
+        return impulse_optimizer_service.optimize_impulse_generator(params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na otimização do gerador de impulso: {str(e)}")
+
 # Rotas para processamento de módulos específicos conforme arquitetura TTS
 @router.post("/modules/{module_id}/process")
-async def process_module_data(module_id: str, data: Dict[str, Any] = Body(...)):
+def process_module_data(module_id: str, data: Dict[str, Any] = Body(...),
+                        project_id: Optional[str] = Depends(project_id_param)):
     """
     Processa dados específicos de um módulo.
     Arquitetura TTS: Dados Básicos + Inputs Específicos → Services → MCP
     """
+    dm = resolve_manager(mcp_data_manager, project_id)
     try:
         # Valida módulos ativos conforme especificação
         valid_modules = ['losses', 'impulse', 'appliedVoltage', 'inducedVoltage',
@@ -190,8 +231,8 @@ async def process_module_data(module_id: str, data: Dict[str, Any] = Body(...)):
                 input_data = data.get('data', {})
                 processed_data = losses_service.calculate_no_load_losses(input_data)
                 # Salvar apenas os inputs no MCP
-                if mcp_data_manager:
-                    mcp_data_manager.patch_data(f"{module_id}-inputs", {
+                if dm:
+                    dm.patch_data(f"{module_id}-inputs", {
                         "no_load_inputs": input_data,
                         "timestamp": datetime.now().isoformat()
                     })
@@ -205,8 +246,8 @@ async def process_module_data(module_id: str, data: Dict[str, Any] = Body(...)):
                     "perdas_carga_kw_u_nom": input_data.get("perdas_carga_kw_u_nom"),
                     "perdas_carga_kw_u_max": input_data.get("perdas_carga_kw_u_max")
                 }
-                if mcp_data_manager:
-                    mcp_data_manager.patch_data(f"{module_id}-inputs", {
+                if dm:
+                    dm.patch_data(f"{module_id}-inputs", {
                         "load_inputs": load_inputs_only,
                         "timestamp": datetime.now().isoformat()
                     })
@@ -250,7 +291,7 @@ async def process_module_data(module_id: str, data: Dict[str, Any] = Body(...)):
             'lastUpdated': str(pathlib.Path(__file__).stat().st_mtime)  # timestamp simples
         }
 
-        success = mcp_data_manager.patch_data(module_id, store_data)
+        success = dm.patch_data(module_id, store_data)
 
         if not success:
             raise HTTPException(status_code=500, detail=f"Erro ao armazenar dados do módulo {module_id}")
@@ -268,11 +309,13 @@ async def process_module_data(module_id: str, data: Dict[str, Any] = Body(...)):
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 @router.post("/global-update")
-async def trigger_global_update(data: Dict[str, Any] = Body(...)):
+def trigger_global_update(data: Dict[str, Any] = Body(...),
+                          project_id: Optional[str] = Depends(project_id_param)):
     """
     Dispara atualização global do MCP em ciclo estruturado.
     Arquitetura TTS: Dados Básicos → Propagam para todos os módulos → MCP atualizado
     """
+    dm = resolve_manager(mcp_data_manager, project_id)
     try:
         if mcp_data_manager is None:
             raise HTTPException(status_code=500, detail="Sistema de dados não inicializado")
@@ -280,7 +323,7 @@ async def trigger_global_update(data: Dict[str, Any] = Body(...)):
         triggered_by = data.get('triggeredBy', 'unknown')
 
         # 1. Obtém dados básicos (fonte da verdade)
-        basic_data = mcp_data_manager.get_data('transformerInputs')
+        basic_data = dm.get_data('transformerInputs')
         if not basic_data:
             basic_data = {}
 
@@ -296,7 +339,7 @@ async def trigger_global_update(data: Dict[str, Any] = Body(...)):
         for module_id in active_modules:
             try:
                 # Obtém dados específicos do módulo
-                module_data = mcp_data_manager.get_data(module_id)
+                module_data = dm.get_data(module_id)
                 module_inputs = module_data.get('inputs', {}) if module_data else {}
 
                 # Atualiza store do módulo com dados básicos propagados
@@ -307,7 +350,7 @@ async def trigger_global_update(data: Dict[str, Any] = Body(...)):
                     'lastGlobalUpdate': str(pathlib.Path(__file__).stat().st_mtime)
                 }
 
-                success = mcp_data_manager.patch_data(module_id, updated_store_data)
+                success = dm.patch_data(module_id, updated_store_data)
 
                 update_results[module_id] = {
                     'status': 'updated' if success else 'error',
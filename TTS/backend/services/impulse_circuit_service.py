@@ -0,0 +1,336 @@
+"""
+Serviço de simulação do circuito de impulso no espaço de estados
+Resolve o circuito linear do gerador de múltiplos estágios, divisor e objeto de teste
+(com a malha de corte no impulso cortado), substituindo a dupla exponencial ideal.
+
+Circuito equivalente (n estágios em série, p colunas em paralelo):
+    Cg = C_PER_STAGE_F · p / n, com Rt em paralelo (lado do gerador)
+    malha série: R = Rf + R_PARASITIC_OHM  e  L = L_PER_STAGE_H · n / p + L_externa
+    carga: Cl = C_objeto + C_parasita + C_divisor (+ C_CHOPPING_GAP_F no impulso cortado)
+Os resistores de impulso atmosférico (RESISTORS_LI_*) são o valor total de uma coluna de
+estágios, como em RF_REFERENCE_DATA_LI e RT_DEFAULT_PER_COLUMN: Rf = Rf_coluna / p e
+Rt = Rt_coluna / p. Os de manobra (RESISTORS_SI_*) são por estágio: R = R_estágio · n / p.
+
+Estados x = [vg, i, vl] (tensão em Cg, corrente da malha série, tensão na carga):
+    Cg · dvg/dt = -vg/Rt - i
+    L  · di/dt  = vg - R·i - vl
+    Cl · dvl/dt = i
+Depois do corte, o gap fecha e entra o estado ig (corrente do gap, malha R_PARASITIC_OHM-L_CHOPPING_GAP_H):
+    Cl · dvl/dt = i - ig
+    Lc · dig/dt = vl - R_PARASITIC_OHM·ig
+
+A resposta é x(t) = V · e^(Λ·t) · V⁻¹ · x0, calculada de uma vez sobre todo o vetor de tempos.
+As matrizes e suas decomposições são montadas uma vez por configuração e ficam em cache,
+assim como as respostas por vetor de tempos.
+
+sampling_steps dá, a partir dos autovalores, o espaçamento inicial da amostragem adaptativa
+(utils.adaptive_grid) em cada trecho: o teste no ponto médio não enxerga uma oscilação mais
+rápida que o espaçamento, como a do gap depois do corte.
+
+equivalent_circuit, double_exponential e series_damping também são usadas (vetorizadas)
+pelo impulse_optimizer_service, para que os dois modelos não divirjam.
+"""
+
+import sys
+import pathlib
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+# Ajusta o path para permitir importações corretas
+current_file = pathlib.Path(__file__).absolute()
+current_dir = current_file.parent
+backend_dir = current_dir.parent
+root_dir = backend_dir.parent
+
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+try:
+    from ..utils import constants as const
+except ImportError:
+    try:
+        from backend.utils import constants as const
+    except ImportError:
+        from utils import constants as const
+
+# Modelos (matrizes + decomposições) e respostas mantidos em cache
+CACHE_MODELOS = 256
+CACHE_RESPOSTAS = 64
+# Acima deste número de condição dos autovetores a decomposição é instável (matriz quase defeituosa)
+# e a resposta é calculada pela exponencial de matriz
+CONDICAO_MAXIMA_AUTOVETORES = 1e10
+# Divisor de alta tensão usado a partir desta tensão máxima do gerador (kV)
+TENSAO_DIVISOR_ALTA_KV = 1200
+# Índice da tensão na carga no vetor de estados
+ESTADO_CARGA = 2
+# Amostragem adaptativa: intervalos iniciais por 2π/|λ| de cada modo, enquanto o modo não decair
+# abaixo da tolerância (com esta margem sobre a amplitude relativa ao pico)
+PASSOS_POR_PERIODO = 16
+MARGEM_AMPLITUDE_MODO = 10.0
+
+
+def generator_configuration(valor: str) -> Dict[str, Any]:
+    """Configuração do gerador em GENERATOR_CONFIGURATIONS pelo valor (ex.: "6S-1P"); ValueError se não existir."""
+    for config in const.GENERATOR_CONFIGURATIONS:
+        if config["value"] == valor:
+            return config
+    raise ValueError(f"Configuração do gerador desconhecida: '{valor}'")
+
+
+def divider_capacitance_f(max_voltage_kv):
+    """Capacitância do divisor (F) usado com um gerador de tensão máxima `max_voltage_kv` (escalar ou array)."""
+    return np.where(np.asarray(max_voltage_kv) >= TENSAO_DIVISOR_ALTA_KV,
+                    const.C_DIVIDER_HIGH_VOLTAGE_F, const.C_DIVIDER_LOW_VOLTAGE_F)
+
+
+def resistors_per_column(tipo_impulso: str) -> bool:
+    """Os resistores do tipo de impulso são valores por coluna (LI e cortado) ou por estágio (manobra)."""
+    return tipo_impulso != "Manobra"
+
+
+def equivalent_circuit(stages, parallel, max_voltage_kv, resistor_frontal, resistor_cauda,
+                       capacitancia_objeto_pf, capacitancia_parasita_pf, indutancia_externa_h=0.0,
+                       cortado: bool = False, por_coluna: bool = True) -> Dict[str, Any]:
+    """
+    Componentes do circuito equivalente (escalares ou arrays do mesmo formato), em unidades SI:
+    cg_f, rf_ohm, rt_ohm, r_serie_ohm (Rf + R_PARASITIC_OHM), l_h e cl_f.
+    Com `por_coluna`, os resistores são o total de uma coluna (÷ p); senão, por estágio (· n / p).
+    Usado pelo CircuitModel e, sobre todas as combinações de uma vez, pelo otimizador.
+    """
+    cl_f = (np.asarray(capacitancia_objeto_pf) + capacitancia_parasita_pf) * 1e-12 + divider_capacitance_f(max_voltage_kv)
+    if cortado:
+        cl_f = cl_f + const.C_CHOPPING_GAP_F
+    fator_resistores = 1 / np.asarray(parallel) if por_coluna else np.asarray(stages) / parallel
+    rf_ohm = resistor_frontal * fator_resistores
+    return {
+        "cg_f": const.C_PER_STAGE_F * np.asarray(parallel) / stages,
+        "rf_ohm": rf_ohm,
+        "rt_ohm": resistor_cauda * fator_resistores,
+        "r_serie_ohm": rf_ohm + const.R_PARASITIC_OHM,
+        "l_h": const.L_PER_STAGE_H * np.asarray(stages) / parallel + indutancia_externa_h,
+        "cl_f": cl_f,
+    }
+
+
+def double_exponential(r_serie_ohm, rt_ohm, cg_f, cl_f) -> Tuple[Any, Any, Any]:
+    """
+    Curva base do circuito (sem indutância): V(t)/V₀ = k/(β-α) · (e^(-αt) - e^(-βt)).
+    α e β são as raízes de s² + (1/(R·Cl) + 1/(R·Cg) + 1/(Rt·Cg))·s + 1/(R·Rt·Cg·Cl) e k = 1/(R·Cl).
+    Devolve (α, β) em 1/s e k/(β-α) (adimensional); as raízes são sempre reais (circuito RC superamortecido).
+    """
+    soma = 1 / (r_serie_ohm * cl_f) + 1 / (r_serie_ohm * cg_f) + 1 / (rt_ohm * cg_f)
+    raiz = np.sqrt(soma ** 2 - 4 / (r_serie_ohm * rt_ohm * cg_f * cl_f))
+    alfa, beta = (soma - raiz) / 2, (soma + raiz) / 2
+    return alfa, beta, 1 / (r_serie_ohm * cl_f) / (beta - alfa)
+
+
+def series_damping(r_serie_ohm, l_h, cg_f, cl_f):
+    """Amortecimento ζ da malha série Cg-L-Cl (ζ < 1: oscilatória)."""
+    cs = cg_f * cl_f / (cg_f + cl_f)
+    return r_serie_ohm / 2 * np.sqrt(cs / l_h)
+
+
+def _decompose(a: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """(autovalores, autovetores, inversa dos autovetores) de `a`, ou None se mal condicionada."""
+    autovalores, autovetores = np.linalg.eig(a)
+    if np.linalg.cond(autovetores) > CONDICAO_MAXIMA_AUTOVETORES:
+        return None
+    return autovalores, autovetores, np.linalg.inv(autovetores)
+
+
+class CircuitModel:
+    """
+    Matrizes de estado do circuito de uma configuração (tempo em μs) e suas decomposições.
+    Criado por build_circuit_model, que mantém um cache por configuração.
+    """
+
+    def __init__(self, config: Dict[str, Any], resistor_frontal: float, resistor_cauda: float,
+                 capacitancia_objeto_pf: float, capacitancia_parasita_pf: float,
+                 indutancia_externa_uh: float, cortado: bool, por_coluna: bool):
+        n, p = config["stages"], config["parallel"]
+        # Identifica o modelo no cache de respostas
+        self.chave = (config["value"], resistor_frontal, resistor_cauda, capacitancia_objeto_pf,
+                      capacitancia_parasita_pf, indutancia_externa_uh, cortado, por_coluna)
+        self.configuracao = config["value"]
+        self.max_voltage_kv = config["max_voltage_kv"]
+        circuito = {nome: float(valor) for nome, valor in equivalent_circuit(
+            n, p, self.max_voltage_kv, resistor_frontal, resistor_cauda, capacitancia_objeto_pf,
+            capacitancia_parasita_pf, indutancia_externa_uh * 1e-6, cortado, por_coluna).items()}
+        self.cg_f, self.rf_ohm, self.rt_ohm = circuito["cg_f"], circuito["rf_ohm"], circuito["rt_ohm"]
+        self.r_serie_ohm, self.l_h, self.cl_f = circuito["r_serie_ohm"], circuito["l_h"], circuito["cl_f"]
+        if min(self.cg_f, self.rf_ohm, self.rt_ohm, self.l_h, self.cl_f) <= 0:
+            raise ValueError("Componentes do circuito de impulso devem ser positivos")
+
+        # Matrizes em 1/μs (tempo em μs)
+        cg, cl, l, r = self.cg_f, self.cl_f, self.l_h, self.r_serie_ohm
+        self.a = np.array([
+            [-1 / (self.rt_ohm * cg), -1 / cg, 0.0],
+            [1 / l, -r / l, -1 / l],
+            [0.0, 1 / cl, 0.0],
+        ]) * 1e-6
+        lc, rc = const.L_CHOPPING_GAP_H, const.R_PARASITIC_OHM
+        self.a_corte = np.array([
+            [-1 / (self.rt_ohm * cg), -1 / cg, 0.0, 0.0],
+            [1 / l, -r / l, -1 / l, 0.0],
+            [0.0, 1 / cl, 0.0, -1 / cl],
+            [0.0, 0.0, 1 / lc, -rc / lc],
+        ]) * 1e-6
+        self.decomposicao = _decompose(self.a)
+        self.decomposicao_corte = _decompose(self.a_corte)
+
+        # Curva base (sem indutância), α e β em 1/μs
+        alfa, beta, escala = double_exponential(r, self.rt_ohm, cg, cl)
+        self.alfa, self.beta, self.escala_base = float(alfa) * 1e-6, float(beta) * 1e-6, float(escala)
+        self.zeta = float(series_damping(r, l, cg, cl))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "configuracao": self.configuracao,
+            "cg_uf": round(self.cg_f * 1e6, 4),
+            "rf_total_ohm": round(self.rf_ohm, 2),
+            "rt_total_ohm": round(self.rt_ohm, 2),
+            "r_parasita_ohm": const.R_PARASITIC_OHM,
+            "l_total_uh": round(self.l_h * 1e6, 2),
+            "cl_nf": round(self.cl_f * 1e9, 3),
+            "zeta": round(self.zeta, 4),
+            "oscilatorio": self.zeta < 1,
+        }
+
+
+@lru_cache(maxsize=CACHE_MODELOS)
+def build_circuit_model(configuracao: str, resistor_frontal: float, resistor_cauda: float,
+                        capacitancia_objeto_pf: float, capacitancia_parasita_pf: float = 400.0,
+                        indutancia_externa_uh: float = 0.0, cortado: bool = False,
+                        por_coluna: bool = True) -> CircuitModel:
+    """
+    Modelo do circuito para uma configuração (em cache: a mesma configuração devolve o mesmo modelo).
+
+    Args:
+        configuracao: Valor em GENERATOR_CONFIGURATIONS (ex.: "6S-1P")
+        resistor_frontal: Resistor frontal em Ohms (por coluna ou por estágio, ver `por_coluna`)
+        resistor_cauda: Resistor de cauda em Ohms (por coluna ou por estágio, ver `por_coluna`)
+        capacitancia_objeto_pf: Capacitância do objeto de teste em pF
+        capacitancia_parasita_pf: Capacitância parasita em pF
+        indutancia_externa_uh: Indutância adicional em série em μH
+        cortado: Inclui a capacitância do gap de corte na carga
+        por_coluna: Resistores por coluna (impulso atmosférico, padrão) ou por estágio (manobra);
+            ver resistors_per_column
+    """
+    return CircuitModel(generator_configuration(configuracao), resistor_frontal, resistor_cauda,
+                        capacitancia_objeto_pf, capacitancia_parasita_pf, indutancia_externa_uh, cortado,
+                        por_coluna)
+
+
+def _expm_batch(a: np.ndarray, tempos: np.ndarray) -> np.ndarray:
+    """e^(A·t) para cada t (N × n × n), por escalonamento e quadratura com série de Taylor."""
+    norma = np.linalg.norm(a, 1) * float(np.max(np.abs(tempos), initial=0.0))
+    quadraturas = max(0, int(math.ceil(math.log2(norma))) + 1) if norma > 0.5 else 0
+    m = a[None, :, :] * (tempos / 2 ** quadraturas)[:, None, None]
+    identidade = np.broadcast_to(np.eye(a.shape[0]), m.shape)
+    resultado = identidade.copy()
+    for ordem in range(14, 0, -1):  # Horner: I + M(I + M/2(I + M/3(...)))
+        resultado = identidade + m @ resultado / ordem
+    for _ in range(quadraturas):
+        resultado = resultado @ resultado
+    return resultado
+
+
+def _states(a: np.ndarray, decomposicao, x0: np.ndarray, tempos: np.ndarray) -> np.ndarray:
+    """Estados x(t) = e^(A·t)·x0 para todos os tempos (n × N)."""
+    if decomposicao is None:
+        return (_expm_batch(a, tempos) @ x0).T
+    autovalores, autovetores, inversa = decomposicao
+    coeficientes = inversa @ x0
+    return np.real((autovetores * coeficientes) @ np.exp(np.outer(autovalores, tempos)))
+
+
+_respostas: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+_respostas_lock = threading.Lock()
+
+
+def circuit_response(modelo: CircuitModel, tempos: np.ndarray, tempo_corte_us: Optional[float] = None,
+                     usar_cache: bool = True) -> np.ndarray:
+    """
+    Tensão na carga para tensão de carregamento unitária (V₀ = 1) em todos os `tempos` (μs).
+    Com `tempo_corte_us`, o gap fecha nesse instante. O resultado fica em cache (somente leitura);
+    `usar_cache=False` evita o cache para vetores de tempo descartáveis (ex.: amostragem adaptativa).
+    """
+    tempos = np.asarray(tempos, dtype=float)
+    chave = (modelo.chave, tempo_corte_us, hashlib.blake2b(tempos.tobytes(), digest_size=16).digest())
+    if usar_cache:
+        with _respostas_lock:
+            resposta = _respostas.get(chave)
+            if resposta is not None:
+                _respostas.move_to_end(chave)
+                return resposta
+
+    x0 = np.array([1.0, 0.0, 0.0])
+    resposta = np.zeros_like(tempos)
+    antes = tempos >= 0
+    if tempo_corte_us is not None:
+        antes &= tempos < tempo_corte_us
+    resposta[antes] = _states(modelo.a, modelo.decomposicao, x0, tempos[antes])[ESTADO_CARGA]
+    if tempo_corte_us is not None:
+        depois = tempos >= tempo_corte_us
+        x_corte = _states(modelo.a, modelo.decomposicao, x0, np.array([tempo_corte_us]))[:, 0]
+        estados = _states(modelo.a_corte, modelo.decomposicao_corte, np.append(x_corte, 0.0),
+                          tempos[depois] - tempo_corte_us)
+        resposta[depois] = estados[ESTADO_CARGA]
+    resposta.setflags(write=False)
+    if not usar_cache:
+        return resposta
+
+    with _respostas_lock:
+        _respostas[chave] = resposta
+        while len(_respostas) > CACHE_RESPOSTAS:
+            _respostas.popitem(last=False)
+    return resposta
+
+
+def sampling_steps(modelo: CircuitModel, tempo_corte_us: Optional[float] = None,
+                   tolerancia: float = 1e-3) -> Tuple[List[float], List[Optional[float]]]:
+    """
+    Quebras e passo máximo inicial (μs) por trecho para adaptive_time_grid(..., relativa=True).
+    Cada modo λ da matriz de estado (antes e depois do corte) pede um passo de 2π/(16·|λ|)
+    até decair abaixo da tolerância, em ln(10/tolerancia)/|Re λ|; depois disso ele não limita mais.
+
+    Returns:
+        (pontos_quebra, passo_maximo), com um passo por trecho (None = sem limite)
+    """
+    fases = [(0.0, modelo.a)]
+    if tempo_corte_us is not None:
+        fases.append((float(tempo_corte_us), modelo.a_corte))
+    quebras: List[float] = []
+    passos: List[Optional[float]] = []
+    for i, (inicio, a) in enumerate(fases):
+        fim = fases[i + 1][0] if i + 1 < len(fases) else math.inf
+        if i:
+            quebras.append(inicio)
+        autovalores = np.linalg.eigvals(a)
+        autovalores = autovalores[np.abs(autovalores) > 0]
+        passo_modo = 2 * math.pi / (PASSOS_POR_PERIODO * np.abs(autovalores))
+        decaimento = np.maximum(-autovalores.real, np.finfo(float).tiny)
+        fim_modo = inicio + math.log(MARGEM_AMPLITUDE_MODO / tolerancia) / decaimento
+        fins = sorted({float(f) for f in fim_modo if f < fim})
+        t = inicio
+        for f in [*fins, fim]:
+            ativos = fim_modo > t
+            passos.append(float(passo_modo[ativos].min()) if ativos.any() else None)
+            if f < fim:
+                quebras.append(f)
+            t = f
+    return quebras, passos
+
+
+def clear_caches():
+    """Esvazia os caches de modelos e respostas (ex.: depois de alterar as constantes)."""
+    build_circuit_model.cache_clear()
+    with _respostas_lock:
+        _respostas.clear()
@@ -0,0 +1,285 @@
+"""
+Serviço de otimização do circuito do gerador de impulso
+Avalia todas as combinações do equipamento do laboratório (configurações do
+gerador, resistores, indutores e capacitância parasita) para um objeto de teste
+e devolve as montagens que atendem à norma, ordenadas.
+
+O circuito equivalente de cada combinação é o mesmo do impulse_circuit_service
+(equivalent_circuit, double_exponential e series_damping), avaliado sobre todas as
+combinações de uma vez. Os resistores LI são valores por coluna e os SI, por estágio
+(resistors_per_column). Na varredura, a sobre-elevação é estimada pela malha série
+R-L-Cs (Cs = Cg·Cl/(Cg+Cl)), que só serve para ordenar: ela subestima a sobre-elevação
+da simulação em 1 a 2 pontos. Antes de uma montagem ser devolvida como conforme, a
+sobre-elevação é recalculada com circuit_overshoot (a mesma simulação RLC e a mesma
+definição de calculate_impulse_test), na ordem da pontuação, até `limite` conformes.
+"""
+
+import sys
+import pathlib
+import time
+import logging
+from typing import Dict, Any
+import numpy as np
+
+# Ajusta o path para permitir importações corretas
+current_file = pathlib.Path(__file__).absolute()
+current_dir = current_file.parent
+backend_dir = current_dir.parent
+root_dir = backend_dir.parent
+
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+if str(backend_dir) not in sys.path:
+    sys.path.insert(0, str(backend_dir))
+
+try:
+    from ..utils import constants as const
+    from .impulse_service import circuit_overshoot, extract_waveform_parameters
+    from .impulse_circuit_service import (build_circuit_model, double_exponential, equivalent_circuit,
+                                          resistors_per_column, series_damping)
+except ImportError:
+    try:
+        from backend.utils import constants as const
+        from backend.services.impulse_service import circuit_overshoot, extract_waveform_parameters
+        from backend.services.impulse_circuit_service import (build_circuit_model, double_exponential, equivalent_circuit,
+                                                              resistors_per_column, series_damping)
+    except ImportError:
+        from utils import constants as const
+        from services.impulse_service import circuit_overshoot, extract_waveform_parameters
+        from services.impulse_circuit_service import (build_circuit_model, double_exponential, equivalent_circuit,
+                                                      resistors_per_column, series_damping)
+
+log = logging.getLogger(__name__)
+
+# Orçamento de tempo padrão da otimização (ms) e tamanho dos blocos avaliados entre verificações do relógio
+ORCAMENTO_PADRAO_MS = 500.0
+TAMANHO_BLOCO = 4096
+# Quantidade padrão e máxima de montagens devolvidas
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 200
+# Montagens fora da tolerância devolvidas como referência quando nenhuma é conforme
+LIMITE_MAIS_PROXIMAS = 5
+# Máximo de montagens com a sobre-elevação recalculada pela simulação RLC
+MAX_VERIFICADAS = 500
+
+# Resistores e valores nominais por tipo de impulso:
+# (resistores frontais, resistores de cauda, frente nominal, tolerância, cauda nominal, tolerância)
+# Atmosférico/Cortado: T1/T2 (IEC 60060-1); Manobra: Tp (tempo até o pico) / T2 a partir da origem real
+_LI = (const.RESISTORS_LI_FRONT_AVAILABLE, const.RESISTORS_LI_TAIL_AVAILABLE,
+       const.LIGHTNING_IMPULSE_FRONT_TIME_NOM, const.LIGHTNING_FRONT_TOLERANCE,
+       const.LIGHTNING_IMPULSE_TAIL_TIME_NOM, const.LIGHTNING_TAIL_TOLERANCE)
+TIPOS_IMPULSO = {
+    "Atmosférico": _LI,
+    "Cortado": _LI,
+    "Manobra": (const.RESISTORS_SI_FRONT_AVAILABLE, const.RESISTORS_SI_TAIL_AVAILABLE,
+                const.SWITCHING_IMPULSE_PEAK_TIME_NOM, const.SWITCHING_PEAK_TIME_TOLERANCE,
+                const.SWITCHING_IMPULSE_TAIL_TIME_NOM, const.SWITCHING_TAIL_TOLERANCE),
+}
+
+
+def _evaluate_block(g: Dict[str, np.ndarray], tensao_ensaio_kv: float, tipo_impulso: str) -> Dict[str, np.ndarray]:
+    """
+    Avalia um bloco de combinações (arrays do mesmo tamanho em `g`): poda por tensão máxima e
+    energia do gerador e calcula os parâmetros da forma de onda só das combinações restantes.
+    """
+    circuito = equivalent_circuit(g["stages"], g["parallel"], g["max_voltage_kv"], g["rf_valor"], g["rt_valor"],
+                                  g["c_objeto_pf"], g["c_parasita_pf"], g["indutor_h"], tipo_impulso == "Cortado",
+                                  resistors_per_column(tipo_impulso))
+    cg, cl, r = circuito["cg_f"], circuito["cl_f"], circuito["r_serie_ohm"]
+    alfa_s, beta_s, escala_s = double_exponential(r, circuito["rt_ohm"], cg, cl)
+    t_pico_s = np.log(beta_s / alfa_s) / (beta_s - alfa_s)
+    eficiencia = escala_s * (np.exp(-alfa_s * t_pico_s) - np.exp(-beta_s * t_pico_s))
+
+    tensao_carregamento_kv = tensao_ensaio_kv / eficiencia
+    energia_kj = 0.5 * cg * (tensao_carregamento_kv * 1e3) ** 2 / 1e3
+    dentro_limites = (tensao_carregamento_kv <= g["max_voltage_kv"]) & (energia_kj <= g["energy_kj"])
+
+    resultado = {nome: valores[dentro_limites] for nome, valores in g.items()}
+    resultado.update(eficiencia=eficiencia[dentro_limites],
+                     tensao_carregamento_kv=tensao_carregamento_kv[dentro_limites],
+                     energia_kj=energia_kj[dentro_limites])
+    r, cg, cl, l = r[dentro_limites], cg[dentro_limites], cl[dentro_limites], circuito["l_h"][dentro_limites]
+
+    # Parâmetros da forma de onda (α e β em 1/μs)
+    forma = extract_waveform_parameters(alfa_s[dentro_limites] * 1e-6, beta_s[dentro_limites] * 1e-6)
+    if tipo_impulso == "Manobra":
+        resultado["tempo_frente_us"] = forma["t_pico"]
+        resultado["tempo_cauda_us"] = forma["t50"]
+    else:
+        resultado["tempo_frente_us"] = forma["tempo_frente"]
+        resultado["tempo_cauda_us"] = forma["tempo_cauda"]
+
+    # Estimativa da sobre-elevação pela malha R-L-Cs subamortecida (ζ < 1), só para ordenar
+    zeta = series_damping(r, l, cg, cl)
+    with np.errstate(invalid='ignore'):
+        overshoot = np.where(zeta < 1, 100 * np.exp(-np.pi * zeta / np.sqrt(np.clip(1 - zeta ** 2, 1e-12, None))), 0.0)
+    resultado["overshoot_percent"] = overshoot
+    return resultado
+
+
+def optimize_impulse_generator(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Procura as montagens do gerador que produzem a forma de onda normalizada no objeto de teste.
+
+    Args:
+        data: Dicionário com:
+            capacitancia_objeto_pf: Capacitância do objeto de teste em pF (obrigatório)
+            tensao_ensaio_kv: Tensão de ensaio (BIL ou SIL) em kV (obrigatório)
+            tipo_impulso: "Atmosférico" (padrão), "Cortado" ou "Manobra"
+            capacitancia_parasita_pf: Capacitância parasita em pF (padrão: avalia todas as opções)
+            limite: Quantidade de montagens devolvidas (padrão 20)
+            orcamento_ms: Tempo máximo da busca em ms (padrão 500)
+
+    Returns:
+        Dicionário com as montagens conformes ordenadas ("montagens"), as mais próximas da
+        tolerância quando nenhuma é conforme ("mais_proximas") e estatísticas da busca
+    """
+    inicio = time.perf_counter()
+    tipo_impulso = data.get("tipo_impulso") or "Atmosférico"
+    if tipo_impulso not in TIPOS_IMPULSO:
+        raise ValueError(f"Tipo de impulso inválido para otimização: '{tipo_impulso}' (use {', '.join(TIPOS_IMPULSO)})")
+    capacitancia_objeto_pf = float(data.get("capacitancia_objeto_pf") or 0)
+    tensao_ensaio_kv = float(data.get("tensao_ensaio_kv") or 0)
+    if capacitancia_objeto_pf <= 0 or tensao_ensaio_kv <= 0:
+        raise ValueError("Informe capacitancia_objeto_pf e tensao_ensaio_kv positivos")
+    limite = max(1, min(int(data.get("limite") or LIMITE_PADRAO), LIMITE_MAXIMO))
+    orcamento_ms = float(data.get("orcamento_ms") or ORCAMENTO_PADRAO_MS)
+    prazo = inicio + orcamento_ms / 1000.0
+
+    resistores_frente, resistores_cauda, frente_nom, frente_tol, cauda_nom, cauda_tol = TIPOS_IMPULSO[tipo_impulso]
+    if data.get("capacitancia_parasita_pf") is not None:
+        parasitas_pf = [float(data["capacitancia_parasita_pf"])]
+    else:
+        parasitas_pf = [opcao["value"] for opcao in const.STRAY_CAPACITANCE_OPTIONS_PF]
+    configs = const.GENERATOR_CONFIGURATIONS
+    indutores = const.INDUCTORS_OPTIONS
+
+    # Eixos do produto cartesiano
+    stages = np.array([c["stages"] for c in configs], dtype=float)
+    parallel = np.array([c["parallel"] for c in configs], dtype=float)
+    max_voltage_kv = np.array([c["max_voltage_kv"] for c in configs], dtype=float)
+    energy_kj = np.array([c["energy_kj"] for c in configs], dtype=float)
+
+    # Poda por configuração: a eficiência nunca passa de Cg/(Cg+Cl), então a tensão de carregamento
+    # mínima (e a energia mínima) não dependem dos resistores. Usa a menor capacitância parasita.
+    por_config = equivalent_circuit(stages, parallel, max_voltage_kv, 1.0, 1.0, capacitancia_objeto_pf,
+                                    min(parasitas_pf), cortado=tipo_impulso == "Cortado")
+    cg_f, cl_min_f = por_config["cg_f"], por_config["cl_f"]
+    tensao_minima_kv = tensao_ensaio_kv * (cg_f + cl_min_f) / cg_f
+    energia_minima_kj = 0.5 * cg_f * (tensao_minima_kv * 1e3) ** 2 / 1e3
+    configs_viaveis = np.flatnonzero((tensao_minima_kv <= max_voltage_kv) & (energia_minima_kj <= energy_kj))
+
+    eixos = np.meshgrid(configs_viaveis, np.arange(len(resistores_frente)), np.arange(len(resistores_cauda)),
+                        np.arange(len(indutores)), np.arange(len(parasitas_pf)), indexing='ij')
+    i_cfg, i_rf, i_rt, i_ind, i_par = (eixo.ravel() for eixo in eixos)
+    grade = {
+        "config": i_cfg, "i_rf": i_rf, "i_rt": i_rt, "i_ind": i_ind,
+        "stages": stages[i_cfg], "parallel": parallel[i_cfg],
+        "max_voltage_kv": max_voltage_kv[i_cfg], "energy_kj": energy_kj[i_cfg],
+        "c_objeto_pf": np.full(len(i_cfg), capacitancia_objeto_pf),
+        "c_parasita_pf": np.array(parasitas_pf, dtype=float)[i_par],
+        "rf_valor": np.array([r["value"] for r in resistores_frente], dtype=float)[i_rf],
+        "rt_valor": np.array([r["value"] for r in resistores_cauda], dtype=float)[i_rt],
+        "indutor_h": np.array([i["value"] for i in indutores], dtype=float)[i_ind],
+    }
+    total = len(configs) * len(resistores_frente) * len(resistores_cauda) * len(indutores) * len(parasitas_pf)
+
+    # Avaliação em blocos, parando quando o orçamento de tempo acaba
+    blocos, avaliadas, completo = [], 0, True
+    for bloco_inicio in range(0, len(i_cfg), TAMANHO_BLOCO):
+        if time.perf_counter() > prazo:
+            completo = False
+            break
+        fatia = slice(bloco_inicio, bloco_inicio + TAMANHO_BLOCO)
+        blocos.append(_evaluate_block({nome: valores[fatia] for nome, valores in grade.items()},
+                                      tensao_ensaio_kv, tipo_impulso))
+        avaliadas += len(i_cfg[fatia])
+    if blocos:
+        r = {nome: np.concatenate([bloco[nome] for bloco in blocos]) for nome in blocos[0]}
+    else:
+        r = {nome: np.array([]) for nome in ("config", "tempo_frente_us", "tempo_cauda_us", "overshoot_percent")}
+    dentro_limites = len(r["config"])
+
+    # Conformidade e ordenação: desvio normalizado em relação às tolerâncias (0 = forma de onda nominal)
+    desvio_frente = (r["tempo_frente_us"] / frente_nom - 1) / frente_tol
+    desvio_cauda = (r["tempo_cauda_us"] / cauda_nom - 1) / cauda_tol
+    desvio_overshoot = r["overshoot_percent"] / const.LIGHTNING_OVERSHOOT_MAX if tipo_impulso != "Manobra" \
+        else np.zeros_like(desvio_frente)
+    with np.errstate(invalid='ignore'):
+        tempos_conformes = (np.abs(desvio_frente) <= 1) & (np.abs(desvio_cauda) <= 1)
+    pontuacao = desvio_frente ** 2 + desvio_cauda ** 2 + desvio_overshoot ** 2
+    candidatas = np.flatnonzero(tempos_conformes)
+    # Menor desvio primeiro; empate: menor energia armazenada
+    candidatas = candidatas[np.lexsort((r["energia_kj"][candidatas], pontuacao[candidatas]))]
+
+    # Sobre-elevação recalculada pela simulação RLC (a mesma de calculate_impulse_test), na ordem da
+    # estimativa, até `limite` montagens conformes
+    verificadas = 0
+    confirmadas = []
+    for i in candidatas:
+        if len(confirmadas) >= limite or verificadas >= MAX_VERIFICADAS:
+            break
+        if tipo_impulso != "Manobra":
+            config = configs[int(r["config"][i])]
+            modelo = build_circuit_model(config["value"], float(r["rf_valor"][i]), float(r["rt_valor"][i]),
+                                         capacitancia_objeto_pf, float(r["c_parasita_pf"][i]),
+                                         float(r["indutor_h"][i]) * 1e6, tipo_impulso == "Cortado",
+                                         resistors_per_column(tipo_impulso))
+            r["overshoot_percent"][i] = circuit_overshoot(modelo)
+            desvio_overshoot[i] = r["overshoot_percent"][i] / const.LIGHTNING_OVERSHOOT_MAX
+            pontuacao[i] = desvio_frente[i] ** 2 + desvio_cauda[i] ** 2 + desvio_overshoot[i] ** 2
+            verificadas += 1
+        if desvio_overshoot[i] <= 1:
+            confirmadas.append(i)
+    indices = np.array(confirmadas, dtype=int)
+    indices = indices[np.lexsort((r["energia_kj"][indices], pontuacao[indices]))] if len(indices) else indices
+    mais_proximas = np.array([], dtype=int)
+    if not len(indices) and dentro_limites:
+        mais_proximas = np.lexsort((r["energia_kj"], pontuacao))[:LIMITE_MAIS_PROXIMAS]
+
+    def descrever(i: int) -> Dict[str, Any]:
+        config = configs[int(r["config"][i])]
+        resistor_frente = resistores_frente[int(r["i_rf"][i])]
+        resistor_cauda = resistores_cauda[int(r["i_rt"][i])]
+        return {
+            "configuracao": config["value"],
+            "configuracao_label": config["label"],
+            "resistor_frontal_ohm": resistor_frente["value"],
+            "resistor_frontal_label": resistor_frente["label"],
+            "resistor_cauda_ohm": resistor_cauda["value"],
+            "resistor_cauda_label": resistor_cauda["label"],
+            "indutor_label": indutores[int(r["i_ind"][i])]["label"],
+            "capacitancia_parasita_pf": round(float(r["c_parasita_pf"][i]), 1),
+            "tempo_frente_us": round(float(r["tempo_frente_us"][i]), 3),
+            "tempo_cauda_us": round(float(r["tempo_cauda_us"][i]), 2),
+            "overshoot_percent": round(float(r["overshoot_percent"][i]), 2),
+            "eficiencia": round(float(r["eficiencia"][i]), 4),
+            "tensao_carregamento_kv": round(float(r["tensao_carregamento_kv"][i]), 1),
+            "utilizacao_tensao_percent": round(float(r["tensao_carregamento_kv"][i] / r["max_voltage_kv"][i] * 100), 1),
+            "energia_kj": round(float(r["energia_kj"][i]), 2),
+            "utilizacao_energia_percent": round(float(r["energia_kj"][i] / r["energy_kj"][i] * 100), 1),
+            "pontuacao": round(float(pontuacao[i]), 4),
+        }
+
+    tempo_ms = (time.perf_counter() - inicio) * 1000
+    if not completo:
+        log.warning(f"Otimização do gerador interrompida pelo orçamento de {orcamento_ms:g} ms "
+                    f"({avaliadas} de {len(i_cfg)} combinações avaliadas)")
+    return {
+        "tipo_impulso": tipo_impulso,
+        "tensao_ensaio_kv": tensao_ensaio_kv,
+        "capacitancia_objeto_pf": capacitancia_objeto_pf,
+        "montagens": [descrever(i) for i in indices[:limite]],
+        "mais_proximas": [descrever(i) for i in mais_proximas],
+        "estatisticas": {
+            "combinacoes": total,
+            "podadas_configuracao": total - len(i_cfg),
+            "avaliadas": avaliadas,
+            "podadas_limites": avaliadas - dentro_limites,
+            "verificadas": verificadas,
+            "conformes": int(len(indices)),
+            "completo": completo,
+            "orcamento_ms": orcamento_ms,
+            "tempo_ms": round(tempo_ms, 2),
+        },
+    }
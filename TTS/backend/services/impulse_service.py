@@ -24,12 +24,18 @@ if str(backend_dir) not in sys.path:
 # Tenta importar constantes para o serviço
 try:
     from ..utils import constants as const
+    from .impulse_circuit_service import build_circuit_model, circuit_response, resistors_per_column, sampling_steps
+    from ..utils.adaptive_grid import adaptive_time_grid
 except ImportError:
     try:
         from backend.utils import constants as const
+        from backend.services.impulse_circuit_service import build_circuit_model, circuit_response, resistors_per_column, sampling_steps
+        from backend.utils.adaptive_grid import adaptive_time_grid
     except ImportError:
         try:
             from utils import constants as const
+            from services.impulse_circuit_service import build_circuit_model, circuit_response, resistors_per_column, sampling_steps
+            from utils.adaptive_grid import adaptive_time_grid
         except ImportError:
             logging.warning("Não foi possível importar 'constants'. Usando mock para constantes.")
             class MockConstants:
@@ -39,6 +45,7 @@ except ImportError:
                 LIGHTNING_IMPULSE_TAIL_TIME_NOM = 50.0  # μs
                 LIGHTNING_FRONT_TOLERANCE = 0.30  # 30%
                 LIGHTNING_TAIL_TOLERANCE = 0.20   # 20%
+                LIGHTNING_OVERSHOOT_MAX = 10.0    # %
 
                 # Tabelas BIL/SIL (valores mockados baseados na documentação)
                 # Padrão NBR/IEC - Impulso Atmosférico (LI/NBI)
@@ -98,6 +105,24 @@ except ImportError:
 
             const = MockConstants()
 
+# Janela e passo padrão da simulação da forma de onda (μs)
+TEMPO_MAX_SIMULACAO_US = 100.0
+PASSO_TEMPO_US = 0.1
+# Limite de pontos de uma simulação (ex.: 100 μs com passo de 1 ns = 100 001 pontos)
+MAX_PONTOS_SIMULACAO = 2_000_001
+# Erro máximo da forma de onda com amostragem adaptativa (fração da tensão de pico)
+TOLERANCIA_FORMA_ONDA = 1e-3
+# Constante de decaimento (1/μs) após o corte no impulso cortado
+GAMMA_DECAIMENTO_CORTE = 0.5
+
+# Pontos da IEC 60060-1 na curva: 30 % e 90 % do pico na frente (T1) e 50 % do pico na cauda (T2)
+NIVEL_FRENTE_30 = 0.30
+NIVEL_FRENTE_90 = 0.90
+NIVEL_CAUDA_50 = 0.50
+# Convergência do refinamento de Newton dos cruzamentos (tolerância relativa em t)
+NEWTON_TOLERANCIA_REL = 1e-12
+NEWTON_MAX_ITERACOES = 60
+
 
 def calculate_impulse_waveform_parameters(resistor_frontal: float, resistor_cauda: float, 
                                          capacitancia_gerador: float, capacitancia_objeto: float) -> Dict[str, Any]:
@@ -140,6 +165,35 @@ def calculate_impulse_waveform_parameters(resistor_frontal: float, resistor_caud
     }
 
 
+def circuit_waveform_parameters(alfa: float, beta: float, escala: float) -> Dict[str, Any]:
+    """
+    Parâmetros da curva base V(t)/V₀ = escala · (e^(-α·t) - e^(-β·t)) do circuito RLC
+    (mesmas chaves de calculate_impulse_waveform_parameters).
+
+    Args:
+        alfa: Parâmetro alfa da curva base (1/μs)
+        beta: Parâmetro beta da curva base (1/μs)
+        escala: Fator k/(β - α) da curva base
+
+    Returns:
+        Dicionário com alfa, beta, tempos de frente e cauda (IEC 60060-1), eficiência e tolerâncias
+    """
+    tempo_frente, tempo_cauda = calculate_front_tail_times(alfa, beta)
+    return {
+        "alfa": alfa,
+        "beta": beta,
+        "tempo_frente": tempo_frente,
+        "tempo_cauda": tempo_cauda,
+        "eficiencia": float(escala * calculate_efficiency(alfa, beta)),
+        "dentro_tolerancia_frente": is_within_tolerance(tempo_frente,
+                                                      const.LIGHTNING_IMPULSE_FRONT_TIME_NOM,
+                                                      const.LIGHTNING_FRONT_TOLERANCE),
+        "dentro_tolerancia_cauda": is_within_tolerance(tempo_cauda,
+                                                     const.LIGHTNING_IMPULSE_TAIL_TIME_NOM,
+                                                     const.LIGHTNING_TAIL_TOLERANCE)
+    }
+
+
 def impulse_waveform(t: float, alfa: float, beta: float) -> float:
     """
     Calcula o valor da tensão na forma de onda de impulso para um dado tempo.
@@ -155,41 +209,190 @@ def impulse_waveform(t: float, alfa: float, beta: float) -> float:
     return np.exp(-alfa * t) - np.exp(-beta * t)
 
 
-def calculate_front_tail_times(alfa: float, beta: float) -> Tuple[float, float]:
+def simulation_time_grid(tempo_max_us: float = TEMPO_MAX_SIMULACAO_US,
+                         passo_us: float = PASSO_TEMPO_US) -> np.ndarray:
     """
-    Calcula os tempos de frente e cauda da forma de onda de impulso usando aproximações.
-    Nota: O cálculo preciso requer métodos numéricos ou simulação detalhada.
-    Esta é uma simplificação para evitar dependências externas como scipy.
+    Vetor de tempos da simulação (μs), de 0 até `tempo_max_us` inclusive.
 
     Args:
+        tempo_max_us: Fim da janela de simulação em μs
+        passo_us: Passo de tempo em μs (ex.: 0.001 para resolução de 1 ns)
+
+    Returns:
+        Array de tempos em μs
+    """
+    if passo_us <= 0 or tempo_max_us <= 0:
+        raise ValueError(f"Janela ({tempo_max_us} μs) e passo ({passo_us} μs) da simulação devem ser positivos")
+    n_pontos = int(tempo_max_us / passo_us) + 1
+    if n_pontos > MAX_PONTOS_SIMULACAO:
+        raise ValueError(f"Simulação com {n_pontos} pontos excede o limite de {MAX_PONTOS_SIMULACAO}")
+    return np.arange(0, tempo_max_us + passo_us, passo_us)
+
+
+def simulate_impulse_waveform(tempos: np.ndarray, tensao_carregamento: float, alfa: float, beta: float,
+                              tempo_corte_us: Optional[float] = None, sobretensao_corte_kv: float = 0.0,
+                              gamma_decaimento: float = GAMMA_DECAIMENTO_CORTE) -> np.ndarray:
+    """
+    Tensão simulada (kV) em todos os instantes de `tempos`, calculada de uma vez com NumPy.
+
+    Antes do corte: V(t) = V₀ · (e^(-α·t) - e^(-β·t)).
+    Após o corte (se `tempo_corte_us`): V(t) = V_sobretensão · e^(-γ·(t - t_corte)).
+
+    Args:
+        tempos: Array de tempos em μs
+        tensao_carregamento: Tensão de carregamento V₀ em kV
         alfa: Parâmetro alfa da equação de impulso
         beta: Parâmetro beta da equação de impulso
+        tempo_corte_us: Instante do corte em μs (None = onda plena)
+        sobretensao_corte_kv: Sobretensão no instante do corte em kV
+        gamma_decaimento: Constante de decaimento após o corte (1/μs)
 
     Returns:
-        Tupla (tempo_frente, tempo_cauda) em μs (valores aproximados)
+        Array de tensões em kV (mesmo tamanho de `tempos`)
     """
-    # Tempo para o pico (aproximação)
-    # t_pico_aprox = 1 / alfa # Simplificação - menos precisa
-    # Usando a fórmula exata para o tempo de pico, que não requer fsolve
-    if beta <= alfa + const.EPSILON: # Evitar log(<=1) ou divisão por zero/pequeno
-        t_pico_aprox = 0.0
-    else:
-        t_pico_aprox = np.log(beta / alfa) / (beta - alfa)
+    tempos = np.asarray(tempos, dtype=float)
+    if tempo_corte_us is None:
+        return tensao_carregamento * impulse_waveform(tempos, alfa, beta)
+    tensoes = np.empty_like(tempos)
+    antes = tempos < tempo_corte_us
+    tensoes[antes] = tensao_carregamento * impulse_waveform(tempos[antes], alfa, beta)
+    tensoes[~antes] = sobretensao_corte_kv * np.exp(-gamma_decaimento * (tempos[~antes] - tempo_corte_us))
+    return tensoes
+
+
+def _level_crossing_times(alfa: np.ndarray, beta: np.ndarray, nivel: np.ndarray,
+                          t_inicio: np.ndarray, t_fim: np.ndarray) -> np.ndarray:
+    """
+    Instante t em [t_inicio, t_fim] onde e^(-α·t) - e^(-β·t) = nivel, para vários (α, β) de uma vez.
+
+    A curva tem de ser monótona no intervalo e cruzar o nível dentro dele (frente: [0, t_pico];
+    cauda: [t_pico, ln(1/nivel)/α]). Cada iteração é um passo de Newton na fórmula fechada;
+    se o passo sair do intervalo, usa o ponto médio (bissecção), e o intervalo é reduzido
+    a cada avaliação, então a convergência é garantida.
+    """
+    esquerda, direita = t_inicio.copy(), t_fim.copy()
+    sinal_esquerda = np.sign(impulse_waveform(esquerda, alfa, beta) - nivel)
+    t = 0.5 * (esquerda + direita)
+    for _ in range(NEWTON_MAX_ITERACOES):
+        exp_alfa, exp_beta = np.exp(-alfa * t), np.exp(-beta * t)
+        residuo = exp_alfa - exp_beta - nivel
+        derivada = beta * exp_beta - alfa * exp_alfa
+        mesmo_lado = np.sign(residuo) == sinal_esquerda
+        esquerda = np.where(mesmo_lado, t, esquerda)
+        direita = np.where(mesmo_lado, direita, t)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_novo = t - residuo / derivada
+        fora = ~np.isfinite(t_novo) | (t_novo <= esquerda) | (t_novo >= direita)
+        t_novo = np.where(fora, 0.5 * (esquerda + direita), t_novo)
+        convergiu = np.abs(t_novo - t) <= NEWTON_TOLERANCIA_REL * np.abs(t_novo)
+        t = t_novo
+        if np.all(convergiu):
+            break
+    return t
+
+
+def extract_waveform_parameters(alfa: Union[float, np.ndarray],
+                                beta: Union[float, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Parâmetros da forma de onda V(t) = V₀ · (e^(-α·t) - e^(-β·t)) conforme a IEC 60060-1,
+    calculados na fórmula fechada (sem amostrar a curva) e vetorizados sobre pares (α, β).
+
+    - Pico: t_pico = ln(β/α) / (β - α); eficiência η = V(t_pico) / V₀
+    - Frente: t30 e t90, instantes em que a curva passa por 30 % e 90 % do pico;
+      T1 = (t90 - t30) / 0.6 e origem virtual O1 = t30 - 0.3·T1
+    - Cauda: t50, instante em que a curva cai a 50 % do pico; T2 = t50 - O1
 
+    Args:
+        alfa: Parâmetro(s) alfa (1/μs)
+        beta: Parâmetro(s) beta (1/μs)
+
+    Returns:
+        Dicionário de arrays (mesmo formato da entrada) com t_pico, eficiencia, t30, t90,
+        t50, origem_virtual, tempo_frente e tempo_cauda (μs). Pares sem pico (β ≤ α ou
+        α ≤ 0) resultam em NaN.
+    """
+    alfa, beta = np.broadcast_arrays(np.asarray(alfa, dtype=float), np.asarray(beta, dtype=float))
+    valido = (alfa > 0) & (beta > alfa)
+    # Pares inválidos são trocados por um par qualquer válido e mascarados com NaN no fim
+    a = np.where(valido, alfa, 1.0)
+    b = np.where(valido, beta, 2.0)
+
+    t_pico = np.log(b / a) / (b - a)
+    eficiencia = impulse_waveform(t_pico, a, b)
+    zero = np.zeros_like(t_pico)
+    t30 = _level_crossing_times(a, b, NIVEL_FRENTE_30 * eficiencia, zero, t_pico)
+    t90 = _level_crossing_times(a, b, NIVEL_FRENTE_90 * eficiencia, zero, t_pico)
+    # Na cauda e^(-α·t) - e^(-β·t) < e^(-α·t), então em ln(1/nível)/α a curva já está abaixo do nível
+    nivel_cauda = NIVEL_CAUDA_50 * eficiencia
+    t50 = _level_crossing_times(a, b, nivel_cauda, t_pico, np.log(1.0 / nivel_cauda) / a)
+
+    tempo_frente = (t90 - t30) / (NIVEL_FRENTE_90 - NIVEL_FRENTE_30)
+    origem_virtual = t30 - NIVEL_FRENTE_30 * tempo_frente
+    resultados = {
+        "t_pico": t_pico, "eficiencia": eficiencia, "t30": t30, "t90": t90, "t50": t50,
+        "origem_virtual": origem_virtual, "tempo_frente": tempo_frente, "tempo_cauda": t50 - origem_virtual,
+    }
+    return {nome: np.where(valido, valores, np.nan) for nome, valores in resultados.items()}
+
+
+def calculate_overshoot(tensoes: np.ndarray, tensao_pico_base: float) -> float:
+    """
+    Sobre-elevação relativa (%) da curva simulada sobre a curva base (IEC 60060-1):
+    β' = (Ue - Ub) / Ue · 100, com Ue o valor extremo da curva simulada e Ub o pico da curva base.
+
+    Args:
+        tensoes: Tensões simuladas em kV
+        tensao_pico_base: Pico da curva base (dupla exponencial) em kV
 
-    # Tempo de frente (aproximação)
-    # Uma aproximação comum para T1 é 2.2 / beta
-    tempo_frente_aprox = 2.2 / beta if beta > const.EPSILON else 0
+    Returns:
+        Sobre-elevação em % (0 se a curva simulada não passar do pico da curva base)
+    """
+    extremo = float(np.max(tensoes)) if len(tensoes) else 0.0
+    if extremo <= const.EPSILON:
+        return 0.0
+    return max(0.0, float((extremo - tensao_pico_base) / extremo * 100.0))
 
-    # Tempo de cauda (aproximação)
-    # Uma aproximação comum para T2 é 0.7 / alfa
-    tempo_cauda_aprox = 0.7 / alfa if alfa > const.EPSILON else 0
 
-    # Nota: Para resultados precisos de T1 e T2 conforme a norma (baseado em 30%-90% e 50% na cauda),
-    # a simulação da forma de onda e a análise dos pontos são necessárias.
-    # Manteremos essas aproximações por enquanto.
+def circuit_overshoot(modelo, tempo_max_us: float = TEMPO_MAX_SIMULACAO_US,
+                      tolerancia: float = TOLERANCIA_FORMA_ONDA) -> float:
+    """
+    Sobre-elevação (%) da onda plena do circuito RLC sobre a sua curva base, com a mesma amostragem
+    adaptativa e a mesma definição (calculate_overshoot) da verificação de conformidade de
+    calculate_impulse_test. Usada também pelo impulse_optimizer_service.
+
+    Args:
+        modelo: CircuitModel (build_circuit_model)
+        tempo_max_us: Janela da simulação em μs
+        tolerancia: Erro máximo da amostragem adaptativa (fração do pico)
+
+    Returns:
+        Sobre-elevação em %
+    """
+    quebras, passos = sampling_steps(modelo, None, tolerancia)
+    _, tensoes = adaptive_time_grid(lambda t: circuit_response(modelo, t, None, False), 0.0, tempo_max_us,
+                                    tolerancia, relativa=True, pontos_quebra=quebras, passo_maximo=passos)
+    t_pico = math.log(modelo.beta / modelo.alfa) / (modelo.beta - modelo.alfa)
+    pico_base = modelo.escala_base * (math.exp(-modelo.alfa * t_pico) - math.exp(-modelo.beta * t_pico))
+    return calculate_overshoot(tensoes, pico_base)
 
-    return tempo_frente_aprox, tempo_cauda_aprox
+
+def calculate_front_tail_times(alfa: float, beta: float) -> Tuple[float, float]:
+    """
+    Calcula os tempos de frente (T1, pelos pontos de 30 % e 90 %) e de cauda (T2, pelo ponto
+    de 50 % na cauda, a partir da origem virtual) conforme a IEC 60060-1.
+
+    Args:
+        alfa: Parâmetro alfa da equação de impulso
+        beta: Parâmetro beta da equação de impulso
+
+    Returns:
+        Tupla (tempo_frente, tempo_cauda) em μs (0 se a forma de onda não tiver pico)
+    """
+    parametros = extract_waveform_parameters(alfa, beta)
+    tempo_frente = float(parametros["tempo_frente"])
+    tempo_cauda = float(parametros["tempo_cauda"])
+    if math.isnan(tempo_frente) or math.isnan(tempo_cauda):
+        return 0.0, 0.0
     return tempo_frente, tempo_cauda
 
 
@@ -256,6 +459,16 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
     indutancia = data.get("indutancia", 5.0)  # μH
     tempo_corte_input = data.get("tempo_corte", None)  # μs para impulso cortado (pode ser None)
     gap_distance_mm = data.get("gap_distance_mm", None) # Distância do gap em mm (para calcular tempo de corte)
+    tempo_max_simulacao = float(data.get("tempo_max_simulacao_us") or TEMPO_MAX_SIMULACAO_US)  # μs
+    passo_tempo = float(data.get("passo_tempo_us") or PASSO_TEMPO_US)  # μs
+    # "adaptativa": pontos concentrados na frente e em volta do corte, com erro até tolerancia_forma_onda
+    # (fração do pico); "uniforme": passo fixo passo_tempo_us. Com passo_tempo_us informado, o padrão é uniforme.
+    amostragem = data.get("amostragem") or ("uniforme" if data.get("passo_tempo_us") else "adaptativa")
+    tolerancia_forma_onda = float(data.get("tolerancia_forma_onda") or TOLERANCIA_FORMA_ONDA)
+    # Com a configuração do gerador (ex.: "6S-1P"), a forma de onda vem do circuito RLC
+    # (impulse_circuit_service); os resistores são por coluna (LI/cortado) ou por estágio (manobra)
+    configuracao_gerador = data.get("configuracao_gerador")
+    capacitancia_parasita = float(data.get("capacitancia_parasita_pf", 400.0))  # pF
 
 
     # 1.1. Seleção do BIL/SIL com base na norma e tensão
@@ -301,12 +514,23 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
 
 
     # Cálculo dos parâmetros da forma de onda (para impulso atmosférico ou manobra)
-    waveform_params = calculate_impulse_waveform_parameters(
-        resistor_frontal, resistor_cauda, capacitancia_gerador, capacitancia_objeto
-    )
+    modelo_circuito = None
+    if configuracao_gerador:
+        modelo_circuito = build_circuit_model(
+            configuracao_gerador, float(resistor_frontal), float(resistor_cauda), float(capacitancia_objeto),
+            capacitancia_parasita, float(indutancia or 0.0), tipo_impulso == "Cortado",
+            resistors_per_column(tipo_impulso)
+        )
+        waveform_params = circuit_waveform_parameters(modelo_circuito.alfa, modelo_circuito.beta,
+                                                      modelo_circuito.escala_base)
+        capacitancia_gerador = modelo_circuito.cg_f * 1e9  # nF
+    else:
+        waveform_params = calculate_impulse_waveform_parameters(
+            resistor_frontal, resistor_cauda, capacitancia_gerador, capacitancia_objeto
+        )
 
     # Cálculo da tensão de carga e energia
-    tensao_pico_desejada = bil_especificado if tipo_impulso == "Atmosférico" else sil_norma # Usar BIL especificado para Atmosférico, SIL da norma para Manobra
+    tensao_pico_desejada = sil_norma if tipo_impulso == "Manobra" else bil_especificado # BIL especificado para Atmosférico/Cortado, SIL da norma para Manobra
     if tensao_pico_desejada is None or waveform_params["eficiencia"] <= const.EPSILON:
         tensao_carregamento = 0
     else:
@@ -337,7 +561,11 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
 
     tensao_corte_kv = 0
     sobretensao_corte_kv = 0
-    if tempo_corte_us is not None and tensao_carregamento > 0:
+    if modelo_circuito is not None and tempo_corte_us is not None:
+        # No circuito RLC o colapso após o corte sai da simulação (malha do gap), sem fator fixo
+        tensao_corte_kv = float(tensao_carregamento * circuit_response(modelo_circuito, np.array([tempo_corte_us]))[0])
+        sobretensao_corte_kv = tensao_corte_kv
+    elif tempo_corte_us is not None and tensao_carregamento > 0:
         # V_corte = V₀ * (e^(-α*t_corte) - e^(-β*t_corte))
         # Onde V₀ é a tensão de carregamento (V_carga)
         tensao_corte_kv = tensao_carregamento * impulse_waveform(tempo_corte_us, waveform_params["alfa"], waveform_params["beta"])
@@ -354,29 +582,26 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
 
 
     # 5. Simulação da Forma de Onda (simplificada)
-    # Gerar pontos de tempo
-    tempo_max_simulacao = 100.0 # μs
-    passo_tempo = 0.1 # μs
-    tempos = np.arange(0, tempo_max_simulacao + passo_tempo, passo_tempo)
-
-    # Calcular tensão em cada ponto
-    tensoes = []
-    tensoes = []
-    for t_val in tempos: # Usar t_val para evitar conflito com parâmetro 't' da função impulse_waveform
-        t_float = float(t_val) # Converter explicitamente para float
-        if tempo_corte_us is not None and t_float >= tempo_corte_us:
-            # Simulação simplificada após o corte
-            # V(t) = V_corte * (1 + k) * e^(-γ*(t-t_corte))
-            # Precisamos de γ (constante de tempo após o corte). Simplificando, assumimos um decaimento rápido.
-            # Usaremos um decaimento exponencial simples a partir da sobretensão de corte.
-            # γ = 1 / (L/R) ou 1 / (R*C). Sem R e C específicos após o corte, usamos um valor fixo.
-            gamma_decaimento = 0.5 # Exemplo: constante de decaimento
-            tensao_simulada = sobretensao_corte_kv * np.exp(-gamma_decaimento * (t_float - tempo_corte_us))
-        else:
-            # Forma de onda normal antes do corte
-            tensao_simulada = tensao_carregamento * impulse_waveform(t_float, waveform_params["alfa"], waveform_params["beta"]) # V_0 = tensao_carregamento
-
-        tensoes.append(tensao_simulada)
+    # Todos os pontos são calculados de uma vez (segmentos antes e depois do corte como arrays)
+    if modelo_circuito is not None:
+        def forma_onda(t: np.ndarray, usar_cache: bool = False) -> np.ndarray:
+            return tensao_carregamento * circuit_response(modelo_circuito, t, tempo_corte_us, usar_cache)
+    else:
+        def forma_onda(t: np.ndarray, usar_cache: bool = False) -> np.ndarray:
+            return simulate_impulse_waveform(t, tensao_carregamento, waveform_params["alfa"],
+                                             waveform_params["beta"], tempo_corte_us, sobretensao_corte_kv)
+    if amostragem == "adaptativa":
+        # No circuito RLC, o espaçamento inicial segue os modos (oscilação da malha série e do gap)
+        quebras, passos = [tempo_corte_us], None
+        if modelo_circuito is not None:
+            quebras, passos = sampling_steps(modelo_circuito, tempo_corte_us, tolerancia_forma_onda)
+        tempos, tensoes = adaptive_time_grid(forma_onda, 0.0, tempo_max_simulacao, tolerancia_forma_onda,
+                                             relativa=True, pontos_quebra=quebras, passo_maximo=passos)
+    elif amostragem == "uniforme":
+        tempos = simulation_time_grid(tempo_max_simulacao, passo_tempo)
+        tensoes = forma_onda(tempos, usar_cache=True)
+    else:
+        raise ValueError(f"Amostragem desconhecida: '{amostragem}' (use 'adaptativa' ou 'uniforme')")
 
     # 6. Análise dos Resultados e Conformidade
     analise_conformidade = {}
@@ -386,7 +611,17 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
         analise_conformidade["tempo_cauda_us"] = round(waveform_params["tempo_cauda"], 2)
         analise_conformidade["dentro_tolerancia_frente"] = waveform_params["dentro_tolerancia_frente"]
         analise_conformidade["dentro_tolerancia_cauda"] = waveform_params["dentro_tolerancia_cauda"]
-        analise_conformidade["overshoot"] = "Não calculado (requer simulação detalhada)" # TODO: Calcular overshoot
+        analise_conformidade["overshoot_max_percent"] = const.LIGHTNING_OVERSHOOT_MAX
+        if modelo_circuito is not None:
+            overshoot = calculate_overshoot(tensoes, tensao_carregamento * waveform_params["eficiencia"])
+            analise_conformidade["overshoot_percent"] = round(overshoot, 2)
+            analise_conformidade["dentro_tolerancia_overshoot"] = overshoot <= const.LIGHTNING_OVERSHOOT_MAX
+        else:
+            # Sem o circuito RLC a curva simulada é a própria dupla exponencial base: não há sobre-elevação a medir
+            analise_conformidade["overshoot_percent"] = None
+            analise_conformidade["dentro_tolerancia_overshoot"] = None
+            analise_conformidade["overshoot_motivo"] = ("Não aplicável: sem configuracao_gerador a forma de onda é a "
+                                                        "dupla exponencial ideal, sem indutância")
         analise_conformidade["tensao_pico_kv"] = round(np.max(tensoes), 2) # Tensão de pico da simulação
         analise_conformidade["tensao_pico_especificada_kv"] = bil_especificado
         analise_conformidade["status_tensao_pico"] = "OK" # TODO: Verificar tolerância da tensão de pico
@@ -405,6 +640,12 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
         analise_conformidade["tensao_corte_kv"] = round(tensao_corte_kv, 2)
         analise_conformidade["sobretensao_corte_kv"] = round(sobretensao_corte_kv, 2)
         analise_conformidade["tensao_pico_simulacao_kv"] = round(np.max(tensoes), 2) # Tensão de pico da simulação (pode ser a sobretensão)
+        if modelo_circuito is not None and tempo_corte_us is not None and tensao_corte_kv > const.EPSILON:
+            # Inversão de polaridade após o colapso, relativa à tensão no corte
+            inversao = max(0.0, -float(np.min(tensoes[tempos >= tempo_corte_us]))) / tensao_corte_kv
+            analise_conformidade["inversao_polaridade_percent"] = round(inversao * 100, 2)
+            analise_conformidade["inversao_polaridade_max_percent"] = const.CHOPPED_UNDERSHOOT_MAX * 100
+            analise_conformidade["dentro_tolerancia_inversao"] = inversao <= const.CHOPPED_UNDERSHOOT_MAX
         analise_conformidade["status"] = "Análise de forma de onda e conformidade para LIC requer simulação detalhada." # TODO: Implementar análise detalhada para LIC
 
 
@@ -421,6 +662,11 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
         "indutancia_uh": indutancia,
         "tempo_corte_input_us": tempo_corte_input,
         "gap_distance_mm": gap_distance_mm,
+        "tempo_max_simulacao_us": tempo_max_simulacao,
+        "passo_tempo_us": passo_tempo if amostragem == "uniforme" else None,
+        "amostragem": amostragem,
+        "tolerancia_forma_onda": tolerancia_forma_onda if amostragem == "adaptativa" else None,
+        "pontos_simulacao": len(tempos),
 
         # Níveis de isolamento da norma
         "bil_norma_kv": bil_norma,
@@ -444,10 +690,14 @@ def calculate_impulse_test(data: Dict[str, Any]) -> Dict[str, Any]:
         "tensao_corte_kv_calc": round(tensao_corte_kv, 2),
         "sobretensao_corte_kv_calc": round(sobretensao_corte_kv, 2),
 
+        # Circuito equivalente (só com configuracao_gerador)
+        "configuracao_gerador": configuracao_gerador,
+        "circuito": modelo_circuito.summary() if modelo_circuito is not None else None,
+
         # Simulação da forma de onda (pontos de tempo e tensão)
         "simulacao_forma_onda": {
             "tempos_us": tempos.tolist(),
-            "tensoes_kv": [round(v, 2) for v in tensoes],
+            "tensoes_kv": np.round(tensoes, 2).tolist(),
         },
 
         # Análise de Conformidade
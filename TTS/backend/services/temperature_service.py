@@ -44,6 +44,19 @@ except ImportError:
                 
             const = MockConstants()
 
+try:
+    from ..utils.adaptive_grid import adaptive_time_grid
+except ImportError:
+    try:
+        from backend.utils.adaptive_grid import adaptive_time_grid
+    except ImportError:
+        from utils.adaptive_grid import adaptive_time_grid
+
+# Erro máximo da curva de temperatura com amostragem adaptativa (K)
+TOLERANCIA_CURVA_TEMPERATURA_K = 0.05
+# Menor intervalo da curva adaptativa (min): limita a densidade no início do aquecimento
+PASSO_MINIMO_CURVA_TEMPERATURA_MIN = 0.25
+
 
 def calculate_oil_temperature_rise(data: Dict[str, Any]) -> Dict[str, float]:
     """
@@ -153,14 +166,19 @@ def calculate_winding_temperature_rise(data: Dict[str, Any]) -> Dict[str, float]
     }
 
 
-def calculate_temperature_time_curve(data: Dict[str, Any], tempo_total: float = 480, intervalo: float = 10) -> Dict[str, Any]:
+def calculate_temperature_time_curve(data: Dict[str, Any], tempo_total: float = 480, intervalo: Optional[float] = None,
+                                     tolerancia: float = TOLERANCIA_CURVA_TEMPERATURA_K) -> Dict[str, Any]:
     """
     Calcula a curva de temperatura ao longo do tempo conforme seção 2.2 da documentação.
+    Por padrão os pontos são adaptativos: densos no início do aquecimento e esparsos
+    perto do regime permanente, com erro de interpolação linear até `tolerancia` onde os
+    pontos estão a mais de PASSO_MINIMO_CURVA_TEMPERATURA_MIN (no início, o erro pode ser maior).
     
     Args:
         data: Dicionário com os parâmetros do transformador
         tempo_total: Tempo total da simulação em minutos
-        intervalo: Intervalo entre pontos em minutos
+        intervalo: Intervalo fixo entre pontos em minutos (None = amostragem adaptativa)
+        tolerancia: Erro máximo da curva adaptativa em K
         
     Returns:
         Dicionário com os arrays de tempo e temperaturas calculadas
@@ -195,24 +213,32 @@ def calculate_temperature_time_curve(data: Dict[str, Any], tempo_total: float =
     theta_enrol_inicial = enrol_inicial["elevacao_enrol_atual"]
     theta_enrol_final = enrol_final["elevacao_enrol_atual"]
     
-    # Gera pontos de tempo
-    tempo = np.arange(0, tempo_total + intervalo, intervalo)
-    
     # Calcula curvas de temperatura
     # θ(t) = θ_final - (θ_final - θ_inicial) * e^(-t/τ)
-    theta_oleo = [theta_oleo_final - (theta_oleo_final - theta_oleo_inicial) * math.exp(-t / tau_oleo) for t in tempo]
-    theta_enrol = [theta_enrol_final - (theta_enrol_final - theta_enrol_inicial) * math.exp(-t / tau_enrol) for t in tempo]
+    def elevacoes(t: np.ndarray) -> np.ndarray:
+        return np.array([
+            theta_oleo_final - (theta_oleo_final - theta_oleo_inicial) * np.exp(-t / tau_oleo),
+            theta_enrol_final - (theta_enrol_final - theta_enrol_inicial) * np.exp(-t / tau_enrol),
+        ])
+
+    # Gera pontos de tempo
+    if intervalo is None:
+        tempo, (theta_oleo, theta_enrol) = adaptive_time_grid(elevacoes, 0.0, tempo_total, tolerancia,
+                                                              passo_minimo=PASSO_MINIMO_CURVA_TEMPERATURA_MIN)
+    else:
+        tempo = np.arange(0, tempo_total + intervalo, intervalo)
+        theta_oleo, theta_enrol = elevacoes(tempo)
     
     # Temperaturas absolutas (°C)
-    temp_oleo = [temp_ambiente + theta for theta in theta_oleo]
-    temp_enrol = [temp_ambiente + theta for theta in theta_enrol]
+    temp_oleo = temp_ambiente + theta_oleo
+    temp_enrol = temp_ambiente + theta_enrol
     
     return {
         "tempo": tempo.tolist(),
-        "elevacao_oleo": theta_oleo,
-        "elevacao_enrol": theta_enrol,
-        "temp_oleo": temp_oleo,
-        "temp_enrol": temp_enrol,
+        "elevacao_oleo": theta_oleo.tolist(),
+        "elevacao_enrol": theta_enrol.tolist(),
+        "temp_oleo": temp_oleo.tolist(),
+        "temp_enrol": temp_enrol.tolist(),
         "temp_ambiente": temp_ambiente
     }
 
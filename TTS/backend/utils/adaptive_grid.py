@@ -0,0 +1,127 @@
+# backend/utils/adaptive_grid.py
+"""
+Amostragem adaptativa de curvas no tempo (formas de onda, curvas de temperatura).
+
+Em vez de um passo fixo, os pontos são colocados onde a curva se afasta de uma
+reta: cada intervalo é dividido ao meio enquanto o valor da função no ponto
+médio diferir da interpolação linear entre as extremidades por mais que a
+tolerância. O resultado fica denso na frente de um impulso e em volta de um
+corte, e esparso na cauda e no regime permanente térmico, com o erro da
+interpolação linear limitado pela tolerância (medido nos pontos médios).
+
+O teste no ponto médio só enxerga o que cabe no intervalo: uma oscilação com
+período menor que o espaçamento inicial pode passar despercebida (o ponto médio
+cai perto da reta por acaso). Para curvas com modos rápidos conhecidos (ex.: a
+oscilação do gap após um corte), `passo_maximo` limita o espaçamento inicial de
+cada segmento; a partir dele, o refinamento segue normalmente. No sentido
+oposto, `passo_minimo` interrompe o refinamento: intervalos menores que o dobro
+dele não são mais divididos, e ali o erro pode passar da tolerância.
+
+Cada passada avalia a função de uma vez em todos os pontos médios pendentes,
+então a função deve aceitar arrays (NumPy). Ela pode devolver um canal (N,)
+ou vários (k, N); a tolerância vale para todos.
+"""
+
+from typing import Callable, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Intervalos uniformes da primeira passada (garantem que picos estreitos não passem despercebidos)
+PONTOS_INICIAIS = 16
+# Limite de divisões sucessivas de um intervalo (2^-40 do intervalo inicial)
+MAX_PASSADAS = 40
+# Limite de pontos por segmento (proteção contra tolerância impossível)
+MAX_PONTOS = 200_000
+
+
+def _as_channels(valores: np.ndarray) -> np.ndarray:
+    valores = np.asarray(valores, dtype=float)
+    return valores[None, :] if valores.ndim == 1 else valores
+
+
+def _sample_segment(func: Callable[[np.ndarray], np.ndarray], inicio: float, fim: float, tolerancia: float,
+                    relativa: bool, pontos_iniciais: int,
+                    passo_maximo: Optional[float], passo_minimo: float) -> Tuple[np.ndarray, np.ndarray]:
+    if passo_maximo is not None and passo_maximo > 0:
+        pontos_iniciais = max(pontos_iniciais, min(int(np.ceil((fim - inicio) / passo_maximo)), MAX_PONTOS // 2))
+    tempos = np.linspace(inicio, fim, pontos_iniciais + 1)
+    valores = _as_channels(func(tempos))
+    pendentes = np.arange(len(tempos) - 1)  # Índices (à esquerda) dos intervalos a testar
+    for _ in range(MAX_PASSADAS):
+        if passo_minimo > 0:
+            pendentes = pendentes[tempos[pendentes + 1] - tempos[pendentes] >= 2 * passo_minimo]
+        if not len(pendentes) or len(tempos) >= MAX_PONTOS:
+            break
+        limite = tolerancia * np.max(np.abs(valores)) if relativa else tolerancia
+        medios = 0.5 * (tempos[pendentes] + tempos[pendentes + 1])
+        valores_medios = _as_channels(func(medios))
+        interpolados = 0.5 * (valores[:, pendentes] + valores[:, pendentes + 1])
+        dividir = np.max(np.abs(valores_medios - interpolados), axis=0) > limite
+        # Os pontos médios entram em todos os intervalos testados; só os que falharam continuam pendentes
+        posicoes = pendentes + 1
+        tempos = np.insert(tempos, posicoes, medios)
+        valores = np.insert(valores, posicoes, valores_medios, axis=1)
+        # Depois da inserção, o intervalo i da lista original vira os intervalos 2 novos a partir de i + k
+        novos_inicios = pendentes + np.arange(len(pendentes))
+        pendentes = np.concatenate([novos_inicios[dividir], novos_inicios[dividir] + 1])
+        pendentes.sort()
+    return tempos, valores
+
+
+def adaptive_time_grid(func: Callable[[np.ndarray], np.ndarray], inicio: float, fim: float, tolerancia: float,
+                       relativa: bool = False, pontos_quebra: Iterable[float] = (),
+                       pontos_iniciais: int = PONTOS_INICIAIS,
+                       passo_maximo: Union[None, float, Sequence[Optional[float]]] = None,
+                       passo_minimo: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tempos e valores de `func` em [inicio, fim], com pontos concentrados onde a curva é curva.
+
+    Args:
+        func: Função vetorizada do tempo (devolve (N,) ou (k, N))
+        inicio: Início do intervalo
+        fim: Fim do intervalo
+        tolerancia: Erro máximo da interpolação linear entre pontos vizinhos
+        relativa: Se True, a tolerância é uma fração do maior |valor| encontrado
+        pontos_quebra: Instantes em que a curva (ou a derivada) é descontínua, ex.: um corte.
+            A curva é amostrada separadamente de cada lado; o ponto imediatamente antes da
+            quebra também é incluído, para que um salto apareça como um segmento vertical.
+        pontos_iniciais: Intervalos uniformes da primeira passada em cada segmento
+        passo_maximo: Maior espaçamento da primeira passada; um valor para todos os segmentos
+            ou um por segmento (na ordem de `pontos_quebra`, None = sem limite)
+        passo_minimo: Menor espaçamento criado pelo refinamento (0 = sem limite); abaixo
+            dele a tolerância deixa de ser garantida
+
+    Returns:
+        (tempos, valores), com tempos estritamente crescentes e valores no formato de `func`
+    """
+    if fim <= inicio:
+        raise ValueError(f"Intervalo de amostragem inválido: [{inicio}, {fim}]")
+    pontos_quebra = [q for q in pontos_quebra if q is not None]
+    quebras = sorted({q for q in pontos_quebra if inicio < q < fim})
+    limites = [inicio, *quebras, fim]
+    if passo_maximo is None or np.isscalar(passo_maximo):
+        passos = [passo_maximo] * (len(limites) - 1)
+    else:
+        # Um passo por segmento de `pontos_quebra`, inclusive os que caem fora de [inicio, fim]
+        todas = sorted(pontos_quebra)
+        if len(set(todas)) != len(todas):
+            raise ValueError("pontos_quebra repetidos com um passo_maximo por segmento")
+        passos_quebra = list(passo_maximo)
+        if len(passos_quebra) != len(todas) + 1:
+            raise ValueError(f"passo_maximo deve ter {len(todas) + 1} valores (um por segmento), "
+                             f"recebeu {len(passos_quebra)}")
+        passos = [passos_quebra[int(np.searchsorted(todas, 0.5 * (a + b), side="right"))]
+                  for a, b in zip(limites[:-1], limites[1:])]
+    partes_t, partes_v = [], []
+    for i, (a, b) in enumerate(zip(limites[:-1], limites[1:])):
+        ultimo = i == len(limites) - 2
+        # Antes de uma quebra, o segmento termina no limite à esquerda dela
+        b_segmento = b if ultimo else float(np.nextafter(b, a))
+        tempos, valores = _sample_segment(func, a, b_segmento, tolerancia, relativa, pontos_iniciais, passos[i],
+                                          passo_minimo)
+        partes_t.append(tempos)
+        partes_v.append(valores)
+    tempos = np.concatenate(partes_t)
+    valores = np.concatenate(partes_v, axis=1)
+    unico_canal = np.asarray(func(np.array([inicio]))).ndim == 1
+    return tempos, (valores[0] if unico_canal else valores)
@@ -168,6 +168,7 @@ C_PER_STAGE_F = 1.5e-6  # Capacitância por estágio (Farad)
 C_DIVIDER_HIGH_VOLTAGE_F = 600e-12  # Divisor para Vmax >= 1200kV (Farad)
 C_DIVIDER_LOW_VOLTAGE_F = 1200e-12  # Divisor para Vmax < 1200kV (Farad)
 C_CHOPPING_GAP_F = 600e-12  # Capacitância parasita do gap de corte (Farad)
+L_CHOPPING_GAP_H = 3e-6  # Indutância da malha de corte (gap + conexões) (Henry)
 R_PARASITIC_OHM = 5.0  # Resistência parasita estimada do circuito (Ohm)
 
 # --- Constantes para Análises Dielétricas ---
@@ -190,6 +191,8 @@ TEMP_AMBIENTE_REFERENCIA = 20  # °C
 
 
 # --- Componentes Disponíveis (Para Dropdowns na UI) ---
+# Resistores LI: valor total de uma coluna de estágios (R_total = R / paralelos);
+# resistores SI: valor por estágio (R_total = R · estágios / paralelos)
 RESISTORS_LI_FRONT_AVAILABLE = [
     {"value": 15, "label": "15 Ω"},
     {"value": 20, "label": "20 Ω"},
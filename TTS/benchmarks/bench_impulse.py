@@ -0,0 +1,84 @@
+# benchmarks/bench_impulse.py
+"""
+Benchmark da simulação da forma de onda de impulso.
+
+Compara o laço original do calculate_impulse_test (um ponto por vez em
+Python, com np.exp escalar) com simulate_impulse_waveform, que calcula todos
+os pontos com NumPy, para onda plena e cortada e para vários passos de tempo
+(0.1 μs é o padrão; 0.001 μs é a resolução de 1 ns).
+
+Uso (a partir do diretório TTS):
+    python -m benchmarks.bench_impulse [--passos 0.1,0.01,0.001] [--repeticoes 5]
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+root_dir = pathlib.Path(__file__).absolute().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+
+from backend.services.impulse_service import (  # noqa: E402
+    GAMMA_DECAIMENTO_CORTE, TEMPO_MAX_SIMULACAO_US, calculate_impulse_waveform_parameters,
+    impulse_waveform, simulate_impulse_waveform, simulation_time_grid,
+)
+
+# Circuito padrão do calculate_impulse_test (Rf=500 Ω, Rc=2000 Ω, Cg=1 nF, Cobj=1000 pF)
+PARAMS = calculate_impulse_waveform_parameters(500.0, 2000.0, 1.0, 1000.0)
+TENSAO_CARREGAMENTO = 1000.0  # kV
+
+
+def simulate_legacy(tempos, alfa, beta, tempo_corte_us, sobretensao_corte_kv):
+    """Reproduz o laço original: um ponto por iteração."""
+    tensoes = []
+    for t_val in tempos:
+        t_float = float(t_val)
+        if tempo_corte_us is not None and t_float >= tempo_corte_us:
+            tensoes.append(sobretensao_corte_kv * np.exp(-GAMMA_DECAIMENTO_CORTE * (t_float - tempo_corte_us)))
+        else:
+            tensoes.append(TENSAO_CARREGAMENTO * impulse_waveform(t_float, alfa, beta))
+    return tensoes
+
+
+def best_of(repeticoes: int, func, *args) -> float:
+    best = float('inf')
+    for _ in range(repeticoes):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--passos', default='0.1,0.01,0.001', help='passos de tempo em μs, separados por vírgula')
+    parser.add_argument('--tempo-max', type=float, default=TEMPO_MAX_SIMULACAO_US, help='janela de simulação em μs')
+    parser.add_argument('--repeticoes', type=int, default=5, help='repetições (vale a melhor)')
+    args = parser.parse_args()
+
+    alfa, beta = PARAMS['alfa'], PARAMS['beta']
+    print(f"Janela: {args.tempo_max:g} μs  |  alfa={alfa:.4g}  beta={beta:.4g}")
+    print(f"{'passo (μs)':>11}{'pontos':>10}{'onda':>9}{'laço (ms)':>12}{'NumPy (ms)':>12}{'ganho':>9}")
+    for passo in (float(p) for p in args.passos.split(',') if p.strip()):
+        tempos = simulation_time_grid(args.tempo_max, passo)
+        for onda, tempo_corte in (('plena', None), ('cortada', 3.0)):
+            sobretensao = 0.0
+            if tempo_corte is not None:
+                sobretensao = 1.2 * TENSAO_CARREGAMENTO * impulse_waveform(tempo_corte, alfa, beta)
+            legacy = simulate_legacy(tempos, alfa, beta, tempo_corte, sobretensao)
+            vectorized = simulate_impulse_waveform(tempos, TENSAO_CARREGAMENTO, alfa, beta, tempo_corte, sobretensao)
+            if not np.allclose(legacy, vectorized):
+                raise SystemExit(f"Resultados divergentes (passo {passo} μs, onda {onda})")
+            t_legacy = best_of(args.repeticoes, simulate_legacy, tempos, alfa, beta, tempo_corte, sobretensao)
+            t_numpy = best_of(args.repeticoes, simulate_impulse_waveform, tempos, TENSAO_CARREGAMENTO,
+                              alfa, beta, tempo_corte, sobretensao)
+            print(f"{passo:>11g}{len(tempos):>10}{onda:>9}{t_legacy * 1000:>12.2f}{t_numpy * 1000:>12.3f}"
+                  f"{t_legacy / t_numpy:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
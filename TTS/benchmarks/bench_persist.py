@@ -0,0 +1,99 @@
+# benchmarks/bench_persist.py
+"""
+Benchmark de throughput de persistência de stores no SQLite.
+
+Compara o modo antigo do MCPDataManager (sqlite3.connect + commit a cada
+_persist_store, journal de rollback) com o SQLiteConnectionManager
+(conexão persistente por thread, WAL, synchronous=NORMAL e upsert com
+statement reaproveitado).
+
+Uso (a partir do diretório TTS):
+    python -m benchmarks.bench_persist [--writes 2000] [--payload-kb 4]
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import time
+
+root_dir = pathlib.Path(__file__).absolute().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+
+from backend.mcp.connection import SQLiteConnectionManager, UPSERT_STORE_SQL  # noqa: E402
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS data_stores (
+        store_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        version INTEGER DEFAULT 1
+    )
+'''
+
+STORE_IDS = ['transformerInputs', 'losses', 'impulse', 'appliedVoltage',
+             'inducedVoltage', 'shortCircuit', 'temperatureRise', 'dielectricAnalysis']
+
+
+def make_payload(size_kb: int) -> str:
+    form_data = {f"campo_{i}": i * 1.5 for i in range(max(1, size_kb * 1024 // 20))}
+    return json.dumps({'formData': form_data})
+
+
+def bench_legacy(db_path: str, writes: int, payload: str) -> float:
+    """Reproduz o _persist_store original: nova conexão + subconsulta de versão + commit."""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(CREATE_TABLE_SQL)
+    start = time.perf_counter()
+    for i in range(writes):
+        store_id = STORE_IDS[i % len(STORE_IDS)]
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO data_stores (store_id, data, last_updated, version)
+                VALUES (?, ?, CURRENT_TIMESTAMP,
+                    COALESCE((SELECT version + 1 FROM data_stores WHERE store_id = ?), 1))
+            ''', (store_id, payload, store_id))
+            conn.commit()
+    return time.perf_counter() - start
+
+
+def bench_pooled(db_path: str, writes: int, payload: str) -> float:
+    """Mesma carga usando o SQLiteConnectionManager."""
+    manager = SQLiteConnectionManager(db_path)
+    with manager.transaction() as conn:
+        conn.execute(CREATE_TABLE_SQL)
+    start = time.perf_counter()
+    for i in range(writes):
+        store_id = STORE_IDS[i % len(STORE_IDS)]
+        with manager.transaction() as conn:
+            conn.execute(UPSERT_STORE_SQL, (store_id, payload, i + 1))
+    elapsed = time.perf_counter() - start
+    manager.close_all()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writes', type=int, default=2000, help='número de persistências')
+    parser.add_argument('--payload-kb', type=int, default=4, help='tamanho aproximado de cada store em KB')
+    args = parser.parse_args()
+
+    payload = make_payload(args.payload_kb)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = bench_legacy(os.path.join(tmp, 'legacy.db'), args.writes, payload)
+        pooled = bench_pooled(os.path.join(tmp, 'pooled.db'), args.writes, payload)
+
+    print(f"Persistências: {args.writes}  |  payload: {len(payload) / 1024:.1f} KB")
+    print(f"{'modo':<28}{'total (s)':>12}{'writes/s':>12}{'ms/write':>12}")
+    for name, elapsed in (('connect por chamada', legacy), ('pool WAL + NORMAL', pooled)):
+        print(f"{name:<28}{elapsed:>12.3f}{args.writes / elapsed:>12.0f}{elapsed * 1000 / args.writes:>12.3f}")
+    print(f"Ganho: {legacy / pooled:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
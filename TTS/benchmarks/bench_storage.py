@@ -0,0 +1,160 @@
+# benchmarks/bench_storage.py
+"""
+Benchmark dos backends de armazenamento do MCP (backend/mcp/storage.py).
+
+Para cada backend (sqlite, memory, file) grava uma sequência de edições
+realistas dos stores pelo MCPDataManager (patch de um campo do formulário
+seguido da gravação dos resultados dos módulos) e mede:
+
+    persist   latência por gravação (p50/p95/máx, ms) e gravações/s
+    restore   tempo para reabrir o backend e decodificar todos os stores
+    size      espaço em disco ao final (para 'memory', tamanho estimado do JSON;
+              para 'sqlite', banco + WAL, que chega a ~4 MB antes do checkpoint automático)
+
+Uso (a partir do diretório TTS):
+    python -m benchmarks.bench_storage [--edits 500] [--backends sqlite,file,memory]
+                                       [--seed-db ../tts_data.db]
+
+Com --seed-db os stores iniciais são lidos de um tts_data.db existente em vez
+de gerados.
+"""
+
+import argparse
+import os
+import pathlib
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+root_dir = pathlib.Path(__file__).absolute().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+
+from backend.mcp.data_manager import MCPDataManager  # noqa: E402
+from backend.mcp.snapshot import thaw  # noqa: E402
+from backend.mcp.storage import STORAGE_BACKENDS, create_storage_backend  # noqa: E402
+
+MODULE_STORES = ['losses', 'impulse', 'appliedVoltage', 'inducedVoltage',
+                 'shortCircuit', 'temperatureRise', 'dielectricAnalysis']
+
+
+def make_form_data(rng: random.Random) -> dict:
+    """Formulário de dados básicos com os ~50 campos de transformer_inputs.html."""
+    form = {
+        'potencia_mva': 100.0, 'frequencia': 60.0, 'tipo_transformador': 'Trifásico',
+        'grupo_ligacao': 'Dyn1', 'liquido_isolante': 'Mineral', 'tipo_isolamento': 'Uniforme',
+        'tensao_at': 138.0, 'tensao_bt': 13.8, 'impedancia': 12.5, 'nbi_at': 550.0, 'nbi_bt': 110.0,
+        'conexao_at': 'estrela', 'conexao_bt': 'triangulo', 'peso_oleo': 25.0, 'peso_total': 120.0,
+    }
+    for i in range(35):
+        form[f'campo_{i}'] = round(rng.uniform(0, 1000), 3)
+    return form
+
+
+def make_results(rng: random.Random) -> dict:
+    """Resultados de um módulo: escalares, uma tabela por tap e uma curva."""
+    return {
+        'resumo': {f'valor_{i}': round(rng.uniform(0, 100), 4) for i in range(20)},
+        'tabela_taps': [{f'col_{j}': round(rng.uniform(0, 100), 3) for j in range(8)} for _ in range(15)],
+        'curva': [round(rng.uniform(0, 1), 5) for _ in range(200)],
+    }
+
+
+def seed_stores(seed_db: str, rng: random.Random, directory: str) -> dict:
+    if seed_db:
+        # Lê de uma cópia: abrir o banco cria índices/migrações, e o original não deve mudar
+        copy_path = os.path.join(directory, 'seed.db')
+        shutil.copyfile(seed_db, copy_path)
+        source = MCPDataManager(copy_path)
+        stores = {store_id: thaw(data) for store_id, data in source.get_all_stores().items()}
+        source.close()
+        return stores
+    stores = {'transformerInputs': {'formData': make_form_data(rng)}}
+    for store_id in MODULE_STORES:
+        stores[store_id] = {'inputs': {'modo': 'padrão'}, 'results': make_results(rng)}
+    return stores
+
+
+def run_backend(kind: str, directory: str, edits: int, stores: dict, seed: int) -> dict:
+    path = os.path.join(directory, 'tts_bench.db' if kind == 'sqlite' else 'tts_bench_files')
+    manager = MCPDataManager(storage=create_storage_backend(kind, path if kind != 'memory' else None))
+    for store_id, data in stores.items():
+        if store_id in manager.store_definitions:
+            manager.set_data(store_id, data, propagate=False)
+
+    rng = random.Random(seed)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(edits):
+        if i % 2 == 0:
+            # Edição de um campo do formulário (patch pequeno)
+            field = rng.choice(list(stores['transformerInputs']['formData']))
+            t0 = time.perf_counter()
+            manager.patch_data('transformerInputs', {'formData': {field: rng.uniform(0, 1000)}}, propagate=False)
+        else:
+            # Recalculo de um módulo (parte dos resultados muda)
+            store_id = rng.choice(MODULE_STORES)
+            results = dict(manager.get_data(store_id).get('results') or {})
+            results['resumo'] = {f'valor_{j}': round(rng.uniform(0, 100), 4) for j in range(20)}
+            t0 = time.perf_counter()
+            manager.patch_data(store_id, {'results': results}, propagate=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    persist_total = time.perf_counter() - start
+
+    storage = manager.storage
+    if kind == 'memory':
+        # Nada vai para o disco: "restaurar" é reabrir os stores do mesmo backend
+        t0 = time.perf_counter()
+        reopened = MCPDataManager(storage=storage)
+        reopened.get_all_stores()
+        restore_ms = (time.perf_counter() - t0) * 1000
+        size = storage.size_bytes()
+        manager.close()
+    else:
+        manager.close()
+        t0 = time.perf_counter()
+        reopened = MCPDataManager(storage=create_storage_backend(kind, path))
+        reopened.get_all_stores()
+        restore_ms = (time.perf_counter() - t0) * 1000
+        size = reopened.storage.size_bytes()
+        reopened.storage.close()
+
+    latencies.sort()
+    return {
+        'backend': kind,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+        'max_ms': latencies[-1],
+        'writes_s': edits / persist_total,
+        'restore_ms': restore_ms,
+        'size_kb': size / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--edits', type=int, default=500, help='número de gravações por backend')
+    parser.add_argument('--backends', default=','.join(STORAGE_BACKENDS), help='backends a comparar')
+    parser.add_argument('--seed-db', default='', help='tts_data.db de onde ler os stores iniciais')
+    parser.add_argument('--seed', type=int, default=42, help='semente das edições aleatórias')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = seed_stores(args.seed_db, random.Random(args.seed), tmp)
+        for kind in [name.strip() for name in args.backends.split(',') if name.strip()]:
+            results.append(run_backend(kind, tmp, args.edits, stores, args.seed))
+
+    print(f"\nGravações por backend: {args.edits}  |  stores: {len(stores)}")
+    print(f"{'backend':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'máx (ms)':>10}{'writes/s':>10}"
+          f"{'restore (ms)':>14}{'tamanho (KB)':>14}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['max_ms']:>10.3f}{r['writes_s']:>10.0f}"
+              f"{r['restore_ms']:>14.2f}{r['size_kb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,47 @@ const apiDataSystem = {
     stores: new Map(),
     initialized: false,
     useLocalStorageFallback: false, // Adicionado para rastrear o modo de fallback
+    changeFeed: null, // EventSource de /api/data/changes
+    feedConnected: false, // Com o feed conectado o cache só expira quando o backend avisa
+    projectId: localStorage.getItem('tts_project_id') || null, // Projeto/transformador ativo (null = padrão)
+
+    // Cabeçalhos das requisições ao backend, com o projeto ativo (X-Project-Id)
+    requestHeaders(extra = {}) {
+        return this.projectId ? { ...extra, 'X-Project-Id': this.projectId } : { ...extra };
+    },
+
+    // Troca o projeto ativo: descarta os caches e reconecta o feed de alterações do novo projeto
+    setProject(projectId) {
+        const normalized = projectId && projectId !== 'default' ? projectId : null;
+        if (normalized === this.projectId) {
+            return;
+        }
+        console.log(`[apiDataSystem] Trocando para o projeto: ${normalized || 'default'}`);
+        this.projectId = normalized;
+        if (normalized) {
+            localStorage.setItem('tts_project_id', normalized);
+        } else {
+            localStorage.removeItem('tts_project_id');
+        }
+        this.stores.clear();
+        if (this.changeFeed) {
+            this.changeFeed.close();
+            this.changeFeed = null;
+            this.feedConnected = false;
+            this.connectChangeFeed();
+        }
+        document.dispatchEvent(new CustomEvent('projectChanged', { detail: { projectId: normalized || 'default' } }));
+    },
+
+    // Lista os projetos conhecidos pelo backend
+    async listProjects() {
+        await this.init();
+        if (this.useLocalStorageFallback) {
+            return [{ project_id: 'default', active: true, persisted: true }];
+        }
+        const response = await fetch(`${this.baseURL}/projects`);
+        return response.ok ? (await response.json()).projects : [];
+    },
 
     // Inicializa o sistema
     async init() {
@@ -25,6 +66,7 @@ const apiDataSystem = {
             } else {
                 console.log('[apiDataSystem] Conectividade com backend OK.');
                 this.useLocalStorageFallback = false;
+                this.connectChangeFeed();
             }
             this.initialized = true;
             console.log('[apiDataSystem] apiDataSystem.init concluído. Fallback ativo:', this.useLocalStorageFallback);
@@ -36,6 +78,89 @@ const apiDataSystem = {
         }
     },
 
+    // Assina o feed de alterações (SSE): o backend avisa quais stores mudaram,
+    // inclusive pelas propagações, e só esses são buscados de novo
+    connectChangeFeed() {
+        if (this.changeFeed || typeof EventSource === 'undefined') {
+            return;
+        }
+        console.log(`[apiDataSystem] Conectando ao feed de alterações em ${this.baseURL}/changes`);
+        // O EventSource não envia cabeçalhos: o projeto vai na query string
+        const query = this.projectId ? `?project=${encodeURIComponent(this.projectId)}` : '';
+        const feed = new EventSource(`${this.baseURL}/changes${query}`);
+        feed.addEventListener('ready', () => {
+            console.log('[apiDataSystem] Feed de alterações conectado.');
+            this.feedConnected = true;
+        });
+        feed.addEventListener('change', (event) => {
+            const change = JSON.parse(event.data);
+            const store = this.stores.get(change.store_id);
+            if (store) {
+                store.invalidate(change.version);
+            }
+            document.dispatchEvent(new CustomEvent('storeChanged', { detail: change }));
+        });
+        feed.addEventListener('resync', () => {
+            console.warn('[apiDataSystem] Eventos perdidos no feed de alterações. Invalidando todos os stores.');
+            this.stores.forEach(store => store.invalidate(null));
+            document.dispatchEvent(new CustomEvent('storeChanged', { detail: { resync: true } }));
+        });
+        feed.onerror = () => {
+            // O EventSource reconecta sozinho (com Last-Event-ID); até lá volta a valer o cacheTimeout
+            if (this.feedConnected) {
+                console.warn('[apiDataSystem] Feed de alterações desconectado. Usando expiração por tempo até reconectar.');
+            }
+            this.feedConnected = false;
+        };
+        this.changeFeed = feed;
+    },
+
+    // Busca vários stores numa única requisição (POST /stores:batch) e preenche os caches.
+    // Usado no carregamento das páginas de módulo (transformerInputs + store do módulo).
+    async prefetchStores(storeIds) {
+        await this.init();
+        if (this.useLocalStorageFallback) {
+            return;
+        }
+        const operations = storeIds
+            .map(storeId => this.getStore(storeId))
+            .filter(store => !store.isCacheValid())
+            .map(store => ({
+                op: 'get',
+                store_id: store.storeId,
+                if_none_match: store.cache ? store.etag : null
+            }));
+        if (operations.length === 0) {
+            console.log('[apiDataSystem] prefetchStores: todos os stores já estão em cache');
+            return;
+        }
+        const changeCounts = new Map(operations.map(op => [op.store_id, this.getStore(op.store_id).changeCount]));
+        try {
+            console.log(`[apiDataSystem] prefetchStores: buscando ${operations.map(op => op.store_id).join(', ')} em lote`);
+            const response = await fetch(`${this.baseURL}/stores:batch`, {
+                method: 'POST',
+                headers: this.requestHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({ operations })
+            });
+            if (!response.ok) {
+                console.warn(`[apiDataSystem] prefetchStores: lote falhou (Status: ${response.status}). Os stores serão buscados individualmente.`);
+                return;
+            }
+            const { results } = await response.json();
+            results.forEach(result => {
+                const store = this.getStore(result.store_id);
+                if (result.status === 200) {
+                    store.cache = result.data;
+                    store.etag = result.etag;
+                }
+                store.lastFetch = Date.now();
+                store.stale = store.changeCount !== changeCounts.get(result.store_id);
+            });
+        } catch (error) {
+            console.warn('[apiDataSystem] prefetchStores: erro ao buscar stores em lote:', error);
+        }
+    },
+
     // Obtém um store específico
     getStore(storeId) {
         console.log(`[apiDataSystem] Obtendo store: ${storeId}`);
@@ -55,22 +180,44 @@ class DataStore {
         this.apiSystem = apiSystem;
         this.cache = null;
         this.lastFetch = 0;
-        this.cacheTimeout = 5000; // 5 segundos
+        this.cacheTimeout = 5000; // 5 segundos (usado apenas quando o feed de alterações não está conectado)
+        this.stale = true; // Marcado pelo feed de alterações quando o backend altera o store
+        this.version = null; // Última versão anunciada pelo feed
+        this.etag = null; // ETag (versão) do cache, usada para revalidar com If-None-Match
+        this.changeCount = 0;
         console.log(`[DataStore] Instância criada para store: ${storeId}`);
     }
 
+    // Marca o cache como desatualizado (chamado pelo feed de alterações)
+    invalidate(version) {
+        this.stale = true;
+        this.version = version;
+        this.changeCount++;
+        console.log(`[DataStore:${this.storeId}] Cache invalidado pelo feed de alterações (versão ${version})`);
+    }
+
+    // Com o feed conectado o cache vale até o backend avisar uma alteração
+    isCacheValid() {
+        if (!this.cache) {
+            return false;
+        }
+        return this.apiSystem.feedConnected
+            ? !this.stale
+            : (Date.now() - this.lastFetch) < this.cacheTimeout;
+    }
+
     // Carrega dados do store
     async getData() {
         console.log(`[DataStore:${this.storeId}] Iniciando getData`);
         await this.apiSystem.init();
 
-        // Verifica cache
         const now = Date.now();
-        if (this.cache && (now - this.lastFetch) < this.cacheTimeout) {
-            console.log(`[DataStore:${this.storeId}] Usando cache (válido por ${this.cacheTimeout}ms)`);
+        if (this.isCacheValid()) {
+            console.log(`[DataStore:${this.storeId}] Usando cache`);
             return this.cache;
         }
         console.log(`[DataStore:${this.storeId}] Cache expirado ou inexistente. Buscando dados.`);
+        const changeCountAtFetch = this.changeCount;
 
         try {
             if (this.apiSystem.useLocalStorageFallback) {
@@ -80,10 +227,22 @@ class DataStore {
                 console.log(`[DataStore:${this.storeId}] getData: Dados obtidos via localStorage`, this.cache);
             } else {
                 console.log(`[DataStore:${this.storeId}] getData: Buscando do backend em ${this.apiSystem.baseURL}/stores/${this.storeId}`);
-                const response = await fetch(`${this.apiSystem.baseURL}/stores/${this.storeId}`);
-                if (response.ok) {
+                // Revalidação condicional: se a versão não mudou o backend responde 304 sem corpo
+                const headers = this.apiSystem.requestHeaders((this.cache && this.etag) ? { 'If-None-Match': this.etag } : {});
+                const response = await fetch(`${this.apiSystem.baseURL}/stores/${this.storeId}`, { headers });
+                if (response.status === 304) {
+                    console.log(`[DataStore:${this.storeId}] getData: Store inalterado (304), mantendo cache`);
+                } else if (response.ok) {
                     this.cache = await response.json();
+                    this.etag = response.headers.get('ETag');
+                    this.recomputeError = null;
                     console.log(`[DataStore:${this.storeId}] getData: Dados obtidos do backend`, this.cache);
+                } else if (response.status === 409) {
+                    // O recálculo do módulo falhou com as entradas atuais: os dados do backend estão desatualizados
+                    const { detail } = await response.json();
+                    console.error(`[DataStore:${this.storeId}] getData: ${detail.message}: ${detail.error}`);
+                    this.cache = {};
+                    this.recomputeError = detail.error;
                 } else {
                     console.warn(`[DataStore:${this.storeId}] getData: Erro ao carregar store do backend (Status: ${response.status}). Cache definido como vazio.`, response);
                     this.cache = {};
@@ -91,6 +250,8 @@ class DataStore {
             }
 
             this.lastFetch = now;
+            // Se uma alteração chegou durante a busca, o cache continua desatualizado
+            this.stale = this.changeCount !== changeCountAtFetch;
             console.log(`[DataStore:${this.storeId}] getData: Concluído`);
             return this.cache;
         } catch (error) {
@@ -121,9 +282,9 @@ class DataStore {
                     console.log(`[DataStore:${this.storeId}] updateData: Enviando POST para /api/transformer/inputs`);
                     response = await fetch(`${this.apiSystem.baseURL.replace('/api/data', '/api/transformer')}/inputs`, {
                         method: 'POST', // Usar POST conforme o fluxo
-                        headers: {
+                        headers: this.apiSystem.requestHeaders({
                             'Content-Type': 'application/json',
-                        },
+                        }),
                         body: JSON.stringify(newData.formData) // Enviar apenas formData, pois o backend espera isso
                     });
                 } else {
@@ -131,15 +292,16 @@ class DataStore {
                     console.log(`[DataStore:${this.storeId}] updateData: Enviando PATCH para backend em ${this.apiSystem.baseURL}/stores/${this.storeId}`);
                     response = await fetch(`${this.apiSystem.baseURL}/stores/${this.storeId}`, {
                         method: 'PATCH',
-                        headers: {
+                        headers: this.apiSystem.requestHeaders({
                             'Content-Type': 'application/json',
-                        },
+                        }),
                         body: JSON.stringify(newData)
                     });
                 }
 
                 if (response.ok) {
                     this.cache = await response.json(); // Atualiza cache com resposta do backend
+                    this.etag = response.headers.get('ETag');
                     console.log(`[DataStore:${this.storeId}] updateData: Dados atualizados no backend`, this.cache);
                 } else {
                     console.error(`[DataStore:${this.storeId}] updateData: Erro ao salvar store no backend (Status: ${response.status}). Tentando localStorage como fallback.`, response);
@@ -185,14 +347,15 @@ class DataStore {
                 console.log(`[DataStore:${this.storeId}] setData: Enviando para backend em ${this.apiSystem.baseURL}/stores/${this.storeId}`);
                 const response = await fetch(`${this.apiSystem.baseURL}/stores/${this.storeId}`, {
                     method: 'PUT',
-                    headers: {
+                    headers: this.apiSystem.requestHeaders({
                         'Content-Type': 'application/json',
-                    },
+                    }),
                     body: JSON.stringify(data)
                 });
 
                 if (response.ok) {
                     this.cache = await response.json(); // Atualiza cache com resposta do backend
+                    this.etag = response.headers.get('ETag');
                     console.log(`[DataStore:${this.storeId}] setData: Dados definidos no backend`, this.cache);
                 } else {
                     console.error(`[DataStore:${this.storeId}] setData: Erro ao definir store no backend (Status: ${response.status}).`, response);
@@ -3,35 +3,51 @@
 import { loadAndPopulateTransformerInfo } from './common_module.js';
 import { apiDataSystem, collectFormData, fillFormWithData } from './api_persistence.js'; // Importa o sistema de persistência e funções auxiliares
 
-// Obtém o store de sessões
-const historyStore = apiDataSystem.getStore('sessions'); // Usar 'sessions' conforme o backend
+// Catálogo de sessões do backend (paginado por cursor, com busca textual)
+const sessionsURL = () => apiDataSystem.baseURL.replace('/api/data', '/api/sessions');
+const SESSIONS_PAGE_SIZE = 50;
+
+// Estado da listagem: sessões já carregadas, cursor da próxima página e busca atual
+const sessionsState = { sessions: [], nextCursor: null, query: '' };
+
+// Busca uma página do catálogo (a busca "300 MVA 500 kV 2025" é feita no servidor)
+async function fetchSessionsPage(query = '', cursor = null) {
+    const params = new URLSearchParams({ limit: String(SESSIONS_PAGE_SIZE) });
+    if (query) params.set('q', query);
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${sessionsURL()}?${params}`, { headers: apiDataSystem.requestHeaders() });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+    return response.json();
+}
 
-// Função para carregar sessões
-async function loadSessions() {
+// Função para carregar sessões (primeira página, ou a próxima com append = true)
+async function loadSessions(query = sessionsState.query, append = false) {
     try {
-        await waitForApiSystem(); // Garante que o sistema de persistência esteja pronto
-        let sessions = await historyStore.getData();
-
-        // Garante que sessions seja sempre um array
-        if (!sessions || !Array.isArray(sessions)) {
-            sessions = [];
-        }
-
-        if (sessions.length === 0) {
-            // Se não houver sessões na API, cria algumas de exemplo APENAS EM MEMÓRIA
-            console.log('[loadSessions] Nenhuma sessão encontrada, criando dados mock em memória');
-            sessions = [
-                { id: 'sessao_1', name: 'Simulação Inicial', notes: 'Primeiro projeto de teste', timestamp: new Date(2023, 0, 15, 10, 30).toISOString() },
-                { id: 'sessao_2', name: 'Trafo Grande EOL', notes: 'Configuração para parque eólico', timestamp: new Date(2023, 1, 20, 14, 0).toISOString() },
-                { id: 'sessao_3', name: 'Otimização Perdas', notes: 'Foco em perdas em vazio', timestamp: new Date(2023, 2, 5, 9, 0).toISOString() },
-            ];
-            // NÃO salva no backend para evitar erro 422
-        }
-        return sessions;
+        const page = await fetchSessionsPage(query, append ? sessionsState.nextCursor : null);
+        sessionsState.query = query;
+        sessionsState.sessions = append ? sessionsState.sessions.concat(page.sessions) : page.sessions;
+        sessionsState.nextCursor = page.next_cursor;
     } catch (error) {
         console.error('[loadSessions] Erro ao carregar sessões:', error);
-        return []; // Retorna array vazio em caso de erro
+        if (!append) {
+            sessionsState.sessions = [];
+            sessionsState.nextCursor = null;
+        }
     }
+    return sessionsState.sessions;
+}
+
+function showActionMessage(html) {
+    const messageDiv = document.getElementById('history-action-message');
+    if (!messageDiv) return;
+    messageDiv.innerHTML = html;
+    setTimeout(() => { messageDiv.innerHTML = ''; }, 3000);
+}
+
+function escapeHtml(text) {
+    return String(text ?? '').replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
 }
 
 // Função para renderizar a tabela de sessões
@@ -47,27 +63,39 @@ async function renderSessionsTable(sessions) {
 
     if (sessions.length === 0) {
         tableBody.innerHTML = '<div class="text-muted text-center py-5">Nenhuma sessão encontrada.</div>';
+        document.getElementById('history-stats-total-sessions').textContent = 0;
         return;
     }
 
     tableBody.innerHTML = sessions.map(session => `
         <div class="row g-0 align-items-center table-row">
-            <div class="col-3 py-2 px-3">${new Date(session.timestamp).toLocaleString()}</div>
-            <div class="col-4 py-2 px-3">${session.name}</div>
-            <div class="col-3 py-2 px-3">${session.notes || '-'}</div>
+            <div class="col-3 py-2 px-3">${session.created_at ? new Date(session.created_at).toLocaleString() : '-'}</div>
+            <div class="col-4 py-2 px-3">${escapeHtml(session.session_id)}</div>
+            <div class="col-3 py-2 px-3">${escapeHtml(session.description) || '-'}</div>
             <div class="col-2 py-2 px-3 text-center">
-                <button class="btn btn-sm btn-info me-1 load-session-btn" data-id="${session.id}" title="Carregar Sessão"><i class="fas fa-folder-open"></i></button>
-                <button class="btn btn-sm btn-danger delete-session-btn" data-id="${session.id}" title="Excluir Sessão"><i class="fas fa-trash-alt"></i></button>
+                <button class="btn btn-sm btn-info me-1 load-session-btn" data-id="${escapeHtml(session.session_id)}" title="Carregar Sessão"><i class="fas fa-folder-open"></i></button>
+                <button class="btn btn-sm btn-danger delete-session-btn" data-id="${escapeHtml(session.session_id)}" title="Excluir Sessão"><i class="fas fa-trash-alt"></i></button>
             </div>
         </div>
-    `).join('');
+    `).join('') + (sessionsState.nextCursor ? `
+        <div class="text-center py-2">
+            <button class="btn btn-sm btn-outline-secondary" id="history-load-more-button">Carregar mais</button>
+        </div>` : '');
 
     // Adicionar listeners aos botões de ação
     tableBody.querySelectorAll('.load-session-btn').forEach(button => {
         button.addEventListener('click', async (e) => {
             const sessionId = e.currentTarget.dataset.id;
             console.log(`Carregar sessão: ${sessionId}`);
-            alert(`Funcionalidade de carregar sessão ${sessionId} seria implementada aqui.`);
+            const response = await fetch(`${sessionsURL()}/${encodeURIComponent(sessionId)}/load`, {
+                method: 'POST',
+                headers: apiDataSystem.requestHeaders(),
+            });
+            if (response.ok) {
+                showActionMessage('<div class="alert alert-success py-1 px-2">Sessão carregada com sucesso!</div>');
+            } else {
+                showActionMessage('<div class="alert alert-danger py-1 px-2">Erro ao carregar a sessão.</div>');
+            }
         });
     });
 
@@ -80,8 +108,16 @@ async function renderSessionsTable(sessions) {
         });
     });
 
-    // Atualizar estatísticas
-    document.getElementById('history-stats-total-sessions').textContent = sessions.length;
+    const loadMoreButton = document.getElementById('history-load-more-button');
+    if (loadMoreButton) {
+        loadMoreButton.addEventListener('click', async () => {
+            await renderSessionsTable(await loadSessions(sessionsState.query, true));
+        });
+    }
+
+    // Atualizar estatísticas (sessões carregadas; "+" indica que há mais páginas)
+    document.getElementById('history-stats-total-sessions').textContent =
+        `${sessions.length}${sessionsState.nextCursor ? '+' : ''}`;
 }
 
 // Função de inicialização do módulo Histórico
@@ -122,28 +158,22 @@ async function initHistory() {
             return;
         }
 
-        let sessions = await loadSessions();
-        if (sessions.some(s => s.name.toLowerCase() === sessionName.toLowerCase())) {
-            errorMessageDiv.textContent = 'Já existe uma sessão com este nome.';
+        const response = await fetch(sessionsURL(), {
+            method: 'POST',
+            headers: apiDataSystem.requestHeaders({ 'Content-Type': 'application/json' }),
+            body: JSON.stringify({ session_id: sessionName, description: sessionNotes }),
+        });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            errorMessageDiv.textContent = error.detail || 'Erro ao salvar a sessão.';
             return;
         }
 
-        const newSession = {
-            id: `sessao_${Date.now()}`,
-            name: sessionName,
-            notes: sessionNotes,
-            timestamp: new Date().toISOString(),
-            data: {} // Aqui você pode adicionar os dados do transformador ou de outros módulos se necessário
-        };
-        sessions.push(newSession);
-        await historyStore.setData(sessions);
-
         errorMessageDiv.textContent = '';
         saveModal.hide();
-        await renderSessionsTable(sessions);
-        document.getElementById('history-action-message').innerHTML = '<div class="alert alert-success py-1 px-2">Sessão salva com sucesso!</div>';
-        setTimeout(() => { document.getElementById('history-action-message').innerHTML = ''; }, 3000);
-        console.log('Nova sessão salva:', newSession);
+        await renderSessionsTable(await loadSessions());
+        showActionMessage('<div class="alert alert-success py-1 px-2">Sessão salva com sucesso!</div>');
+        console.log('Nova sessão salva:', sessionName);
     });
 
     // Lógica para o modal de exclusão
@@ -156,14 +186,18 @@ async function initHistory() {
 
     document.getElementById('history-delete-modal-confirm-button').addEventListener('click', async (e) => {
         const sessionIdToDelete = e.currentTarget.dataset.sessionId;
-        let sessions = await loadSessions();
-        sessions = sessions.filter(s => s.id !== sessionIdToDelete);
-        await historyStore.setData(sessions);
+        const response = await fetch(`${sessionsURL()}/${encodeURIComponent(sessionIdToDelete)}`, {
+            method: 'DELETE',
+            headers: apiDataSystem.requestHeaders(),
+        });
 
         deleteModal.hide();
-        await renderSessionsTable(sessions);
-        document.getElementById('history-action-message').innerHTML = '<div class="alert alert-success py-1 px-2">Sessão excluída com sucesso!</div>';
-        setTimeout(() => { document.getElementById('history-action-message').innerHTML = ''; }, 3000);
+        await renderSessionsTable(await loadSessions());
+        if (response.ok) {
+            showActionMessage('<div class="alert alert-success py-1 px-2">Sessão excluída com sucesso!</div>');
+        } else {
+            showActionMessage('<div class="alert alert-danger py-1 px-2">Erro ao excluir a sessão.</div>');
+        }
         console.log('Sessão excluída:', sessionIdToDelete);
     });
 
@@ -171,14 +205,13 @@ async function initHistory() {
     const searchInput = document.getElementById('history-search-input');
     const searchButton = document.getElementById('history-search-button');
 
+    // Busca no servidor (FTS): espera o usuário parar de digitar antes de consultar
+    let searchTimer = null;
     async function filterSessions() {
-        const searchTerm = searchInput.value.toLowerCase();
-        const allSessions = await loadSessions();
-        const filtered = allSessions.filter(session =>
-            session.name.toLowerCase().includes(searchTerm) ||
-            (session.notes && session.notes.toLowerCase().includes(searchTerm))
-        );
-        await renderSessionsTable(filtered);
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(async () => {
+            await renderSessionsTable(await loadSessions(searchInput.value.trim()));
+        }, 250);
     }
 
     if (searchButton) {
@@ -189,7 +222,7 @@ async function initHistory() {
     }
 
     // Carregar sessões ao carregar a página
-    await renderSessionsTable(await loadSessions());
+    await renderSessionsTable(await loadSessions(''));
 }
 
 // SPA routing: executa quando o módulo history é carregado
@@ -538,9 +538,12 @@ function updateAnalysisTables(results) {
     const circuitParamsDisplay = document.getElementById('circuit-parameters-display');
     if (circuitParamsDisplay) {
         // Valores simulados para o circuito
-        const stagesTotalCapacitance = 600; // nF
+        const stageCapacitance = 1500; // nF por estágio (C_PER_STAGE_F)
         const stagesPerParallel = parseInt(document.getElementById('generator-config')?.value?.split('-')[0]?.replace('S', '') || '6');
         const numberParallelSets = parseInt(document.getElementById('generator-config')?.value?.split('-')[1]?.replace('P', '') || '1');
+        // Resistores LI/cortado: valor por coluna (÷ paralelos); manobra: por estágio (× estágios ÷ paralelos)
+        const impulseType = document.querySelector('input[name="impulseType"]:checked')?.value || 'lightning';
+        const resistorFactor = impulseType === 'switching' ? stagesPerParallel / numberParallelSets : 1 / numberParallelSets;
         
         circuitParamsDisplay.innerHTML = `
             <table class="table table-sm table-bordered">
@@ -552,19 +555,19 @@ function updateAnalysisTables(results) {
                 <tbody>
                     <tr>
                         <td>Capacitância Total do Gerador</td>
-                        <td class="text-end">${stagesTotalCapacitance * numberParallelSets / stagesPerParallel} nF</td>
+                        <td class="text-end">${(stageCapacitance * numberParallelSets / stagesPerParallel).toFixed(1)} nF</td>
                     </tr>
                     <tr>
                         <td>Capacitância por Estágio</td>
-                        <td class="text-end">${stagesTotalCapacitance / stagesPerParallel} nF</td>
+                        <td class="text-end">${stageCapacitance} nF</td>
                     </tr>
                     <tr>
                         <td>Resistência de Frente (total)</td>
-                        <td class="text-end">${parseFloat(document.getElementById('front-resistor-expression')?.value || '15') * stagesPerParallel / numberParallelSets} Ω</td>
+                        <td class="text-end">${(parseFloat(document.getElementById('front-resistor-expression')?.value || '15') * resistorFactor).toFixed(1)} Ω</td>
                     </tr>
                     <tr>
                         <td>Resistência de Cauda (total)</td>
-                        <td class="text-end">${parseFloat(document.getElementById('tail-resistor-expression')?.value || '100') * stagesPerParallel / numberParallelSets} Ω</td>
+                        <td class="text-end">${(parseFloat(document.getElementById('tail-resistor-expression')?.value || '100') * resistorFactor).toFixed(1)} Ω</td>
                     </tr>
                 </tbody>
             </table>
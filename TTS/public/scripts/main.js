@@ -135,6 +135,34 @@ document.addEventListener('DOMContentLoaded', async () => { // Tornar o listener
         });
     }
 
+    // Store principal de cada página de módulo (além de transformerInputs)
+    const MODULE_STORES = {
+        transformer_inputs: 'transformerInputs',
+        losses: 'losses',
+        impulse: 'impulse',
+        dielectric_analysis: 'dielectricAnalysis',
+        applied_voltage: 'appliedVoltage',
+        induced_voltage: 'inducedVoltage',
+        short_circuit: 'shortCircuit',
+        temperature_rise: 'temperatureRise'
+    };
+
+    // Carrega transformerInputs e o store do módulo numa única requisição
+    async function prefetchModuleStores(moduleName) {
+        const moduleStore = MODULE_STORES[moduleName];
+        if (!moduleStore) {
+            return;
+        }
+        try {
+            const apiSystem = await waitForApiSystem();
+            if (apiSystem && apiSystem.prefetchStores) {
+                await apiSystem.prefetchStores([...new Set(['transformerInputs', moduleStore])]);
+            }
+        } catch (error) {
+            console.warn(`[main.js] Erro ao pré-carregar stores do módulo ${moduleName}:`, error);
+        }
+    }
+
     async function loadModulePage(moduleName, pushToHistory = true) {
         if (!moduleName) {
             console.warn('loadModulePage chamada sem moduleName. Usando transformer_inputs como padrão.');
@@ -165,6 +193,9 @@ document.addEventListener('DOMContentLoaded', async () => { // Tornar o listener
                 </div>`;
         }
 
+        // Busca em lote os stores que a página vai ler, em paralelo com o HTML
+        const storesPrefetch = prefetchModuleStores(moduleName);
+
         try { // Outer try for HTML fetch
             const response = await fetch(htmlFilePath);
             if (!response.ok) {
@@ -181,6 +212,8 @@ document.addEventListener('DOMContentLoaded', async () => { // Tornar o listener
                  currentModuleScriptTag = null;
             }
 
+            await storesPrefetch;
+
             try { // Inner try for script import
                 // Verifica cache primeiro
                 let module;
@@ -0,0 +1,9 @@
+# tests/conftest.py
+"""Configuração do pytest: os testes importam `backend.*` a partir do diretório TTS."""
+
+import pathlib
+import sys
+
+root_dir = pathlib.Path(__file__).absolute().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
@@ -0,0 +1,76 @@
+# tests/test_adaptive_grid.py
+"""Amostragem adaptativa (utils.adaptive_grid) contra uma referência densa."""
+
+import numpy as np
+import pytest
+
+from backend.services import impulse_circuit_service as circuito
+from backend.services.impulse_service import calculate_impulse_test
+from backend.services.temperature_service import PASSO_MINIMO_CURVA_TEMPERATURA_MIN, calculate_temperature_time_curve
+from backend.utils.adaptive_grid import adaptive_time_grid
+
+
+@pytest.fixture(autouse=True)
+def limpar_caches():
+    circuito.clear_caches()
+    yield
+    circuito.clear_caches()
+
+
+def erro_maximo(tempos, valores, tempos_ref, valores_ref, quebra=None):
+    """Maior erro da interpolação linear da grade, fora do salto vertical em `quebra`."""
+    erro = np.abs(np.interp(tempos_ref, tempos, valores) - valores_ref)
+    if quebra is not None:
+        antes = tempos[np.searchsorted(tempos, quebra) - 1]
+        erro = erro[~((tempos_ref > antes) & (tempos_ref < quebra))]
+    return float(np.max(erro))
+
+
+def test_max_step_catches_fast_oscillation():
+    def oscilacao(t):
+        return np.where(t < 3.0, t / 3.0, np.exp(-0.8 * (t - 3.0)) * np.cos(9.0 * (t - 3.0)))
+
+    referencia = np.linspace(0.0, 100.0, 1_000_001)
+    tolerancia = 1e-3
+    tempos, valores = adaptive_time_grid(oscilacao, 0.0, 100.0, tolerancia, pontos_quebra=[3.0])
+    # Com 16 intervalos iniciais, o ponto médio não enxerga a oscilação de período 0,7 μs
+    assert erro_maximo(tempos, valores, referencia, oscilacao(referencia), 3.0) > tolerancia
+    tempos, valores = adaptive_time_grid(oscilacao, 0.0, 100.0, tolerancia, pontos_quebra=[3.0, 15.0],
+                                         passo_maximo=[None, 0.7 / 16, None])
+    assert erro_maximo(tempos, valores, referencia, oscilacao(referencia), 3.0) <= tolerancia
+
+
+@pytest.mark.parametrize("tipo, configuracao, rf, rt, objeto_pf, corte", [
+    ("Cortado", "6S-1P", 40, 100, 3000.0, 3.0),
+    ("Cortado", "6S-1P", 240, 600, 3000.0, 3.0),
+    ("Cortado", "12S-1P", 40, 100, 1000.0, 2.0),
+    ("Atmosférico", "6S-1P", 40, 100, 3000.0, None),
+    ("Atmosférico", "7S-1P", 140, 300, 3000.0, None),
+])
+def test_waveform_within_tolerance_of_dense_reference(tipo, configuracao, rf, rt, objeto_pf, corte):
+    dados = {"tipo_impulso": tipo, "configuracao_gerador": configuracao, "resistor_frontal": rf,
+             "resistor_cauda": rt, "capacitancia_objeto": objeto_pf, "tempo_corte": corte, "nbi_at": 650}
+    adaptativa = calculate_impulse_test(dados)
+    densa = calculate_impulse_test({**dados, "amostragem": "uniforme", "passo_tempo_us": 1e-4})
+    tempos = np.array(adaptativa["simulacao_forma_onda"]["tempos_us"])
+    tensoes = np.array(adaptativa["simulacao_forma_onda"]["tensoes_kv"])
+    tempos_ref = np.array(densa["simulacao_forma_onda"]["tempos_us"])
+    tensoes_ref = np.array(densa["simulacao_forma_onda"]["tensoes_kv"])
+    limite = adaptativa["tolerancia_forma_onda"] * np.max(np.abs(tensoes_ref))
+    assert erro_maximo(tempos, tensoes, tempos_ref, tensoes_ref, corte) <= limite
+    assert len(tempos) < len(tempos_ref) / 100
+
+
+def test_temperature_curve_min_step():
+    dados = {"perdas_vazio_kw": 20, "perdas_carga_kw_u_nom": 120, "peso_oleo": 15000, "peso_enrolamentos": 8000}
+    curva = calculate_temperature_time_curve(dados)
+    referencia = calculate_temperature_time_curve(dados, intervalo=0.001)
+    tempos = np.array(curva["tempo"])
+    assert np.min(np.diff(tempos)) >= PASSO_MINIMO_CURVA_TEMPERATURA_MIN
+    for chave in ("elevacao_oleo", "elevacao_enrol"):
+        assert erro_maximo(tempos, np.array(curva[chave]), np.array(referencia["tempo"]),
+                           np.array(referencia[chave])) < 0.1
+    # Com um τ de enrolamento de segundos, a densidade inicial fica limitada pelo passo mínimo
+    rapida = calculate_temperature_time_curve({**dados, "peso_enrolamentos": 100})
+    assert np.min(np.diff(rapida["tempo"])) >= PASSO_MINIMO_CURVA_TEMPERATURA_MIN
+    assert len(rapida["tempo"]) < 60
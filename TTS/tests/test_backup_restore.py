@@ -0,0 +1,123 @@
+# tests/test_backup_restore.py
+"""Backup e restauração dos stores (rotas /api/data/backup e /api/data/restore)."""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.routers import data_routes
+
+
+# Stores sem propagação, em número maior que um bloco de escrita
+STORES = ('standards', 'sessions', 'impulse', 'appliedVoltage', 'inducedVoltage', 'shortCircuit',
+          'dielectricAnalysis', 'globalInfo')
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    for store_id in STORES:
+        manager.set_data(store_id, {'origem': store_id}, propagate=False)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(dm):
+    app = FastAPI()
+    app.include_router(data_routes.router)
+    data_routes.set_data_manager(dm)
+    return TestClient(app)
+
+
+def ndjson(*records):
+    return b''.join((json.dumps(record) + '\n').encode('utf-8') for record in records)
+
+
+def estado(dm):
+    return {store_id: (dm.get_snapshot(store_id, refresh=False)[0], dm.get_data(store_id, refresh=False))
+            for store_id in STORES}
+
+
+def estado_gravado(dm):
+    return {store_id: dm._storage.get(dm._db_key(store_id)) for store_id in STORES}
+
+
+def test_restore_round_trip(client, dm):
+    backup = client.get('/api/data/backup').content
+    dm.set_data('standards', {'origem': 'IEEE'}, propagate=False)
+    resposta = client.post('/api/data/restore', content=backup)
+    assert resposta.status_code == 200
+    assert resposta.json()['changed_stores'] == ['standards']
+    assert dm.get_data('standards') == {'origem': 'standards'}
+
+
+def backup_alterado(fim=True, formato='ndjson-v2'):
+    registros = [{'type': 'backup', 'format': formato}]
+    registros += [{'type': 'store', 'store_id': store_id, 'data': {'origem': 'backup'}} for store_id in STORES]
+    if fim:
+        registros.append({'type': 'end', 'stores': len(STORES)})
+    return ndjson(*registros)
+
+
+def test_malformed_line_leaves_every_store_unchanged(client, dm):
+    antes, gravado = estado(dm), estado_gravado(dm)
+    # Em blocos, como um upload grande: os stores válidos chegam antes da linha inválida
+    resposta = client.post('/api/data/restore', content=iter([backup_alterado(), b'{"type": "sto\n']))
+    assert resposta.status_code == 400
+    assert estado(dm) == antes
+    assert estado_gravado(dm) == gravado
+
+
+def test_storage_failure_leaves_every_store_unchanged(client, dm, monkeypatch):
+    antes, gravado = estado(dm), estado_gravado(dm)
+    record = dm._storage._delta_log.record
+    gravacoes = []
+
+    def falhar_no_segundo(conn, key, data, version):
+        gravacoes.append(key)
+        if len(gravacoes) == len(STORES) - 1:
+            raise OSError('disco cheio')
+        return record(conn, key, data, version)
+
+    monkeypatch.setattr(dm._storage._delta_log, 'record', falhar_no_segundo)
+    resposta = client.post('/api/data/restore', content=backup_alterado())
+    assert resposta.status_code == 500
+    monkeypatch.undo()
+    # Os stores anteriores já tinham sido gravados na transação: o rollback desfaz também essas gravações
+    assert estado(dm) == antes
+    assert estado_gravado(dm) == gravado
+
+
+def test_backup_without_end_record_is_rejected(client, dm):
+    antes, gravado = estado(dm), estado_gravado(dm)
+    resposta = client.post('/api/data/restore', content=backup_alterado(fim=False))
+    assert resposta.status_code == 400
+    assert 'registro final' in resposta.json()['detail']
+    assert estado(dm) == antes
+    assert estado_gravado(dm) == gravado
+
+
+def test_v1_backup_is_restored_without_end_record(client, dm):
+    resposta = client.post('/api/data/restore', content=backup_alterado(fim=False, formato='ndjson-v1'))
+    assert resposta.status_code == 200
+    assert dm.get_data('standards') == {'origem': 'backup'}
+
+
+def test_failure_while_streaming_ends_backup_with_error_record(client, dm, monkeypatch):
+    revisions, stores = dm._all_snapshots()
+    stores = dict(stores, globalInfo=object())  # Não serializável: falha no meio do streaming
+    monkeypatch.setattr(dm, '_all_snapshots', lambda: (revisions, stores))
+    resposta = client.get('/api/data/backup')
+    assert resposta.status_code == 200  # O status já foi enviado quando a falha acontece
+    ultimo = json.loads(resposta.content.splitlines()[-1])
+    assert ultimo['type'] == 'error'
+    monkeypatch.undo()
+
+    antes = estado(dm)
+    resposta = client.post('/api/data/restore', content=resposta.content)
+    assert resposta.status_code == 400
+    assert estado(dm) == antes
@@ -0,0 +1,67 @@
+# tests/test_batch_stores.py
+"""Lote de leituras e escritas de stores (POST /api/data/stores:batch)."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.routers import data_routes
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    manager.set_data('standards', {'norma': 'IEC'}, propagate=False)
+    manager.set_data('globalInfo', {'cliente': 'A'}, propagate=False)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(dm):
+    app = FastAPI()
+    app.include_router(data_routes.router)
+    data_routes.set_data_manager(dm)
+    return TestClient(app)
+
+
+def test_mixed_batch_reads_reflect_the_writes(client, dm):
+    etag_global = data_routes.make_etag(dm.get_version('globalInfo'))
+    resposta = client.post('/api/data/stores:batch', json={'propagate': False, 'operations': [
+        {'op': 'get', 'store_id': 'standards'},
+        {'op': 'patch', 'store_id': 'standards', 'data': {'revisao': 2}},
+        {'op': 'put', 'store_id': 'impulse', 'data': {'forma': 'LI'}},
+        {'op': 'get', 'store_id': 'globalInfo', 'if_none_match': etag_global},
+    ]})
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    leitura, patch, put, nao_alterado = corpo['results']
+    # As leituras refletem o estado depois de todas as escritas do lote
+    assert leitura['status'] == 200 and leitura['data'] == {'norma': 'IEC', 'revisao': 2}
+    assert leitura['etag'] == patch['etag'] == data_routes.make_etag(dm.get_version('standards'))
+    assert put['status'] == 200
+    assert nao_alterado == {'op': 'get', 'store_id': 'globalInfo', 'status': 304, 'etag': etag_global}
+    assert sorted(corpo['changed']) == ['impulse', 'standards']
+    assert dm.get_data('impulse') == {'forma': 'LI'}
+
+
+def test_batch_with_stale_if_match_writes_nothing(client, dm):
+    antiga = data_routes.make_etag(dm.get_version('standards'))
+    dm.set_data('standards', {'norma': 'IEEE'}, propagate=False)
+    versoes = {store_id: dm.get_version(store_id) for store_id in ('standards', 'impulse')}
+    resposta = client.post('/api/data/stores:batch', json={'propagate': False, 'operations': [
+        {'op': 'put', 'store_id': 'impulse', 'data': {'forma': 'SI'}},
+        {'op': 'patch', 'store_id': 'standards', 'data': {'revisao': 3}, 'if_match': antiga},
+        {'op': 'get', 'store_id': 'standards'},
+    ]})
+    assert resposta.status_code == 412
+    assert {store_id: dm.get_version(store_id) for store_id in versoes} == versoes
+    assert dm.get_data('standards') == {'norma': 'IEEE'}
+
+
+def test_batch_with_unknown_store_returns_404(client):
+    resposta = client.post('/api/data/stores:batch', json={'operations': [
+        {'op': 'get', 'store_id': 'inexistente'},
+    ]})
+    assert resposta.status_code == 404
@@ -0,0 +1,55 @@
+# tests/test_connection_pool.py
+"""Pool de conexões SQLite do MCP: o número de conexões não cresce com as propagações."""
+
+import threading
+
+from backend.mcp.connection import DEFAULT_POOL_SIZE, SQLiteConnectionManager
+from backend.mcp.data_manager import MCPDataManager
+
+FORM_DATA = {'potencia_mva': 10, 'tensao_at': 138, 'tensao_bt': 13.8, 'frequencia': 60,
+             'nbi_at': 550, 'classe_tensao_at': 145}
+PROPAGACOES = 30
+
+
+def test_propagations_keep_connection_count_bounded(tmp_path):
+    dm = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    try:
+        threads_antes = threading.active_count()
+        for i in range(PROPAGACOES):
+            dm.set_data('transformerInputs', {'formData': {**FORM_DATA, 'potencia_mva': 10 + i}}, propagate=False)
+            report = dm._propagate_changes('transformerInputs', force=True)
+            assert report['status'] == 'completed'
+            assert dm.storage.open_connections() <= DEFAULT_POOL_SIZE
+        # O pool de recálculo é reaproveitado: as threads não se acumulam entre propagações
+        assert threading.active_count() <= threads_antes + dm.propagation_engine.max_workers
+    finally:
+        dm.close()
+    assert dm.storage.open_connections() == 0
+
+
+def test_short_lived_threads_return_connections(tmp_path):
+    manager = SQLiteConnectionManager(str(tmp_path / 'pool.db'), pool_size=2)
+    with manager.transaction() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+
+    def escrever(i):
+        with manager.transaction() as conn:
+            conn.execute('INSERT INTO t VALUES (?)', (i,))
+
+    threads = [threading.Thread(target=escrever, args=(i,)) for i in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with manager.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 50
+    assert manager.open_connections() <= 2
+    manager.close_all()
+
+
+def test_nested_blocks_reuse_the_thread_connection(tmp_path):
+    manager = SQLiteConnectionManager(str(tmp_path / 'pool.db'), pool_size=1)
+    with manager.connection() as externa:
+        with manager.transaction() as interna:
+            assert interna is externa
+    manager.close_all()
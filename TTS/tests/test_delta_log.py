@@ -0,0 +1,56 @@
+# tests/test_delta_log.py
+"""Versões dos stores gravadas como deltas com checkpoints (backend/mcp/delta_log.py)."""
+
+import pytest
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.mcp.delta_log import apply_delta, compute_delta
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    yield manager
+    manager.close()
+
+
+def test_delta_round_trip():
+    antigo = {'formData': {'potencia_mva': 10, 'obsoleto': 1}, 'taps': [1, 2]}
+    novo = {'formData': {'potencia_mva': 300.0}, 'taps': [1, 2, 3], 'results': {'ok': True}}
+    delta = compute_delta(antigo, novo)
+    assert ['del', ['formData', 'obsoleto']] in delta
+    assert ['set', ['taps'], [1, 2, 3]] in delta  # Listas são substituídas por inteiro
+    assert apply_delta({'formData': {'potencia_mva': 10, 'obsoleto': 1}, 'taps': [1, 2]}, delta) == novo
+    assert compute_delta(novo, novo) == []
+
+
+def test_past_versions_are_rebuilt_from_checkpoints_and_deltas(tmp_path, dm):
+    dm._storage._delta_log.checkpoint_interval = 3
+    esperado = {}
+    for i in range(8):
+        dm.set_data('standards', {'norma': 'IEC', 'revisao': i, 'fixo': {'a': 'x' * 200}}, propagate=False)
+        esperado[dm.get_version('standards')] = dm.get_data('standards')
+
+    versoes = dm.list_store_versions('standards')
+    assert [v['version'] for v in versoes] == sorted(esperado)
+    assert any(v['checkpoint'] for v in versoes[1:])  # Checkpoints periódicos além do primeiro
+    assert not all(v['checkpoint'] for v in versoes)  # As demais versões são só deltas
+    for version, data in esperado.items():
+        assert dm.get_data_at_version('standards', version) == data
+
+    ultima = max(esperado)
+    dm.close()
+    reaberto = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    try:
+        # Na inicialização o estado atual vem do último checkpoint mais os deltas posteriores
+        assert reaberto.get_version('standards') == ultima
+        assert reaberto.get_data('standards') == esperado[ultima]
+    finally:
+        reaberto.close()
+
+
+def test_unchanged_store_is_not_rewritten(dm):
+    dm.set_data('standards', {'norma': 'IEC'}, propagate=False)
+    antes = dm.list_store_versions('standards')
+    dm.set_data('standards', {'norma': 'IEC'}, propagate=False)
+    assert dm.list_store_versions('standards') == antes
@@ -0,0 +1,56 @@
+# tests/test_etags.py
+"""ETags dos stores e requisições condicionais (If-None-Match → 304, If-Match → 412)."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.routers import data_routes
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(dm):
+    app = FastAPI()
+    app.include_router(data_routes.router)
+    data_routes.set_data_manager(dm)
+    return TestClient(app)
+
+
+def test_if_none_match_returns_304_until_the_store_changes(client):
+    etag = client.put('/api/data/stores/standards', json={'norma': 'IEC'}).headers['ETag']
+    resposta = client.get('/api/data/stores/standards', headers={'If-None-Match': etag})
+    assert resposta.status_code == 304
+    assert resposta.headers['ETag'] == etag
+    assert client.get('/api/data/stores/standards', headers={'If-None-Match': f'W/{etag}'}).status_code == 304
+
+    novo = client.put('/api/data/stores/standards', json={'norma': 'IEEE'}).headers['ETag']
+    assert novo != etag
+    resposta = client.get('/api/data/stores/standards', headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] == novo
+    assert resposta.json() == {'norma': 'IEEE'}
+
+
+def test_if_match_with_stale_version_returns_412_and_keeps_data(client, dm):
+    antiga = client.put('/api/data/stores/standards', json={'norma': 'IEC'}).headers['ETag']
+    atual = client.patch('/api/data/stores/standards', json={'revisao': 2}, headers={'If-Match': antiga})
+    assert atual.status_code == 200
+
+    resposta = client.put('/api/data/stores/standards', json={'norma': 'ABNT'}, headers={'If-Match': antiga})
+    assert resposta.status_code == 412
+    assert resposta.headers['ETag'] == atual.headers['ETag']  # Versão atual, para o cliente recarregar
+    assert client.delete('/api/data/stores/standards', headers={'If-Match': antiga}).status_code == 412
+    assert dm.get_data('standards') == {'norma': 'IEC', 'revisao': 2}
+
+
+def test_invalid_if_match_returns_400(client):
+    resposta = client.put('/api/data/stores/standards', json={}, headers={'If-Match': '"abc"'})
+    assert resposta.status_code == 400
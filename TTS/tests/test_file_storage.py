@@ -0,0 +1,41 @@
+# tests/test_file_storage.py
+"""Backend de arquivos só com appends (AppendOnlyFileStorage)."""
+
+from backend.mcp.file_storage import AppendOnlyFileStorage
+
+
+def abrir(diretorio):
+    storage = AppendOnlyFileStorage(str(diretorio))
+    storage.init()
+    return storage
+
+
+def test_torn_tail_is_cut_before_next_append(tmp_path):
+    storage = abrir(tmp_path)
+    storage.put('a', {'x': 1}, 1)
+    storage.put('a', {'x': 2}, 2)
+    # Queda no meio de um append: a linha da versão 3 ficou pela metade
+    with open(storage._store_path('a'), 'ab') as f:
+        f.write(b'{"version": 3, "at": "2026-01-01T00:00:00", "del')
+
+    # Nova execução: as versões gravadas depois da queda não podem se perder
+    storage = abrir(tmp_path)
+    assert storage.get('a')[0] == 2
+    storage.put('a', {'x': 3}, 3)
+    storage.put('a', {'x': 4}, 4)
+
+    storage = abrir(tmp_path)
+    assert storage.get('a') == (4, {'x': 4})
+    assert storage.list_stores() == {'a': 4}
+    assert [v['version'] for v in storage.list_versions('a')] == [1, 2, 3, 4]
+
+
+def test_torn_tail_recovered_on_first_append_without_read(tmp_path):
+    storage = abrir(tmp_path)
+    storage.put('a', {'x': 1}, 1)
+    with open(storage._store_path('a'), 'ab') as f:
+        f.write(b'{"vers')
+
+    storage = abrir(tmp_path)
+    storage.put('a', {'x': 2}, 2)
+    assert abrir(tmp_path).get('a') == (2, {'x': 2})
@@ -0,0 +1,104 @@
+# tests/test_impulse_circuit.py
+"""Circuito RLC do gerador de impulso (impulse_circuit_service)."""
+
+import numpy as np
+import pytest
+
+from backend.services import impulse_circuit_service as circuito
+from backend.services.impulse_optimizer_service import optimize_impulse_generator
+from backend.services.impulse_service import calculate_impulse_test
+from backend.utils import constants as const
+
+
+@pytest.fixture(autouse=True)
+def limpar_caches():
+    circuito.clear_caches()
+    yield
+    circuito.clear_caches()
+
+
+@pytest.mark.parametrize("cortado", [False, True])
+def test_eigen_path_matches_expm(cortado):
+    modelo = circuito.build_circuit_model("6S-1P", 40, 100, 3000.0, cortado=cortado)
+    a, decomposicao = (modelo.a_corte, modelo.decomposicao_corte) if cortado else (modelo.a, modelo.decomposicao)
+    assert decomposicao is not None
+    x0 = np.zeros(a.shape[0])
+    x0[0] = 1.0
+    tempos = np.linspace(0.0, 100.0, 2001)
+    autovalores = circuito._states(a, decomposicao, x0, tempos)
+    exponencial = circuito._states(a, None, x0, tempos)
+    np.testing.assert_allclose(autovalores, exponencial, rtol=0, atol=1e-9)
+
+
+def test_chopped_response():
+    modelo = circuito.build_circuit_model("6S-1P", 40, 100, 3000.0, cortado=True)
+    tempos = np.linspace(0.0, 20.0, 4001)
+    plena = circuito.circuit_response(modelo, tempos)
+    cortada = circuito.circuit_response(modelo, tempos, tempo_corte_us=3.0)
+    antes = tempos < 3.0
+    assert np.all(np.isfinite(cortada))
+    np.testing.assert_array_equal(cortada[antes], plena[antes])
+    tensao_corte = plena[np.searchsorted(tempos, 3.0)]
+    # O gap colapsa a tensão: logo após o corte ela cai bem abaixo da onda plena e oscila em torno de zero
+    assert np.max(np.abs(cortada[tempos > 6.0])) < 0.5 * tensao_corte
+    assert np.min(cortada[~antes]) < 0
+
+
+def test_optimizer_uses_the_circuit_model():
+    resultado = optimize_impulse_generator({"capacitancia_objeto_pf": 3000, "tensao_ensaio_kv": 1050,
+                                            "capacitancia_parasita_pf": 400})
+    montagem = (resultado["montagens"] or resultado["mais_proximas"])[0]
+    modelo = circuito.build_circuit_model(montagem["configuracao"], montagem["resistor_frontal_ohm"],
+                                          montagem["resistor_cauda_ohm"], 3000.0, 400.0)
+    t_pico = np.log(modelo.beta / modelo.alfa) / (modelo.beta - modelo.alfa)
+    eficiencia = modelo.escala_base * (np.exp(-modelo.alfa * t_pico) - np.exp(-modelo.beta * t_pico))
+    assert montagem["eficiencia"] == pytest.approx(eficiencia, abs=1e-4)
+
+
+def test_typical_object_has_compliant_lightning_setup():
+    resultado = optimize_impulse_generator({"capacitancia_objeto_pf": 3000, "tensao_ensaio_kv": 1050})
+    assert resultado["estatisticas"]["conformes"] >= 1
+    assert resultado["montagens"]
+    # A melhor montagem também atende à norma na simulação RLC completa
+    montagem = resultado["montagens"][0]
+    modelo = circuito.build_circuit_model(montagem["configuracao"], montagem["resistor_frontal_ohm"],
+                                          montagem["resistor_cauda_ohm"], 3000.0,
+                                          montagem["capacitancia_parasita_pf"])
+    tempos = np.linspace(0.0, 200.0, 400001)
+    tensao = circuito.circuit_response(modelo, tempos)
+    i_pico = int(np.argmax(tensao))
+    pico = tensao[i_pico]
+    t30 = np.interp(0.3 * pico, tensao[:i_pico + 1], tempos[:i_pico + 1])
+    t90 = np.interp(0.9 * pico, tensao[:i_pico + 1], tempos[:i_pico + 1])
+    t1 = 1.67 * (t90 - t30)
+    t2 = np.interp(-0.5 * pico, -tensao[i_pico:], tempos[i_pico:]) - (t30 - 0.3 * t1)
+    assert t1 == pytest.approx(1.2, rel=0.30)
+    assert t2 == pytest.approx(50.0, rel=0.20)
+
+
+@pytest.mark.parametrize("objeto_pf", [1000, 5000])
+def test_optimizer_setups_pass_the_compliance_check(objeto_pf):
+    indutores = {opcao["label"]: opcao["value"] for opcao in const.INDUCTORS_OPTIONS}
+    resultado = optimize_impulse_generator({"capacitancia_objeto_pf": objeto_pf, "tensao_ensaio_kv": 1050})
+    assert resultado["montagens"]
+    for montagem in resultado["montagens"]:
+        analise = calculate_impulse_test({
+            "configuracao_gerador": montagem["configuracao"], "resistor_frontal": montagem["resistor_frontal_ohm"],
+            "resistor_cauda": montagem["resistor_cauda_ohm"], "capacitancia_objeto": objeto_pf,
+            "capacitancia_parasita_pf": montagem["capacitancia_parasita_pf"],
+            "indutancia": indutores[montagem["indutor_label"]] * 1e6, "nbi_at": 1050,
+        })["analise_conformidade"]
+        assert analise["overshoot_percent"] == pytest.approx(montagem["overshoot_percent"], abs=0.01)
+        assert analise["dentro_tolerancia_overshoot"]
+        assert analise["dentro_tolerancia_frente"] and analise["dentro_tolerancia_cauda"]
+
+
+def test_overshoot_not_applicable_without_circuit_model():
+    analise = calculate_impulse_test({"resistor_frontal": 40, "resistor_cauda": 100, "nbi_at": 650})["analise_conformidade"]
+    assert analise["overshoot_percent"] is None
+    assert analise["dentro_tolerancia_overshoot"] is None
+    assert analise["overshoot_motivo"]
+    com_circuito = calculate_impulse_test({"configuracao_gerador": "6S-1P", "resistor_frontal": 40, "resistor_cauda": 100,
+                                           "capacitancia_objeto": 3000.0, "nbi_at": 650})["analise_conformidade"]
+    assert com_circuito["overshoot_percent"] > 0
+    assert "overshoot_motivo" not in com_circuito
@@ -0,0 +1,70 @@
+# tests/test_load_session.py
+"""Carregamento de sessão: troca atômica dos stores e recálculo só dos módulos desatualizados."""
+
+import pytest
+
+from backend.mcp.data_manager import MCPDataManager
+
+
+def form(potencia):
+    return {'formData': {'potencia_mva': potencia, 'tensao_at': 138, 'tensao_bt': 13.8}}
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    manager.enable_auto_propagation()
+    manager.chamadas = []
+    for store_id, definition in manager.store_definitions.items():
+        endpoint = definition.get('update_logic_endpoint')
+        if endpoint:
+            def handler(payload, store_id=store_id):
+                manager.chamadas.append(store_id)
+                return {'results': {'potencia_mva': payload['basicData']['potencia_mva']}}
+            manager.propagation_engine.register(endpoint, handler)
+    yield manager
+    manager.close()
+
+
+def modulos(dm):
+    return sorted(s for s, d in dm.store_definitions.items() if d.get('update_logic_endpoint'))
+
+
+def test_session_with_matching_results_recomputes_nothing(dm, monkeypatch):
+    dm.set_data('transformerInputs', form(10))
+    dm.save_session('a')
+    dm.set_data('transformerInputs', form(20))
+    dm.save_session('b')
+
+    persistencias = []
+    persist_stores = dm._persist_stores
+    monkeypatch.setattr(dm, '_persist_stores', lambda ids: (persistencias.append(sorted(ids)), persist_stores(ids)))
+    dm.chamadas.clear()
+    assert dm.load_session('a') is True
+    assert dm.chamadas == []  # Os resultados da sessão já correspondem às suas entradas
+    assert persistencias == [sorted(['transformerInputs', *modulos(dm)])]  # Uma única gravação
+    assert dm.get_data('losses')['results'] == {'potencia_mva': 10}
+    assert dm.get_data('transformerInputs') == form(10)
+
+
+def test_only_stale_modules_are_recomputed(dm):
+    dm.set_data('transformerInputs', form(10))
+    dm.set_data('impulse', {'results': {'potencia_mva': 'obsoleto'}}, propagate=False)  # Sem impressão digital
+    dm.disable_lazy_recompute()
+    dm.save_session('c')
+    dm.enable_lazy_recompute()
+    dm.set_data('transformerInputs', form(20))
+
+    dm.chamadas.clear()
+    assert dm.load_session('c') is True
+    assert dm.chamadas == ['impulse']
+    assert dm.get_data('impulse')['results'] == {'potencia_mva': 10}
+    assert dm.get_data('losses')['results'] == {'potencia_mva': 10}
+    assert dm.chamadas == ['impulse']
+
+
+def test_unknown_session_changes_nothing(dm):
+    dm.set_data('transformerInputs', form(10))
+    versao = dm.get_version('transformerInputs')
+    assert dm.load_session('inexistente') is False
+    assert dm.get_version('transformerInputs') == versao
@@ -0,0 +1,62 @@
+# tests/test_projects.py
+"""Projetos (transformadores) isolados no mesmo banco (backend/mcp/projects.py)."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.projects import ProjectRegistry
+from backend.routers import data_routes, project_context
+
+
+@pytest.fixture
+def registry(tmp_path):
+    projetos = ProjectRegistry(str(tmp_path / 'tts_data.db'))
+    yield projetos
+    projetos.close()
+
+
+def test_projects_have_independent_stores_and_sessions(registry):
+    padrao, a, b = registry.get(None), registry.get('TR-A'), registry.get('TR-B')
+    assert registry.get('default') is padrao and registry.get('TR-A') is a
+    padrao.set_data('globalInfo', {'cliente': 'padrão'}, propagate=False)
+    a.set_data('globalInfo', {'cliente': 'A'}, propagate=False)
+    b.set_data('globalInfo', {'cliente': 'B'}, propagate=False)
+    a.save_session('ensaio', 'só no projeto A')
+
+    assert padrao.get_data('globalInfo') == {'cliente': 'padrão'}
+    assert a.get_data('globalInfo') == {'cliente': 'A'}
+    assert b.get_data('globalInfo') == {'cliente': 'B'}
+    assert [s['session_id'] for s in a.list_sessions()] == ['ensaio']
+    assert b.list_sessions() == [] and padrao.list_sessions() == []
+    assert b.load_session('ensaio') is False
+
+    b.clear_store('globalInfo')
+    assert a.get_data('globalInfo') == {'cliente': 'A'}
+
+
+def test_projects_are_persisted_under_their_own_keys(tmp_path, registry):
+    registry.get('TR-A').set_data('globalInfo', {'cliente': 'A'}, propagate=False)
+    registry.close()
+
+    reaberto = ProjectRegistry(str(tmp_path / 'tts_data.db'))
+    try:
+        projetos = {p['project_id']: p for p in reaberto.list_projects()}
+        assert projetos['TR-A'] == {'project_id': 'TR-A', 'active': False, 'persisted': True}
+        assert reaberto.get('TR-A').get_data('globalInfo') == {'cliente': 'A'}
+        assert reaberto.get(None).get_data('globalInfo') == {}
+    finally:
+        reaberto.close()
+
+
+def test_project_is_selected_by_header_and_validated(registry, monkeypatch):
+    monkeypatch.setattr(project_context, 'project_registry', registry)
+    app = FastAPI()
+    app.include_router(data_routes.router)
+    data_routes.set_data_manager(registry.default)
+    client = TestClient(app)
+
+    client.put('/api/data/stores/globalInfo', json={'cliente': 'A'}, headers={'X-Project-Id': 'TR-A'})
+    assert client.get('/api/data/stores/globalInfo?project=TR-A').json() == {'cliente': 'A'}
+    assert client.get('/api/data/stores/globalInfo').json() == {}
+    assert client.get('/api/data/stores/globalInfo', headers={'X-Project-Id': '../x'}).status_code == 400
@@ -0,0 +1,63 @@
+# tests/test_recompute_errors.py
+"""Recálculo preguiçoso com falha: o store não é servido desatualizado como se estivesse em dia."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.routers import data_routes
+
+FORM_DATA = {'potencia_mva': 10, 'tensao_at': 138, 'tensao_bt': 13.8, 'frequencia': 60,
+             'nbi_at': 550, 'classe_tensao_at': 145}
+ENDPOINT = 'api/transformer/modules/temperatureRise/process'
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(dm):
+    app = FastAPI()
+    app.include_router(data_routes.router)
+    data_routes.set_data_manager(dm)
+    return TestClient(app)
+
+
+def test_failed_recompute_is_reported_until_inputs_change(dm, client):
+    chamadas = []
+
+    def handler(payload):
+        chamadas.append(payload['basicData']['potencia_mva'])
+        if payload['basicData']['potencia_mva'] == 10:
+            raise ZeroDivisionError('float division by zero')
+        return {'resultado': 'ok'}
+
+    dm.propagation_engine.register(ENDPOINT, handler)
+    dm.set_data('transformerInputs', {'formData': FORM_DATA}, propagate=False)
+
+    resposta = client.get('/api/data/stores/temperatureRise')
+    assert resposta.status_code == 409
+    assert resposta.json()['detail']['error'] == 'float division by zero'
+    assert dm.recompute_error('temperatureRise') == 'float division by zero'
+    assert 'temperatureRise' in dm.dirty_stores()
+    tentativas = len(chamadas)
+    # Mesmas entradas: o erro é devolvido de novo sem recalcular, também no lote e com If-None-Match
+    assert client.get('/api/data/stores/temperatureRise', headers={'If-None-Match': '*'}).status_code == 409
+    lote = client.post('/api/data/stores:batch',
+                       json={'operations': [{'op': 'get', 'store_id': 'temperatureRise'}]}).json()
+    assert lote['results'][0]['status'] == 409
+    assert len(chamadas) == tentativas
+
+    # Entradas novas: recalcula, e o erro some
+    dm.set_data('transformerInputs', {'formData': {**FORM_DATA, 'potencia_mva': 12}}, propagate=False)
+    resposta = client.get('/api/data/stores/temperatureRise')
+    assert resposta.status_code == 200
+    assert resposta.json()['resultado'] == 'ok'
+    assert dm.recompute_error('temperatureRise') is None
+    assert client.get('/api/data/stores/temperatureRise').status_code == 200
+    assert chamadas[tentativas:] == [12]
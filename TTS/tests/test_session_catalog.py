@@ -0,0 +1,67 @@
+# tests/test_session_catalog.py
+"""Catálogo de sessões: paginação por cursor e busca (FTS5, LIKE e backend de arquivos)."""
+
+import pytest
+
+from backend.mcp.file_storage import AppendOnlyFileStorage
+from backend.mcp.sqlite_storage import SQLiteStorage
+
+POTENCIAS = (100, 150, 300, 300, 450)
+
+
+@pytest.fixture(params=['fts', 'like', 'file'])
+def storage(request, tmp_path):
+    if request.param == 'file':
+        backend = AppendOnlyFileStorage(str(tmp_path / 'arquivos'))
+    else:
+        backend = SQLiteStorage(str(tmp_path / 'tts_data.db'))
+    backend.init()
+    if request.param == 'like':
+        backend._catalog.fts_enabled = False  # Como num SQLite sem FTS5
+    for i, potencia in enumerate(POTENCIAS):
+        stores = {'transformerInputs': {'formData': {'potencia_mva': potencia, 'tensao_at': 138}}}
+        backend.save_session(f'ensaio-{i}', stores, f'Cliente {"Norte" if i % 2 else "Sul"}')
+    yield request.param, backend
+    backend.close()
+
+
+def todas_as_paginas(backend, query=None, limit=2):
+    sessoes, cursor, paginas = [], None, 0
+    while True:
+        pagina = backend.search_sessions('', query, limit, cursor)
+        sessoes += [s['session_id'] for s in pagina['sessions']]
+        paginas += 1
+        cursor = pagina['next_cursor']
+        if cursor is None:
+            return sessoes, paginas
+
+
+def test_cursor_pages_cover_every_session_once(storage):
+    _, backend = storage
+    sessoes, paginas = todas_as_paginas(backend)
+    assert sorted(sessoes) == [f'ensaio-{i}' for i in range(len(POTENCIAS))]
+    assert paginas == 3
+    # Mais recentes primeiro; no mesmo instante, pelo nome em ordem decrescente
+    ordem = [(s['created_at'], s['session_id']) for s in backend.search_sessions('', limit=10)['sessions']]
+    assert ordem == sorted(ordem, reverse=True)
+
+
+def test_search_by_description(storage):
+    _, backend = storage
+    sessoes, _ = todas_as_paginas(backend, 'norte', limit=1)
+    assert sorted(sessoes) == ['ensaio-1', 'ensaio-3']
+
+
+def test_search_by_transformer_parameters(storage):
+    tipo, backend = storage
+    if tipo == 'like':
+        pytest.skip('Sem FTS5 a busca cobre só o nome e a descrição')
+    sessoes = [s['session_id'] for s in backend.search_sessions('', '300 MVA')['sessions']]
+    assert sorted(sessoes) == ['ensaio-2', 'ensaio-3']
+    assert backend.search_sessions('', '300 MVA norte')['sessions'][0]['session_id'] == 'ensaio-3'
+
+
+def test_invalid_cursor_raises_value_error(storage):
+    _, backend = storage
+    with pytest.raises(ValueError):
+        backend.search_sessions('', None, 2, 'não-é-um-cursor')
@@ -0,0 +1,82 @@
+# tests/test_session_diff.py
+"""Diferença entre sessões salvas (GET /api/sessions/{a}/diff/{b})."""
+
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.mcp.data_manager import MCPDataManager
+from backend.mcp.session_diff import diff_values
+from backend.routers import session_routes
+
+
+@pytest.fixture
+def dm(tmp_path):
+    manager = MCPDataManager(db_path=str(tmp_path / 'tts_data.db'))
+    manager.set_data('standards', {'norma': 'IEC', 'taps': [1, 2]}, propagate=False)
+    manager.set_data('globalInfo', {'cliente': 'A'}, propagate=False)
+    manager.save_session('a')
+    manager.set_data('standards', {'norma': 'IEEE', 'taps': [1, 2, 3]}, propagate=False)
+    manager.set_data('impulse', {'forma': 'LI'}, propagate=False)
+    manager.save_session('b')
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(dm):
+    app = FastAPI()
+    app.include_router(session_routes.router)
+    session_routes.set_data_manager(dm)
+    return TestClient(app)
+
+
+def linhas(resposta):
+    return [json.loads(linha) for linha in resposta.text.splitlines()]
+
+
+def test_diff_values_paths():
+    assert list(diff_values({'x': [1, {'y': 2}], 'z': 0}, {'x': [1, {'y': 3}, 4]})) == [
+        {'op': 'change', 'path': ['x', 1, 'y'], 'old': 2, 'new': 3},
+        {'op': 'add', 'path': ['x', 2], 'new': 4},
+        {'op': 'remove', 'path': ['z'], 'old': 0},
+    ]
+
+
+def test_session_diff_streams_changes_and_summary(client, dm, monkeypatch):
+    lidos = []
+    load_session_store = dm.load_session_store
+
+    def registrar(session_id, store_id):
+        lidos.append(store_id)
+        return load_session_store(session_id, store_id)
+
+    monkeypatch.setattr(dm, 'load_session_store', registrar)
+    resposta = client.get('/api/sessions/a/diff/b')
+    assert resposta.status_code == 200
+    cabecalho, *mudancas, resumo = linhas(resposta)
+
+    assert cabecalho == {'type': 'diff', 'format': 'session-diff-v1', 'a': 'a', 'b': 'b'}
+    assert [(m['store_id'], m['op'], m['path']) for m in mudancas] == [
+        ('impulse', 'add', ['forma']),
+        ('standards', 'change', ['norma']),
+        ('standards', 'add', ['taps', 2]),
+    ]
+    assert resumo['changed'] == {'impulse': 1, 'standards': 2} and resumo['changes'] == 3
+    assert 'globalInfo' in resumo['identical']
+    # Stores com o mesmo hash nas duas sessões não são lidos
+    assert sorted(set(lidos)) == ['impulse', 'standards']
+
+
+def test_session_diff_filters_stores_and_leaves_current_state(client, dm):
+    atual = dm.get_data('standards')
+    _, *mudancas, resumo = linhas(client.get('/api/sessions/a/diff/b?stores=impulse,globalInfo'))
+    assert {m['store_id'] for m in mudancas} == {'impulse'}
+    assert resumo['identical'] == ['globalInfo']
+    assert dm.get_data('standards') == atual
+
+
+def test_session_diff_unknown_session_returns_404(client):
+    assert client.get('/api/sessions/a/diff/inexistente').status_code == 404